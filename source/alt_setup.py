@@ -1,47 +1,62 @@
+import os
 from setuptools import Extension, setup
 from Cython.Build import cythonize
 import numpy
 
 c_args = ["-O3", "-ffast-math", "-funroll-loops"]
 
+# LEHMER_STATS=0 compiles the counters behind the generators' stats() out of the generate loops
+# LEHMER_PROFILE=1 builds the per-phase tick counters behind profile(), see phase_profile.py
+macros = [("LH_STATS", os.environ.get("LEHMER_STATS", "1")),
+          ("LH_PROFILE", os.environ.get("LEHMER_PROFILE", "0"))]
+
 extensions = [
     Extension(
         "alternatives.lcg_fenwick",
         ["alternatives/lcg_fenwick.pyx"],
-        include_dirs=[numpy.get_include()],
+        include_dirs=[numpy.get_include(), "."],
         extra_compile_args=c_args,
+        define_macros=macros,
+        language="c++",
     ),
     Extension(
         "alternatives.xor_fenwick",
         ["alternatives/xor_fenwick.pyx"],
-        include_dirs=[numpy.get_include()],
+        include_dirs=[numpy.get_include(), "."],
         extra_compile_args=c_args,
+        define_macros=macros,
+        language="c++",
     ),
     Extension(
         "alternatives.logistic_lh",
         ["alternatives/logistic_lh.pyx"],
-        include_dirs=[numpy.get_include()],
+        include_dirs=[numpy.get_include(), "."],
         extra_compile_args=c_args,
+        define_macros=macros,
+        language="c++",
     ),
     Extension(
         "alternatives.gaussian_lh",
         ["alternatives/gaussian_lh.pyx"],
-        include_dirs=[numpy.get_include()],
+        include_dirs=[numpy.get_include(), "."],
         extra_compile_args=c_args,
+        define_macros=macros,
         language="c++",
     ),
     Extension(
         "alternatives.slope_lh",
         ["alternatives/slope_lh.pyx"],
-        include_dirs=[numpy.get_include()],
+        include_dirs=[numpy.get_include(), "."],
         extra_compile_args=c_args,
+        define_macros=macros,
         language="c++",
     ),
     Extension(
         "alternatives.decay_lh",
         ["alternatives/decay_lh.pyx"],
-        include_dirs=[numpy.get_include()],
+        include_dirs=[numpy.get_include(), "."],
         extra_compile_args=c_args,
+        define_macros=macros,
         language="c++",
     ),
 ]
@@ -50,6 +65,7 @@ setup(
     name="Lehmerized Generator Alternatives",
     ext_modules=cythonize(
         extensions,
+        include_path=["."],
         compiler_directives={
             'boundscheck': False,
             'wraparound': False,
@@ -4,111 +4,96 @@
 import numpy as np
 cimport numpy as np
 import cython
-import math
-from libc.string cimport memmove
-from libc.stdlib cimport malloc, free
+import struct
+from libc.string cimport memcpy
 from libc.stdint cimport uint64_t
-from libcpp.random cimport mt19937_64, normal_distribution
+from lehmer_kernels cimport lh_ziggurat_init
+from lehmer_state cimport lh_dump_state, lh_load_state
+from lehmer_engine cimport lh_normal_source, lh_engine_init, lh_source_free, lh_source_alloc
+from lehmer_engine cimport lh_fill, lh_rank, lh_block_dump, lh_block_load
+from lehmer_engine cimport lh_trace, lh_debug_fill
+from lehmer_base cimport LehmerGenerator
+from libcpp.random cimport mt19937_64
 
 np.import_array()
+lh_ziggurat_init()
 
-cdef class GaussianLehmer:
-    cdef mt19937_64 rng
-    cdef normal_distribution[double] *dist
-    cdef double *window_buffer
-
-    cdef uint64_t *factorials
-    cdef int w
-    cdef int delta
-    cdef bint is_initialized
+# snapshot layout: tag, w, delta, minimum, maximum, is_initialized, engine text length,
+# number of values drawn ahead, followed by the window (w double), the engine text from
+# lh_dump_state and the values drawn ahead (double)
+SNAPSHOT = struct.Struct("<4siiqq?II")
+SNAPSHOT_TAG = b"GAU2"
 
-    cdef long long minimum
-    cdef long long maximum
-    cdef uint64_t r
-    cdef uint64_t thresh
+cdef class GaussianLehmer(LehmerGenerator):
+    cdef mt19937_64 rng
+    cdef lh_normal_source source
 
     def __cinit__(self, uint64_t seed, int w, int delta, long long minimum, long long maximum):
         if seed == 0: seed = 123456789
         self.rng = mt19937_64(seed)
-        self.dist = new normal_distribution[double](0.5, 0.15)
-
-        self.w = w
-        self.delta = delta if delta != 0 else w
+        self.source.rng = &self.rng
+        # Ziggurat normal deviates with mean 0.5 and standard deviation 0.15
+        self.source.mean = 0.5
+        self.source.sd = 0.15
 
         self.minimum = minimum
         self.maximum = maximum
-        self.r = <uint64_t> (self.maximum - self.minimum + 1)
-
-        cdef uint64_t R_val = math.factorial(self.w)
-        self.thresh = R_val - (R_val % self.r)
-
-        self.window_buffer = <double *> malloc(w * sizeof(double))
-        self.factorials = <uint64_t *> malloc(w * sizeof(uint64_t))
-
-        cdef int i
-        for i in range(w):
-            self.factorials[i] = math.factorial(w - i - 1)
-
-        self.is_initialized = 0
+        lh_engine_init(&self.engine, w, delta, minimum, maximum)
+        lh_source_alloc(&self.source, w)
 
     def __dealloc__(self):
-        if self.window_buffer: free(self.window_buffer)
-        if self.factorials: free(self.factorials)
-        if self.dist: del self.dist
-
-    @cython.boundscheck(False)
-    @cython.wraparound(False)
-    @cython.cdivision(True)
-    cpdef np.ndarray generate_chunk(self, int n, int debug):
-        cdef np.ndarray[np.uint64_t, ndim=1] results = np.empty(n, dtype=np.uint64)
-
-        cdef double *p_window = self.window_buffer
-        cdef uint64_t *p_factorials = self.factorials
-
-        cdef long long p_minimum = self.minimum
-        cdef uint64_t p_r = self.r
-        cdef uint64_t p_thresh = self.thresh
-        cdef int p_delta = self.delta
-        cdef int p_w = self.w
-
-        cdef int count = 0
-        cdef int i, j, k, u, smaller
-        cdef uint64_t lehmer
-        cdef double sum_val, d_val
-
-        if not self.is_initialized:
-            for i in range(self.w):
-                p_window[i] = self.dist[0](self.rng)
-            self.is_initialized = 1
-
-        while count < n:
-            if p_delta < p_w:
-                memmove(p_window, p_window + p_delta, (p_w - p_delta) * sizeof(double))
-
-            for k in range(p_w - p_delta, p_w):
-                p_window[k] = self.dist[0](self.rng)
-
-            lehmer = 0
-            for i in range(p_w):
-                smaller = 0
-                for j in range(i + 1, p_w):
-                    smaller += (p_window[j] < p_window[i])
-                lehmer += smaller * p_factorials[i]
-
-            if lehmer < p_thresh:
-                results[count] = (lehmer % p_r) + p_minimum
-                count += 1
-
-            if debug:
-                debug_digits = []
-                for i in range(p_w):
-                    s_debug = 0
-                    for j in range(i + 1, p_w):
-                        s_debug += (p_window[j] < p_window[i])
-                    debug_digits.append(s_debug)
-                current_window = [p_window[k] for k in range(p_w)]
-                print(f"Gaussian inputs: {current_window}")
-                print(f"Lehmer code: {lehmer}")
-                print("\n----------\n")
-
-        return results
\ No newline at end of file
+        lh_source_free(&self.source)
+
+    cdef Py_ssize_t fill(self, char *out, int itemsize, Py_ssize_t n) noexcept nogil:
+        return lh_fill(&self.engine, &self.source, out, itemsize, n, -1)
+
+    cdef object trace_windows(self, Py_ssize_t n):
+        return lh_trace(&self.engine, &self.source, n)
+
+    cdef int debug_fill(self, char *out, int itemsize, Py_ssize_t n) except -1:
+        return lh_debug_fill(&self.engine, &self.source, out, itemsize, n)
+
+    def snapshot(self):
+        """
+        Exports the complete stream position, including the current window, as compact bytes.
+        :return: bytes for restore or __setstate__
+        """
+        engine = lh_dump_state(self.rng)
+        ahead = lh_block_dump(&self.source)
+        return (SNAPSHOT.pack(SNAPSHOT_TAG, self.engine.w, self.engine.delta, self.minimum, self.maximum,
+                              self.engine.is_initialized, len(engine), len(ahead) // sizeof(double))
+                + (<char *> self.source.window)[:self.engine.w * sizeof(double)] + engine + ahead)
+
+    @staticmethod
+    def restore(data):
+        """
+        :param data: bytes from snapshot
+        :return: a new generator that continues exactly where the snapshotted one stopped
+        """
+        fields = SNAPSHOT.unpack_from(data)
+        generator = GaussianLehmer(0, fields[1], fields[2], fields[3], fields[4])
+        generator.__setstate__(data)
+        return generator
+
+    def __setstate__(self, data):
+        cdef const char *raw
+        cdef Py_ssize_t offset = SNAPSHOT.size
+        cdef int w = self.engine.w
+        data = bytes(data)
+        cdef mt19937_64 rng = self.rng
+        tag, w_, delta, minimum, maximum, is_initialized, engine_len, ahead = SNAPSHOT.unpack_from(data)
+        if (tag != SNAPSHOT_TAG or (w_, delta, minimum, maximum) != (w, self.engine.delta, self.minimum, self.maximum)
+                or len(data) != offset + (w + ahead) * sizeof(double) + engine_len):
+            raise ValueError("snapshot does not belong to a GaussianLehmer with these parameters")
+        raw = data
+        engine_start = offset + w * sizeof(double)
+        ahead_start = engine_start + engine_len
+        if not lh_load_state(rng, data[engine_start:ahead_start]):
+            raise ValueError("snapshot holds an unreadable random engine state")
+        lh_block_load(&self.source, data[ahead_start:])
+        self.rng = rng
+        self.engine.is_initialized = is_initialized
+        memcpy(self.source.window, raw + offset, w * sizeof(double))
+        # the digits are not part of the snapshot, rebuild them for incremental ranking
+        if is_initialized:
+            lh_rank(&self.engine, &self.source)
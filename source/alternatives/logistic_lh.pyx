@@ -1,32 +1,26 @@
-# distutils: language=c
+# distutils: language=c++
 # cython: language_level=3
 
 import numpy as np
 cimport numpy as np
 import cython
-import math
-from libc.string cimport memmove
-from libc.stdlib cimport malloc, free
+import struct
+from libc.string cimport memcpy
 from libc.stdint cimport uint64_t
+from lehmer_engine cimport lh_logistic_source, lh_engine_init, lh_source_free, lh_source_alloc
+from lehmer_engine cimport lh_fill, lh_rank
+from lehmer_engine cimport lh_trace, lh_debug_fill
+from lehmer_base cimport LehmerGenerator
 
 np.import_array()
 
-cdef class LogisticLehmer:
-    cdef double state
-    cdef double weyl_state
-    cdef double weyl_constant
+# snapshot layout: tag, w, delta, minimum, maximum, state, weyl_state, is_initialized,
+# followed by the window (w double)
+SNAPSHOT = struct.Struct("<4siiqqdd?")
+SNAPSHOT_TAG = b"LOG1"
 
-    cdef double *window_buffer
-
-    cdef uint64_t *factorials
-    cdef int w
-    cdef int delta
-    cdef bint is_initialized
-
-    cdef long long minimum
-    cdef long long maximum
-    cdef uint64_t r
-    cdef uint64_t thresh
+cdef class LogisticLehmer(LehmerGenerator):
+    cdef lh_logistic_source source
 
     def __cinit__(self, uint64_t seed, int w, int delta, long long minimum, long long maximum):
         """
@@ -35,117 +29,64 @@ cdef class LogisticLehmer:
         Map: x = 4.0 * x * (1 - x)
         """
         # normalize integer seed, multiply by 2^-64 to map full uint64 range to [0,1]
-        self.state = <double> seed * 5.42101086242752217E-20
+        self.source.state = <double> seed * 5.42101086242752217E-20
 
         # Weyl Sequence, minimal fix for stuck states
         # golden ratio fractional part: (sqrt(5)-1)/2
-        self.weyl_constant = 0.618033988749895
-        self.weyl_state = self.state
-
-        self.w = w
-        self.delta = delta if delta != 0 else w
+        self.source.weyl_constant = 0.618033988749895
+        self.source.weyl = self.source.state
 
         self.minimum = minimum
         self.maximum = maximum
-        self.r = <uint64_t> (self.maximum - self.minimum + 1)
-
-        cdef uint64_t R_val = math.factorial(self.w)
-        self.thresh = R_val - (R_val % self.r)
-
-        self.window_buffer = <double *> malloc(w * sizeof(double))
-        self.factorials = <uint64_t *> malloc(w * sizeof(uint64_t))
-
-        cdef int i
-        for i in range(w):
-            self.factorials[i] = math.factorial(w - i - 1)
-
-        self.is_initialized = 0
+        lh_engine_init(&self.engine, w, delta, minimum, maximum)
+        lh_source_alloc(&self.source, w)
 
     def __dealloc__(self):
-        if self.window_buffer: free(self.window_buffer)
-        if self.factorials: free(self.factorials)
-
-    @cython.boundscheck(False)
-    @cython.wraparound(False)
-    @cython.cdivision(True)
-    cpdef np.ndarray generate_chunk(self, int n, int debug):
-        cdef np.ndarray[np.uint64_t, ndim=1] results = np.empty(n, dtype=np.uint64)
-
-        # Pin variables
-        cdef double p_state = self.state
-        cdef double p_weyl = self.weyl_state
-        cdef double p_const = self.weyl_constant
-        cdef double *p_window = self.window_buffer
-        cdef uint64_t *p_factorials = self.factorials
-
-        cdef long long p_minimum = self.minimum
-        cdef uint64_t p_r = self.r
-        cdef uint64_t p_thresh = self.thresh
-        cdef int p_delta = self.delta
-        cdef int p_w = self.w
-
-        cdef int count = 0
-        cdef int i, j, k, smaller
-        cdef uint64_t lehmer
-
-        if not self.is_initialized:
-            for i in range(self.w):
-                # Logistic Step
-                p_state = 4.0 * p_state * (1.0 - p_state)
-                # weyl Update
-                p_weyl += p_const
-                if p_weyl >= 1.0: p_weyl -= 1.0
+        lh_source_free(&self.source)
 
-                p_state += (p_weyl * 1e-12)
-                if p_state >= 1.0: p_state -= 1.0
+    cdef Py_ssize_t fill(self, char *out, int itemsize, Py_ssize_t n) noexcept nogil:
+        return lh_fill(&self.engine, &self.source, out, itemsize, n, -1)
 
-                p_window[i] = p_state
-            self.is_initialized = 1
+    cdef object trace_windows(self, Py_ssize_t n):
+        return lh_trace(&self.engine, &self.source, n)
 
-        while count < n:
-            if p_delta < p_w:
-                memmove(p_window, p_window + p_delta, (p_w - p_delta) * sizeof(double))
+    cdef int debug_fill(self, char *out, int itemsize, Py_ssize_t n) except -1:
+        return lh_debug_fill(&self.engine, &self.source, out, itemsize, n)
 
-            for k in range(p_w - p_delta, p_w):
-                # Logistic Step
-                p_state = 4.0 * p_state * (1.0 - p_state)
-
-                # Weyl update
-                p_weyl += p_const
-                if p_weyl >= 1.0: p_weyl -= 1.0
-
-                # Perturb
-                p_state += (p_weyl * 1e-12)
-                if p_state >= 1.0: p_state -= 1.0
-
-                p_window[k] = p_state
-
-            lehmer = 0
-            for i in range(p_w):
-                smaller = 0
-                for j in range(i + 1, p_w):
-                    smaller += (p_window[j] < p_window[i])
-                lehmer += smaller * p_factorials[i]
-
-            if lehmer < p_thresh:
-                results[count] = (lehmer % p_r) + p_minimum
-                count += 1
-
-            if debug:
-                debug_digits = []
-                for i in range(p_w):
-                    s_debug = 0
-                    for j in range(i + 1, p_w):
-                        s_debug += (p_window[j] < p_window[i])
-                    debug_digits.append(s_debug)
-
-                current_window = [p_window[k] for k in range(p_w)]
-                print(f"Base sequence: {current_window}")
-                print(f"State: {p_state}")
-                print(f"Lehmer digits: {debug_digits}")
-                print(f"Lehmer code: {lehmer}")
-                print("\n----------\n")
+    def snapshot(self):
+        """
+        Exports the complete stream position, including the current window, as compact bytes.
+        :return: bytes for restore or __setstate__
+        """
+        return (SNAPSHOT.pack(SNAPSHOT_TAG, self.engine.w, self.engine.delta, self.minimum, self.maximum,
+                              self.source.state, self.source.weyl, self.engine.is_initialized)
+                + (<char *> self.source.window)[:self.engine.w * sizeof(double)])
 
-        self.state = p_state
-        self.weyl_state = p_weyl
-        return results
\ No newline at end of file
+    @staticmethod
+    def restore(data):
+        """
+        :param data: bytes from snapshot
+        :return: a new generator that continues exactly where the snapshotted one stopped
+        """
+        fields = SNAPSHOT.unpack_from(data)
+        generator = LogisticLehmer(0, fields[1], fields[2], fields[3], fields[4])
+        generator.__setstate__(data)
+        return generator
+
+    def __setstate__(self, data):
+        cdef const char *raw
+        cdef Py_ssize_t offset = SNAPSHOT.size
+        cdef int w = self.engine.w
+        data = bytes(data)
+        tag, w_, delta, minimum, maximum, state, weyl_state, is_initialized = SNAPSHOT.unpack_from(data)
+        if (tag != SNAPSHOT_TAG or (w_, delta, minimum, maximum) != (w, self.engine.delta, self.minimum, self.maximum)
+                or len(data) != offset + w * <Py_ssize_t> sizeof(double)):
+            raise ValueError("snapshot does not belong to a LogisticLehmer with these parameters")
+        raw = data
+        self.source.state = state
+        self.source.weyl = weyl_state
+        self.engine.is_initialized = is_initialized
+        memcpy(self.source.window, raw + offset, w * sizeof(double))
+        # the digits are not part of the snapshot, rebuild them for incremental ranking
+        if is_initialized:
+            lh_rank(&self.engine, &self.source)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Chooses the window size and rank kernel that give the fastest accepted outputs for a range.
+
+A window of size w costs the source draws plus the ranking: about w^2 / 2 comparisons for the
+naive kernel or the compare-exchanges of a sorting network for the network kernel (LcgFenwick and
+XorFenwick, which despite their names hold no Fenwick tree). Both kernels rank overlapping windows
+incrementally, comparing only the values that enter with the ones that stay, so they only differ for
+non-overlapping windows.
+A window is accepted with probability thresh / w!, where thresh = w! - w! % r, so the time per
+output is window_cost / (thresh / w!). A larger w costs more per window but can waste fewer of them.
+
+The per-window cost is a linear model whose coefficients are fitted to timings on this machine.
+The calibration is cached as JSON (~/.cache/lehmer/autotune.json, or $LEHMER_AUTOTUNE_CACHE) and
+redone when the cache was written on another machine or for another version of the model.
+"""
+import argparse
+import importlib
+import json
+import math
+import os
+import platform
+import time
+
+import numpy as np
+
+KERNELS = ('naive', 'network')
+
+# generator classes per source family and kernel
+FAMILIES = {
+    'lcg': {'naive': ('c_lcg_lh', 'LcgLehmer'), 'network': ('alternatives.lcg_fenwick', 'LcgFenwick')},
+    'xor': {'naive': ('xor_lh', 'XorLehmer'), 'network': ('alternatives.xor_fenwick', 'XorFenwick')},
+}
+
+# window sizes and deltas timed by calibrate
+CALIBRATION_W = (4, 6, 8, 10, 12, 14, 16, 18, 20)
+CALIBRATION_DELTA = (0, 1)
+
+MAX_W = 20
+
+# bumped whenever the features or the kernels they time change, so older cached coefficients are
+# fitted again
+MODEL_VERSION = 4
+
+CACHE_PATH = os.environ.get("LEHMER_AUTOTUNE_CACHE",
+                            os.path.join(os.path.expanduser("~"), ".cache", "lehmer", "autotune.json"))
+
+
+def comparisons(w, delta):
+    """
+    Comparisons the naive kernel makes per window, counting the incremental update of overlapping windows
+    """
+    if delta == 0 or delta >= w:
+        return w * (w - 1) // 2
+    return (w - delta) * delta + delta * (delta - 1) // 2
+
+
+def network_size(w):
+    """
+    Compare-exchanges of Batcher's odd-even merge sort network for w values, as in lh_rank_network_u64
+    and the unrolled kernels of lehmer_network.h
+    """
+    size = 0
+    p = 1
+    while p < w:
+        k = p
+        while k >= 1:
+            for j in range(k % p, w - k, 2 * k):
+                for i in range(min(k - 1, w - j - k - 1) + 1):
+                    if (i + j) // (p * 2) == (i + j + k) // (p * 2):
+                        size += 1
+            k //= 2
+        p += p
+    return size
+
+
+def features(kernel, w, delta):
+    """
+    Terms of the per-window cost model: fixed cost, source draws, window length and ranking work
+    """
+    draws = w if delta == 0 else delta
+    if kernel == 'naive' or 0 < delta < w:
+        return [1.0, draws, w, comparisons(w, delta)]
+    return [1.0, draws, w, network_size(w)]
+
+
+def acceptance(w, r):
+    """
+    Fraction of windows of size w whose code falls below the rejection threshold for r outputs
+    """
+    R = math.factorial(w)
+    return (R - R % r) / R
+
+
+def window_cost(coefficients, kernel, w, delta):
+    """
+    Predicted nanoseconds per window
+    """
+    return float(np.dot(coefficients[kernel], features(kernel, w, delta)))
+
+
+def output_cost(coefficients, kernel, w, delta, r):
+    """
+    Predicted nanoseconds per accepted output, inf when w! < r
+    """
+    accepted = acceptance(w, r)
+    if accepted == 0:
+        return math.inf
+    return window_cost(coefficients, kernel, w, delta) / accepted
+
+
+def _fit_nonnegative(X, y):
+    # least squares, dropping terms that come out negative until all are >= 0
+    active = list(range(X.shape[1]))
+    while True:
+        solution, *_ = np.linalg.lstsq(X[:, active], y, rcond=None)
+        if (solution >= 0).all():
+            break
+        del active[int(np.argmin(solution))]
+    coefficients = np.zeros(X.shape[1])
+    coefficients[active] = solution
+    return coefficients
+
+
+def _time_window(cls, w, delta, samples):
+    # maximum = w! - 1 accepts every window, so the time per output is the time per window
+    generator = cls(123456789, w, delta, 0, math.factorial(w) - 1)
+    generator.generate_chunk(1000, 0)
+    best = math.inf
+    for _ in range(3):
+        start = time.perf_counter()
+        generator.generate_chunk(samples, 0)
+        best = min(best, time.perf_counter() - start)
+    return best / samples * 1e9
+
+
+def calibrate(family='lcg', samples=100_000):
+    """
+    Times both kernels of a source family and fits the cost model
+    :param family: 'lcg' or 'xor'
+    :param samples: windows per timing
+    :return: {kernel: coefficients} for window_cost
+    """
+    coefficients = {}
+    for kernel in KERNELS:
+        module, name = FAMILIES[family][kernel]
+        cls = getattr(importlib.import_module(module), name)
+        rows, times = [], []
+        for w in CALIBRATION_W:
+            for delta in CALIBRATION_DELTA:
+                rows.append(features(kernel, w, delta))
+                times.append(_time_window(cls, w, delta, samples))
+        coefficients[kernel] = _fit_nonnegative(np.array(rows), np.array(times)).tolist()
+    return coefficients
+
+
+def _machine():
+    return {"node": platform.node(), "machine": platform.machine(), "processor": platform.processor(),
+            "cpus": os.cpu_count()}
+
+
+def calibration(family='lcg', path=None, refresh=False):
+    """
+    Cost model coefficients for this machine, calibrated on first use and cached on disk
+    :param path: cache file, defaults to CACHE_PATH
+    :param refresh: calibrate again even if the cache holds a result
+    """
+    path = path or CACHE_PATH
+    cache = {}
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+
+    entry = cache.get(family)
+    if (refresh or entry is None or entry.get("machine") != _machine()
+            or entry.get("model") != MODEL_VERSION):
+        entry = {"machine": _machine(), "model": MODEL_VERSION, "coefficients": calibrate(family)}
+        cache[family] = entry
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(path + ".tmp", path)
+    return entry["coefficients"]
+
+
+def candidates(minimum, maximum, delta=0, family='lcg', kernels=KERNELS, coefficients=None):
+    """
+    Every usable (w, kernel) with its predicted nanoseconds per output, fastest first
+    :param minimum: inclusive
+    :param maximum: inclusive
+    :param delta: steps to take between windows. delta=0 is the same as delta=w
+    """
+    coefficients = coefficients or calibration(family)
+    r = maximum - minimum + 1
+    ranked = []
+    for w in range(max(2, delta), MAX_W + 1):
+        if math.factorial(w) < r:
+            continue
+        for kernel in kernels:
+            ranked.append((output_cost(coefficients, kernel, w, delta, r), w, kernel))
+    if not ranked:
+        raise ValueError(f"range [{minimum}, {maximum}] needs w! >= {r}, more than w = {MAX_W} provides")
+    ranked.sort()
+    return [(w, kernel, cost) for cost, w, kernel in ranked]
+
+
+def best_window(minimum, maximum, delta=0, family='lcg', kernels=KERNELS):
+    """
+    Fastest window size and kernel for outputs in [minimum, maximum]
+    :param delta: steps to take between windows. delta=0 is the same as delta=w
+    :param family: source family the generator is built from, 'lcg' or 'xor'
+    :param kernels: kernels to choose from
+    :return: (w, kernel), kernel is 'naive' or 'network'
+    """
+    w, kernel, _ = candidates(minimum, maximum, delta, family, kernels)[0]
+    return w, kernel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predicted cost per output for every window size and kernel.")
+    parser.add_argument("minimum", type=int, help="inclusive")
+    parser.add_argument("maximum", type=int, help="inclusive")
+    parser.add_argument("--delta", type=int, default=0, help="steps between windows, 0 for non-overlapping")
+    parser.add_argument("--family", choices=list(FAMILIES), default='lcg', help="source family")
+    parser.add_argument("--refresh", action="store_true", help="calibrate again instead of using the cache")
+    args = parser.parse_args()
+
+    coefficients = calibration(args.family, refresh=args.refresh)
+    print("w\tkernel\tns/output")
+    for w, kernel, cost in candidates(args.minimum, args.maximum, args.delta, args.family,
+                                      coefficients=coefficients):
+        print(f"{w}\t{kernel}\t{cost:.1f}")
+
+
+if __name__ == "__main__":
+    main()
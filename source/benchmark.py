@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Lehmer generators and a few reference generators.
+
+Every case builds one generator and times single generate_into calls on a preallocated uint32 buffer
+(uint64 when the range does not fit) of `chunk` numbers: `warmup` untimed calls, then `repeat` timed ones. It reports the median (p50),
+the 99th percentile (p99) and the mean of the call latency in ns per output, and the throughput at
+the median. The pipe cases time the testing_interface pipe path end to end, the generating thread,
+the raw uint32 encoding and the write, into a null sink; their latency is the time between two
+written chunks.
+
+The process is pinned to one CPU (when the platform allows it) and the garbage collector is off while
+timing. Results are written as JSON so that runs, e.g. before and after a commit, can be diffed:
+
+    python3 benchmark.py run --json before.json
+    python3 benchmark.py run --json after.json
+    python3 benchmark.py compare before.json after.json
+
+Generators are named like testing_interface's --algo, with ':option' to switch on an attribute,
+e.g. lcg:lut, lcg:extract or wlcg:merge.
+"""
+import argparse
+import gc
+import importlib
+import itertools
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from pipeline import Pipeline, splitmix64
+
+GENERATORS = {
+    'lcg': ('c_lcg_lh', 'LcgLehmer'),
+    'xor': ('xor_lh', 'XorLehmer'),
+    'lfw': ('alternatives.lcg_fenwick', 'LcgFenwick'),
+    'xfw': ('alternatives.xor_fenwick', 'XorFenwick'),
+    'log': ('alternatives.logistic_lh', 'LogisticLehmer'),
+    'gau': ('alternatives.gaussian_lh', 'GaussianLehmer'),
+    'slp': ('alternatives.slope_lh', 'SlopeLehmer'),
+    'dec': ('alternatives.decay_lh', 'DecayLehmer'),
+    'cry': ('crypto.crypto_lh', 'CryptoLehmer'),
+    'wlcg': ('wide_lh', 'WideLcgLehmer'),
+    'wxor': ('wide_lh', 'WideXorLehmer'),
+}
+
+# reference generators without a window, timed once per chunk size
+BASELINES = ('pcg64', 'mt19937', 'urandom')
+
+# generator attributes switched on by name:option
+OPTIONS = {'lut': 'lut', 'extract': 'extract', 'merge': 'merge_sort', 'incremental': 'incremental'}
+
+# output ranges, 'perm' accepts every window (maximum = w! - 1)
+RANGES = {'full': (0, 2 ** 32 - 1), 'small': (0, 719), 'perm': None}
+
+WIDE = ('wlcg', 'wxor')
+
+DEFAULTS = {
+    'generators': ['lcg', 'xor', 'lfw', 'xfw', 'log', 'gau', 'slp', 'dec', 'cry', 'wlcg', 'wxor'],
+    'w': [8, 14, 20],
+    'delta': [0, 1],
+    'ranges': ['full', 'small'],
+    'chunks': [8192],
+    'wide_w': [21, 28, 34],
+    'pipe': ['lcg', 'xor', 'wlcg'],
+}
+
+QUICK = {
+    'generators': ['lcg', 'xor', 'lfw', 'cry', 'wlcg'],
+    'w': [14],
+    'delta': [0, 1],
+    'ranges': ['full'],
+    'chunks': [8192],
+    'wide_w': [34],
+    'pipe': ['lcg'],
+}
+
+
+class NumpyBaseline:
+    def __init__(self, bit_generator):
+        self.rng = np.random.Generator(bit_generator)
+
+    def generate_into(self, out):
+        out[:] = self.rng.integers(0, 2 ** 32, size=len(out), dtype=np.uint32)
+        return out
+
+
+class UrandomBaseline:
+    # operating system CSPRNG
+    def generate_into(self, out):
+        out[:] = np.frombuffer(os.urandom(out.nbytes), dtype=out.dtype)
+        return out
+
+
+def make(spec, seed, w, delta, minimum, maximum):
+    """
+    Builds a generator from its name
+    :param spec: generator name, optionally with ':option'
+    :param seed: seed, spread over the five states of the crypto generator
+    """
+    name, _, option = spec.partition(':')
+    if name == 'pcg64':
+        return NumpyBaseline(np.random.PCG64(seed))
+    if name == 'mt19937':
+        return NumpyBaseline(np.random.MT19937(seed))
+    if name == 'urandom':
+        return UrandomBaseline()
+
+    module, cls = GENERATORS[name]
+    cls = getattr(importlib.import_module(module), cls)
+    if name in WIDE:
+        generator = cls(seed, w, delta)
+    elif name == 'cry':
+        states = np.array([splitmix64(seed, i) for i in range(5)], dtype=np.uint64)
+        generator = cls(states, w, delta, minimum, maximum)
+    else:
+        generator = cls(seed, w, delta, minimum, maximum)
+    if option:
+        setattr(generator, OPTIONS[option], True)
+    return generator
+
+
+def _summary(samples, chunk):
+    # samples in ns per call
+    p50, p99 = np.percentile(samples, [50, 99])
+    return {
+        "p50_ns": p50 / chunk,
+        "p99_ns": p99 / chunk,
+        "mean_ns": float(np.mean(samples)) / chunk,
+        "outputs_per_s": chunk / p50 * 1e9,
+    }
+
+
+def time_calls(generator, chunk, repeat, warmup, dtype=np.uint32):
+    """
+    :param dtype: buffer type, uint64 for outputs that do not fit in 32 bits
+    :return: latency of repeat generate_into calls of chunk numbers, in ns per call
+    """
+    buffer = np.empty(chunk, dtype=dtype)
+    for _ in range(warmup):
+        generator.generate_into(buffer)
+    samples = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter_ns()
+        generator.generate_into(buffer)
+        samples[i] = time.perf_counter_ns() - start
+    return samples
+
+
+def time_pipe(generator, chunk, repeat, warmup, dtype=np.uint32):
+    """
+    :return: time between two chunks written by a testing_interface Pipeline to a null sink, in ns
+    """
+    with open(os.devnull, 'wb') as sink:
+        pipeline = Pipeline(generator.generate_into, chunk, 4, out=sink)
+        samples = np.empty(repeat)
+        previous = None
+        for i, _ in enumerate(pipeline.run((warmup + repeat + 1) * chunk)):
+            now = time.perf_counter_ns()
+            if i > warmup:
+                samples[i - warmup - 1] = now - previous
+            previous = now
+    return samples
+
+
+def cases(config):
+    """
+    Every (kind, generator, w, delta, range, chunk) of the grid that can produce outputs
+    """
+    windowed = [spec for spec in config['generators'] if spec.partition(':')[0] not in WIDE]
+    wide = [spec for spec in config['generators'] if spec.partition(':')[0] in WIDE]
+    for spec, w, delta, range_name, chunk in itertools.product(
+            windowed, config['w'], config['delta'], config['ranges'], config['chunks']):
+        if delta > w or (RANGES[range_name] is not None and RANGES[range_name][1] + 1 > math.factorial(w)):
+            # a range larger than w! would never accept a window
+            continue
+        yield 'call', spec, w, delta, range_name, chunk
+    # the wide generators always give full 32-bit words
+    for spec, w, delta, chunk in itertools.product(wide, config['wide_w'], config['delta'], config['chunks']):
+        yield 'call', spec, w, delta, 'full', chunk
+    for spec, chunk in itertools.product(BASELINES, config['chunks']):
+        yield 'call', spec, 0, 0, 'full', chunk
+    for spec in config['pipe']:
+        yield 'pipe', spec, max(config['wide_w']) if spec.partition(':')[0] in WIDE else 14, 0, 'full', 8192
+
+
+def case_key(kind, spec, w, delta, range_name, chunk):
+    return f"{kind}/{spec}/w={w}/delta={delta}/{range_name}/chunk={chunk}"
+
+
+def pin(cpu):
+    """
+    Pins the process to one CPU, the first one it may run on by default
+    :return: the CPU, None when the platform cannot pin
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return None
+    if cpu is None:
+        cpu = min(os.sched_getaffinity(0))
+    os.sched_setaffinity(0, {cpu})
+    return cpu
+
+
+def _commit():
+    try:
+        root = os.path.dirname(os.path.abspath(__file__))
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(config, repeat, warmup, cpu=None, seed=123456789, log=sys.stderr):
+    """
+    Times every case of the grid
+    :param config: grid, see DEFAULTS
+    :param cpu: CPU to pin to, None for the first allowed one, -1 to not pin
+    :return: {"meta": ..., "results": [...]}, the results in the order they ran
+    """
+    pinned = None if cpu == -1 else pin(cpu)
+    results = []
+    gc.disable()
+    try:
+        for kind, spec, w, delta, range_name, chunk in cases(config):
+            minimum, maximum = RANGES[range_name] or (0, math.factorial(w) - 1)
+            try:
+                generator = make(spec, seed, w, delta, minimum, maximum)
+            except ValueError as e:
+                # e.g. lookup tables for a window that is too large
+                print(f"{case_key(kind, spec, w, delta, range_name, chunk):<50} skipped: {e}", file=log)
+                continue
+            timer = time_pipe if kind == 'pipe' else time_calls
+            dtype = np.uint32 if maximum < 2 ** 32 else np.uint64
+            result = {"case": case_key(kind, spec, w, delta, range_name, chunk), "kind": kind, "generator": spec,
+                      "w": w, "delta": delta, "minimum": minimum, "maximum": maximum, "chunk": chunk}
+            result.update(_summary(timer(generator, chunk, repeat, warmup, dtype), chunk))
+            results.append(result)
+            print(f"{result['case']:<50} p50 {result['p50_ns']:8.1f}  p99 {result['p99_ns']:8.1f} ns/output",
+                  file=log)
+            log.flush()
+    finally:
+        gc.enable()
+
+    meta = {
+        "commit": _commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "node": platform.node(),
+        "cpus": os.cpu_count(),
+        "pinned_cpu": pinned,
+        "repeat": repeat,
+        "warmup": warmup,
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(old, new, threshold=0.05, metric="p50_ns", out=sys.stdout):
+    """
+    Prints the change of every case present in both runs
+    :param old: results of run (or the loaded JSON)
+    :param threshold: relative slowdown reported as a regression
+    :return: keys of the cases that regressed
+    """
+    before = {r["case"]: r for r in old["results"]}
+    after = {r["case"]: r for r in new["results"]}
+    print(f"old: {old['meta'].get('commit')}  new: {new['meta'].get('commit')}  ({metric})", file=out)
+    print(f"{'case':<50} {'old':>9} {'new':>9} {'change':>8}", file=out)
+    regressions = []
+    for key in before:
+        if key not in after:
+            continue
+        a, b = before[key][metric], after[key][metric]
+        change = b / a - 1
+        flag = ""
+        if change > threshold:
+            flag = "REGRESSION"
+            regressions.append(key)
+        elif change < -threshold:
+            flag = "faster"
+        print(f"{key:<50} {a:9.1f} {b:9.1f} {100 * change:+7.1f}% {flag}", file=out)
+    for key in before.keys() - after.keys():
+        print(f"{key:<50} only in old", file=out)
+    for key in after.keys() - before.keys():
+        print(f"{key:<50} only in new", file=out)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite for the Lehmer generators.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="time the grid of cases")
+    run_parser.add_argument("--quick", action="store_true", help="small grid, for a quick check")
+    run_parser.add_argument("--generators", nargs="+", help="generator names, with ':option' for "
+                                                            f"{', '.join(OPTIONS)} (baselines always run)")
+    run_parser.add_argument("--w", type=int, nargs="+", help="window sizes")
+    run_parser.add_argument("--delta", type=int, nargs="+", help="steps between windows, 0 for non-overlapping")
+    run_parser.add_argument("--ranges", nargs="+", choices=list(RANGES), help="output ranges")
+    run_parser.add_argument("--chunks", type=int, nargs="+", help="numbers per generate_into call")
+    run_parser.add_argument("--wide-w", type=int, nargs="+", help="window sizes of wlcg and wxor")
+    run_parser.add_argument("--pipe", nargs="*", help="generators timed through the pipe path")
+    run_parser.add_argument("--repeat", type=int, default=100, help="timed calls per case")
+    run_parser.add_argument("--warmup", type=int, default=5, help="untimed calls before timing")
+    run_parser.add_argument("--cpu", type=int, help="CPU to pin to (default: first allowed one, -1: no pinning)")
+    run_parser.add_argument("--json", help="write the results to this file")
+
+    compare_parser = commands.add_parser("compare", help="diff two JSON results")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.05,
+                                help="relative slowdown reported as a regression (default 0.05)")
+    compare_parser.add_argument("--metric", choices=["p50_ns", "p99_ns", "mean_ns"], default="p50_ns")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        regressions = compare(old, new, args.threshold, args.metric)
+        sys.exit(1 if regressions else 0)
+
+    config = dict(QUICK if args.quick else DEFAULTS)
+    for key in ('generators', 'w', 'delta', 'ranges', 'chunks', 'wide_w', 'pipe'):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+
+    results = run(config, args.repeat, args.warmup, args.cpu)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
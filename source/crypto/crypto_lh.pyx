@@ -1,171 +1,123 @@
-# distutils: language=c
+# distutils: language=c++
 # cython: language_level=3
 
 import numpy as np
 cimport numpy as np
 import cython
-import math
-from libc.string cimport memmove
-from libc.stdlib cimport malloc, free
+import struct
+from libc.string cimport memcpy
 from libc.stdint cimport uint64_t
+from lehmer_kernels cimport lh_xorshift64_jump_init
+from lehmer_engine cimport lh_arx_source, lh_engine_init, lh_source_free, lh_source_alloc
+from lehmer_engine cimport lh_fill, lh_source_jump
+from lehmer_engine cimport lh_trace, lh_debug_fill
+from lehmer_base cimport LehmerGenerator
 
 np.import_array()
+lh_xorshift64_jump_init()
 
-cdef inline uint64_t xorshift64_step(uint64_t x) nogil:
-    x ^= x << 13
-    x ^= x >> 7
-    x ^= x << 17
-    return x
-
-cdef inline uint64_t rotate_left(uint64_t number, int r) nogil:
-    return (number << (r & 63)) | (number >> (64 - (r & 63)))
-
-cdef inline uint64_t mix_arx(uint64_t *states) nogil:
-    cdef uint64_t s1 = states[1]
-    cdef uint64_t s2 = states[2]
-    cdef uint64_t s3 = states[3]
-    cdef uint64_t s4 = states[4]
-
-    s1 = s1 + s2
-    s4 = s4 ^ s1
-    s4 = rotate_left(s4, 24)  # tested from rotation_amount
-
-    s3 = s3 + s4
-    s2 = s2 ^ s3
-    s2 = rotate_left(s2, 12)
-
-    s1 = s1 + s2
-    s4 = s4 ^ s1
-    s4 = rotate_left(s4, 8)
-
-    s3 = s3 + s4
-    s2 = s2 ^ s3
-    s2 = rotate_left(s2, 7)
-
-    return s1 ^ s2 ^ s3 ^ s4
-
-cdef class CryptoLehmer:
-    cdef uint64_t *states
-    cdef uint64_t *window_buffer
-    cdef uint64_t *factorials
-    cdef int w
-    cdef int delta
-    cdef bint is_initialized
-
-    cdef long long minimum
-    cdef long long maximum
-    cdef long long r
-    cdef uint64_t R
-    cdef uint64_t thresh
+# snapshot layout: tag, w, delta, minimum, maximum, the five states, is_initialized, incremental,
+# followed by the window (w uint64) and the Lehmer digits (w int)
+SNAPSHOT = struct.Struct("<4siiqq5Q??")
+SNAPSHOT_TAG = b"CRY1"
 
-    def __cinit__(self, uint64_t[::1] states, int w, int delta, long long minimum, long long maximum):
-        # Check for zero-state in the seed
-        if states[1] == 0: states[1] = 123456789
-
-        self.states = &states[0]
-
-        self.w = w
+cdef class CryptoLehmer(LehmerGenerator):
+    cdef uint64_t[::1] states_view
+    cdef lh_arx_source source
 
-        # fully non-overlapping
-        if delta == 0:
-            self.delta = w
-        else:
-            self.delta = delta
+    def __cinit__(self, uint64_t[::1] states, int w, int delta, long long minimum, long long maximum):
+        # the generator steps its own copy, the caller's array is left untouched
+        self.states_view = np.array(states, dtype=np.uint64)
+        self.source.states = &self.states_view[0]
 
-        self.is_initialized = 0
+        # Check for zero-state in the seed
+        if self.source.states[1] == 0: self.source.states[1] = 123456789
 
         self.minimum = minimum
         self.maximum = maximum
-        self.r = self.maximum - self.minimum + 1
-        self.R = math.factorial(self.w)
-        self.thresh = self.R - (self.R % self.r)
-
-        self.window_buffer = <uint64_t *> malloc(w * sizeof(uint64_t))
-        self.factorials = <uint64_t *> malloc(w * sizeof(uint64_t))
-
-        cdef int i
-        for i in range(w):
-            self.factorials[i] = math.factorial(w - i - 1)
+        lh_engine_init(&self.engine, w, delta, minimum, maximum)
+        lh_source_alloc(&self.source, w)
 
     def __dealloc__(self):
-        if self.window_buffer: free(self.window_buffer)
-        if self.factorials: free(self.factorials)
-
-    @cython.boundscheck(False)
-    @cython.wraparound(False)
-    cpdef np.ndarray generate_chunk(self, int n, int debug):
-        cdef np.ndarray[np.uint64_t, ndim=1] results = np.empty(n, dtype=np.uint64)
-        cdef int count = 0
-        cdef int i, j, k, smaller
-        cdef uint64_t lehmer
-        cdef uint64_t candidate_mix
-        cdef uint64_t clock_control
-        cdef int digits[32]
-
-        if not self.is_initialized:
-            for i in range(self.w):
-                for j in range(5):
-                    self.states[j] = xorshift64_step(self.states[j])
-                self.window_buffer[i] = mix_arx(self.states)
-            self.is_initialized = 1
-
-        # PINNED LOCAL VARIABLES
-        cdef uint64_t *p_states = self.states
-        cdef uint64_t p_thresh = self.thresh
-        cdef uint64_t  p_minimum = self.minimum
-        cdef uint64_t  p_r = self.r
-        cdef int p_w = self.w
-        cdef int p_delta = self.delta
-        cdef uint64_t *p_window = self.window_buffer
-        cdef uint64_t *p_factorials = self.factorials
-
-        while count < n:
-            if p_delta < p_w:
-                memmove(p_window,
-                        p_window + p_delta,
-                        (p_w - p_delta) * sizeof(uint64_t))
-
-            k = p_w - p_delta
-            while k < p_w: # must use while loop so continue doesnt update k automatically
-                for j in range(5):
-                    p_states[j] = xorshift64_step(p_states[j])
-
-                # If the top 2 bits are both 0 (prob 0.25), we discard this round.
-                clock_control = p_states[0] >> 62
-                if clock_control == 0:
-                    continue  # discard
-
-                p_window[k] = mix_arx(p_states)
-                k += 1
-
-            lehmer = 0
-            for i in range(p_w):
-                smaller = 0
-                for j in range(i + 1, p_w):
-                    smaller += (p_window[j] < p_window[i])
-                lehmer += smaller * p_factorials[i]
-
-            if lehmer < p_thresh:
-                results[count] = (lehmer % p_r) + p_minimum
-                count += 1
-
-            if debug:
-                debug_digits = []
-                for i in range(p_w):
-                    s_debug = 0
-                    for j in range(i + 1, p_w):
-                        s_debug += (p_window[j] < p_window[i])
-                    debug_digits.append(s_debug)
-                current_window = [p_window[k] for k in range(p_w)]
-                print(f"Base sequence: {current_window}")
-                for i in range(5):
-                    print(f"State[{i}]: {p_states[i]}")
-                print(f"Lehmer digits: {[digits[k] for k in range(p_w)]}")
-                print(f"Lehmer code: {lehmer} (valid? {lehmer < p_thresh})")
-                print(f"Lehmer code adjusted for range: {(lehmer % p_r) + p_minimum})")
-                print("\n----------\n")
-
-        # CRUCIAL, update persistent state
-        self.states = p_states
-
-        return results
\ No newline at end of file
+        lh_source_free(&self.source)
+
+    @property
+    def incremental(self):
+        """overlapping windows keep their per-position counts between slides"""
+        return self.engine.incremental
+
+    @incremental.setter
+    def incremental(self, bint value):
+        self.engine.incremental = value
+
+    cdef Py_ssize_t fill(self, char *out, int itemsize, Py_ssize_t n) noexcept nogil:
+        return lh_fill(&self.engine, &self.source, out, itemsize, n, -1)
+
+    cdef object trace_windows(self, Py_ssize_t n):
+        return lh_trace(&self.engine, &self.source, n)
+
+    cdef int debug_fill(self, char *out, int itemsize, Py_ssize_t n) except -1:
+        return lh_debug_fill(&self.engine, &self.source, out, itemsize, n)
+
+    def advance(self, uint64_t source_steps):
+        """
+        Skips source_steps rounds (kept or discarded by the clock control) of all five xorshift
+        states in O(log source_steps) and discards the current window,
+        so the next call starts a fresh window from the advanced states.
+        :param source_steps: number of rounds to skip
+        :return: self
+        """
+        lh_source_jump(&self.source, source_steps)
+        self.engine.is_initialized = 0
+        return self
+
+    def jumped(self, uint64_t source_steps):
+        """
+        :param source_steps: number of rounds to skip
+        :return: a copy of this generator (with its own state array) advanced by source_steps,
+                 this one is left unchanged
+        """
+        return CryptoLehmer(self.states_view, self.engine.w, self.engine.delta,
+                            self.minimum, self.maximum).advance(source_steps)
+
+    def snapshot(self):
+        """
+        Exports the complete stream position, including the current window, as compact bytes.
+        :return: bytes for restore or __setstate__
+        """
+        cdef int w = self.engine.w
+        return (SNAPSHOT.pack(SNAPSHOT_TAG, w, self.engine.delta, self.minimum, self.maximum,
+                              *[self.source.states[j] for j in range(5)],
+                              self.engine.is_initialized, self.engine.incremental)
+                + (<char *> self.source.window)[:w * sizeof(uint64_t)]
+                + (<char *> self.engine.digits)[:w * sizeof(int)])
+
+    @staticmethod
+    def restore(data):
+        """
+        :param data: bytes from snapshot
+        :return: a new generator that continues exactly where the snapshotted one stopped
+        """
+        fields = SNAPSHOT.unpack_from(data)
+        generator = CryptoLehmer(np.array(fields[5:10], dtype=np.uint64), fields[1], fields[2], fields[3], fields[4])
+        generator.__setstate__(data)
+        return generator
+
+    def __setstate__(self, data):
+        cdef const char *raw
+        cdef Py_ssize_t offset = SNAPSHOT.size
+        cdef int w = self.engine.w
+        data = bytes(data)
+        cdef int j
+        fields = SNAPSHOT.unpack_from(data)
+        tag, w_, delta, minimum, maximum = fields[:5]
+        if (tag != SNAPSHOT_TAG or (w_, delta, minimum, maximum) != (w, self.engine.delta, self.minimum, self.maximum)
+                or len(data) != offset + w * <Py_ssize_t> (sizeof(uint64_t) + sizeof(int))):
+            raise ValueError("snapshot does not belong to a CryptoLehmer with these parameters")
+        raw = data
+        for j in range(5):
+            self.source.states[j] = fields[5 + j]
+        self.engine.is_initialized = fields[10]
+        self.engine.incremental = fields[11]
+        memcpy(self.source.window, raw + offset, w * sizeof(uint64_t))
+        memcpy(self.engine.digits, raw + offset + w * sizeof(uint64_t), w * sizeof(int))
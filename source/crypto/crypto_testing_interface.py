@@ -1,37 +1,49 @@
 #!/usr/bin/env python3
+import os
 import sys
-import struct
 import time
 import argparse
+import functools
 import numpy as np
 
 import crypto_lh as crypto
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pipeline import Pipeline, Farm
+
 maximum = 2 ** 32 - 1
 chunk_size = 8192
 w = 14
 
 generator = None
 debug = False
+states = None
+workers = 1
+factory = None
+
+# buffers cycling between the generating and the writing thread
+ring_size = 4
 
 
-def output(expected):
+def fill(numbers):
     """
-    Outputs numbers to stdout
-    :return: the next seed
+    Fills numbers with the next len(numbers) outputs of the generator
     """
-    numbers = generator.generate_chunk(expected, debug)
+    if debug:
+        numbers[:] = generator.generate_chunk(len(numbers), debug)
+    else:
+        generator.generate_into(numbers)
 
-    if len(numbers) != expected:
-        print(f"[WARN] Expected {expected}, got {len(numbers)}", file=sys.stderr)
-        raise SystemExit(1)
 
-    sys.stdout.buffer.write(struct.pack('<{}I'.format(expected), *numbers))
+def make_generator(delta, states):
+    return crypto.CryptoLehmer(states, w, delta, 0, maximum)
 
-    if debug:
-        for num in numbers:
-            print(num, file=sys.stderr)
-    sys.stdout.flush()
+
+def new_pipeline():
+    if workers > 1:
+        return Farm(factory, states, workers, chunk_size)
+    # a single buffer keeps the debug output of each chunk next to its numbers
+    return Pipeline(fill, chunk_size, 1 if debug else ring_size, echo=debug)
 
 
 def pipe():
@@ -45,11 +57,10 @@ def pipe():
 
     chunks_sent = 0
     start_time = time.time()
+    pipeline = new_pipeline()
 
     try:
-        while True:
-            output(chunk_size)
-
+        for _ in pipeline.run():
             chunks_sent += 1
             if chunks_sent % 4000 == 0:
                 elapsed = time.time() - start_time
@@ -65,6 +76,7 @@ def pipe():
     except KeyboardInterrupt:
         print("\n--- Stream interrupted by user. Exiting. ---", file=sys.stderr)
         sys.stderr.flush()
+    pipeline.report()
 
 
 def main():
@@ -73,12 +85,19 @@ def main():
                         help="One 64-bit integer (will be expanded) or exactly five 64-bit integers.")
     parser.add_argument("--delta", type=int, default=0, help="delta (step size)")
     parser.add_argument("--debug", action="store_true", help="enable debug mode")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="generate on this many processes, output is reproducible for the seeds and worker count")
 
     args = parser.parse_args()
 
-    global generator, debug
+    global generator, debug, states, workers, factory
     debug = args.debug
 
+    if args.workers > 1:
+        if debug:
+            parser.error("--workers cannot be combined with --debug.")
+        workers = args.workers
+
     raw_seeds = args.seeds
     num_seeds = len(raw_seeds)
 
@@ -109,7 +128,8 @@ def main():
     for seed_i in range(len(states)):
         print(f"[INFO] Seed[{seed_i}]: {states[seed_i]}", file=sys.stderr)
 
-    generator = crypto.CryptoLehmer(states, w, args.delta, 0, maximum)
+    factory = functools.partial(make_generator, args.delta)
+    generator = factory(states)
 
     pipe()
 
@@ -1,3 +1,4 @@
+import os
 from setuptools import Extension, setup
 from Cython.Build import cythonize
 import numpy
@@ -9,12 +10,19 @@ c_args = [
     "-funroll-loops",
 ]
 
+# LEHMER_STATS=0 compiles the counters behind the generators' stats() out of the generate loops
+# LEHMER_PROFILE=1 builds the per-phase tick counters behind profile(), see phase_profile.py
+macros = [("LH_STATS", os.environ.get("LEHMER_STATS", "1")),
+          ("LH_PROFILE", os.environ.get("LEHMER_PROFILE", "0"))]
+
 extensions = [
     Extension(
         "crypto.crypto_lh",
         ["crypto/crypto_lh.pyx"],
-        include_dirs=[numpy.get_include()],
+        include_dirs=[numpy.get_include(), "."],
         extra_compile_args=c_args,
+        define_macros=macros,
+        language="c++",
     ),
 ]
 
@@ -22,6 +30,7 @@ setup(
     name="Lehmerized CSPRNG Cython Module",
     ext_modules=cythonize(
         extensions,
+        include_path=["."],
         compiler_directives={
             'boundscheck': False,
             'wraparound': False,
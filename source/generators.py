@@ -1,3 +1,4 @@
+import functools
 import random
 import math
 import secrets
@@ -14,7 +15,28 @@ def get_factorials(w):
     return factorials
 
 
-def lehmerize_sequence(sequence, n, minimum, maximum, w, delta, debug=0):
+def _code_tables(w):
+    """
+    :return: (mask of the pairs (i, j) with j > i, the ones that count towards digit i, factorial weights of the digits)
+    """
+    # codes up to 20! fit in int64, larger windows fall back to Python integers
+    code_type = np.int64 if w <= 20 else object
+    return np.triu(np.ones((w, w), dtype=bool), 1), np.array(get_factorials(w), dtype=code_type)
+
+
+def _window_codes(block, above, factorials):
+    """
+    Lehmer codes of the rows of block, with the tables from _code_tables
+    """
+    # smaller[k, i, j] = block[k, j] < block[k, i]
+    smaller = (block[:, None, :] < block[:, :, None]) & above
+    return smaller.sum(axis=2, dtype=np.int64).astype(factorials.dtype) @ factorials
+
+
+def lehmerize_sequence_reference(sequence, n, minimum, maximum, w, delta, debug=0):
+    """
+    Window-by-window version of lehmerize_sequence, kept as the oracle it is checked against
+    """
     r = maximum-minimum+1
 
     if delta == 0:
@@ -71,11 +93,55 @@ def lehmerize_sequence(sequence, n, minimum, maximum, w, delta, debug=0):
 
     return lehmer_codes[:count]
 
-def lcg(seed: int, n: int, a=1664525, c=1013904223, m=2 ** 32) -> [int]:
+
+def lehmerize_sequence(sequence, n, minimum, maximum, w, delta, debug=0, chunk=1 << 14):
     """
-    Default range is 0,2^32-1
-    param seed (int): initial seed
-    param n (int): number of elements to generate
+    Lehmerizes arbitrary data: ranks every window of w values, starting every delta values, and maps
+    the codes below the rejection threshold to [minimum, maximum]. Same output as
+    lehmerize_sequence_reference, computed for chunk windows at a time with broadcast comparisons,
+    so the memory stays around chunk * w * w bytes.
+    :param sequence: values to Lehmerize, anything NumPy can compare
+    :param n: maximum number of outputs
+    :param minimum: inclusive
+    :param maximum: inclusive
+    :param delta: steps to take between windows. delta=0 is the same as delta=w
+    :param debug: print every window, through lehmerize_sequence_reference
+    :param chunk: windows ranked at once
+    :return: int64 array of at most n outputs
+    """
+    if debug:
+        return lehmerize_sequence_reference(sequence, n, minimum, maximum, w, delta, debug)
+    r = maximum - minimum + 1
+
+    if delta == 0:
+        delta = w
+    if delta > w:
+        raise ValueError(f"Delta {delta} greater than window size {w}")
+
+    sequence = np.asarray(sequence)
+    if len(sequence) < w:
+        print(f"Sequence (len {len(sequence)}) is too short for window size {w}.", file=stderr)
+        return np.array([], dtype=np.int64)
+
+    R = math.factorial(w)
+    thresh = R - (R % r)
+    above, factorials = _code_tables(w)
+
+    windows = sliding_window_view(sequence, w)[::delta]
+    results = []
+    count = 0
+    for start in range(0, len(windows), chunk):
+        if count >= n:
+            break
+        codes = _window_codes(windows[start:start + chunk], above, factorials)
+        accepted = codes[codes < thresh][:n - count]
+        results.append((accepted % r + minimum).astype(np.int64))
+        count += len(accepted)
+    return np.concatenate(results) if results else np.array([], dtype=np.int64)
+
+def lcg_reference(seed: int, n: int, a=1664525, c=1013904223, m=2 ** 32) -> [int]:
+    """
+    Step-by-step version of lcg, kept as the oracle it is checked against
     """
     result = np.empty(n)
     x = seed
@@ -85,11 +151,48 @@ def lcg(seed: int, n: int, a=1664525, c=1013904223, m=2 ** 32) -> [int]:
     return result
 
 
-def xorshift(seed, n) -> [int]:
+@functools.lru_cache(maxsize=8)
+def _lcg_jumps(a, c, m, block):
+    """
+    Coefficients of x[j] = (A[j] * x[-1] + C[j]) % m for j < block, built by doubling
     """
-    Default range is 0,2^32-1
+    A = np.array([a], dtype=np.uint64)
+    C = np.array([c], dtype=np.uint64)
+    while len(A) < block:
+        # the second half continues from the last element of the first one
+        A = np.concatenate((A, _lcg_reduce(A * A[-1], m)))
+        C = np.concatenate((C, _lcg_reduce(A[:len(C)] * C[-1] + C, m)))
+    return A[:block], C[:block]
+
+
+def _lcg_reduce(x, m):
+    # sums below 2^64 for m <= 2^32; larger powers of two wrap around 2^64, which m divides
+    return x % np.uint64(m) if m <= 2 ** 32 else x & np.uint64(m - 1)
+
+
+def lcg(seed: int, n: int, a=1664525, c=1013904223, m=2 ** 32, block=1 << 16) -> [int]:
+    """
+    Default range is 0,2^32-1. Same values as lcg_reference, a block at a time from the precomputed
+    multiplier powers. Moduli above 2^32 that are not powers of two run step by step.
     param seed (int): initial seed
     param n (int): number of elements to generate
+    param block (int): elements computed per step
+    """
+    if m > 2 ** 64 or (m > 2 ** 32 and m & (m - 1)):
+        return lcg_reference(seed, n, a, c, m)
+    result = np.empty(n)
+    A, C = _lcg_jumps(a % m, c % m, m, min(block, max(n, 1)))
+    x = np.uint64(seed % m)
+    for start in range(0, n, len(A)):
+        values = _lcg_reduce(A[:n - start] * x + C[:n - start], m)
+        result[start:start + len(values)] = values
+        x = values[-1]
+    return result
+
+
+def xorshift_reference(seed, n) -> [int]:
+    """
+    Step-by-step version of xorshift, kept as the oracle it is checked against
     """
     result = []
     x = seed
@@ -101,7 +204,48 @@ def xorshift(seed, n) -> [int]:
     return result
 
 
-def _lehmer_from_ranks(rank_lists: [[int]]) -> [int]:
+@functools.lru_cache(maxsize=2)
+def _xorshift_jumps(block):
+    """
+    columns[j, b]: the state j + 1 steps after the state with only bit b set. The steps are linear
+    over GF(2), so any state is the xor of the columns of its set bits.
+    """
+    columns = np.empty((block, 32), dtype=np.uint32)
+    x = np.uint32(1) << np.arange(32, dtype=np.uint32)
+    for j in range(block):
+        # shifts on uint32 drop the bits above 32 like the masks in xorshift_reference
+        x ^= x << np.uint32(13)
+        x ^= x >> np.uint32(17)
+        x ^= x << np.uint32(5)
+        columns[j] = x
+    return columns
+
+
+def xorshift(seed, n, block=1 << 12) -> [int]:
+    """
+    Default range is 0,2^32-1. Same values as xorshift_reference, a block at a time from the jump
+    table. A seed outside 0,2^32-1 keeps its high bits in the state (only the outputs are masked),
+    so the table does not apply and it runs step by step through xorshift_reference, in O(n)
+    Python steps.
+    param seed (int): initial seed
+    param n (int): number of elements to generate
+    param block (int): elements computed per step
+    """
+    if not 0 <= seed <= 0xFFFFFFFF:
+        return xorshift_reference(seed, n)
+    result = np.empty(n, dtype=np.uint32)
+    columns = _xorshift_jumps(min(block, max(n, 1)))
+    bits = np.arange(32)
+    x = seed
+    for start in range(0, n, len(columns)):
+        taken = columns[:n - start, (x >> bits) & 1 == 1]
+        values = np.bitwise_xor.reduce(taken, axis=1)
+        result[start:start + len(values)] = values
+        x = int(values[-1])
+    return result.tolist()
+
+
+def _lehmer_from_ranks_reference(rank_lists: [[int]]) -> [int]:
     n = len(rank_lists[0])
     factorials = [math.factorial(n - i - 1) for i in range(n)]
     results = []
@@ -116,6 +260,17 @@ def _lehmer_from_ranks(rank_lists: [[int]]) -> [int]:
     return results
 
 
+def _lehmer_from_ranks(rank_lists, chunk=1 << 14) -> [int]:
+    """
+    Lehmer codes of the rows of rank_lists, chunk rows at a time, as a list like
+    _lehmer_from_ranks_reference
+    """
+    rank_lists = np.asarray(rank_lists)
+    above, factorials = _code_tables(rank_lists.shape[1])
+    return np.concatenate([_window_codes(rank_lists[start:start + chunk], above, factorials)
+                           for start in range(0, len(rank_lists), chunk)] or [factorials[:0]]).tolist()
+
+
 def lcg_lh(seed: int, n: int, w: int, a=1664525, c=1013904223, m=2 ** 32) -> [int]:
     """
     Overlapping lehmer code sliding window on top of LCG
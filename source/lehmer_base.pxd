@@ -0,0 +1,21 @@
+cimport numpy as np
+from lehmer_engine cimport lh_engine
+
+# Base classes of the generators. They hold the engine and the methods that are the same for
+# every source; the window loop itself is fused over the source structs (lehmer_engine.pxd), so
+# each generator implements the three hooks below for its own source.
+
+cdef class LehmerBase:
+    cdef lh_engine engine
+
+    # lh_fill, lh_trace and lh_debug_fill on the generator's source
+    cdef Py_ssize_t fill(self, char *out, int itemsize, Py_ssize_t n) noexcept nogil
+    cdef object trace_windows(self, Py_ssize_t n)
+    cdef int debug_fill(self, char *out, int itemsize, Py_ssize_t n) except -1
+
+# generators of uint64 outputs in [minimum, maximum]
+cdef class LehmerGenerator(LehmerBase):
+    cdef long long minimum
+    cdef long long maximum
+
+    cpdef np.ndarray generate_chunk(self, int n, int debug)
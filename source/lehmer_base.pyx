@@ -0,0 +1,86 @@
+# distutils: language=c++
+# cython: language_level=3
+
+import numpy as np
+cimport numpy as np
+from libc.stdint cimport uint64_t
+from lehmer_kernels cimport lh_acquire_output, PyBuffer_Release
+from lehmer_engine cimport lh_engine_free
+from lehmer_engine cimport lh_stats_dict, lh_stats_reset, lh_profile_dict, lh_profile_reset
+
+np.import_array()
+
+
+cdef class LehmerBase:
+    def __dealloc__(self):
+        # runs after the __dealloc__ of the generator, which frees its source
+        lh_engine_free(&self.engine)
+
+    cdef Py_ssize_t fill(self, char *out, int itemsize, Py_ssize_t n) noexcept nogil:
+        return 0
+
+    cdef object trace_windows(self, Py_ssize_t n):
+        raise NotImplementedError(f"{type(self).__name__} does not trace windows")
+
+    cdef int debug_fill(self, char *out, int itemsize, Py_ssize_t n) except -1:
+        raise NotImplementedError(f"{type(self).__name__} has no debug output")
+
+    def stats(self):
+        """
+        Counters of the windows, source steps and outputs since construction or reset_stats.
+        SequenceLehmer counts the values read as steps, the wide generators count 32-bit words
+        as outputs. Not carried over by snapshot/restore, pickling or copies.
+        :return: dict, see lehmer_engine.lh_stats_dict
+        """
+        return lh_stats_dict(&self.engine.stats)
+
+    def reset_stats(self):
+        lh_stats_reset(&self.engine.stats)
+
+    def profile(self):
+        """
+        Ticks spent per phase of the window loop since construction or reset_profile, only counted
+        by a build with LEHMER_PROFILE=1 (see phase_profile.py).
+        :return: dict, see lehmer_engine.lh_profile_dict
+        """
+        return lh_profile_dict(&self.engine.profile)
+
+    def reset_profile(self):
+        lh_profile_reset(&self.engine.profile)
+
+    def __reduce__(self):
+        return type(self).restore, (self.snapshot(),)
+
+
+cdef class LehmerGenerator(LehmerBase):
+    cpdef np.ndarray generate_chunk(self, int n, int debug):
+        cdef np.ndarray[np.uint64_t, ndim=1] results = np.empty(n, dtype=np.uint64)
+        if debug:
+            self.debug_fill(<char *> results.data, sizeof(uint64_t), n)
+            return results
+        with nogil:
+            self.fill(<char *> results.data, sizeof(uint64_t), n)
+        return results
+
+    def trace(self, Py_ssize_t n):
+        """
+        Runs the next n windows and records each one, for debugging and analysis. The generator
+        moves on exactly as if generate_into had produced the accepted outputs. Needs extract off.
+        :return: structured array with the fields window, digits, code, accepted and output
+        """
+        return self.trace_windows(n)
+
+    def generate_into(self, out):
+        """
+        Writes the next len(out) numbers into a caller-supplied buffer without allocating.
+        :param out: writable contiguous buffer or memoryview of uint8, uint16, uint32 or uint64
+        :return: out
+        """
+        cdef Py_buffer view
+        lh_acquire_output(out, &view, self.maximum)
+        try:
+            with nogil:
+                self.fill(<char *> view.buf, view.itemsize, view.len // view.itemsize)
+        finally:
+            PyBuffer_Release(&view)
+        return out
@@ -0,0 +1,943 @@
+from libc.stdint cimport uint32_t, uint64_t, UINT64_MAX
+from libc.stdlib cimport malloc, free
+from libc.string cimport memmove, memcpy
+from libc.math cimport fabs, log, exp
+from libcpp.random cimport mt19937_64
+from lehmer_kernels cimport LH_STATS, LH_PROFILE, lh_ticks, lh_rank_u64_fn, lh_rank_f64_fn, lh_select_rank_u64, lh_select_rank_f64
+from lehmer_kernels cimport lh_divisor, lh_divisor_init, lh_mod, lh_divmod, lh_store, lh_lcg_jump, lh_xorshift64_jump
+from lehmer_kernels cimport LH_LUT_MAX_W, lh_lut, lh_rank_lut_u64_fn, lh_lut_tables, lh_select_rank_lut_u64
+from lehmer_kernels cimport LH_ZIG_NORMAL_LAYERS, LH_ZIG_NORMAL_R, lh_zig_normal_x, lh_zig_normal_ratio
+from lehmer_kernels cimport LH_ZIG_EXP_LAYERS, LH_ZIG_EXP_R, lh_zig_exp_x, lh_zig_exp_ratio, lh_u01
+from lehmer_kernels cimport LH_WIDE_MAX_W, lh_u128, lh_u128_less, lh_rank_wide_fn, lh_rank_wide_u64, lh_wide_code
+
+# Lehmerization engine shared by every generator. The engine functions are fused over the
+# source structs below, so each generator gets its own copy of the loop with the source step
+# inlined. A source owns the window it feeds: uint64 for the integer sources, double for the others.
+
+ctypedef struct lh_lcg_source:
+    uint64_t *window
+    uint64_t state
+    uint64_t a
+    uint64_t c
+
+ctypedef struct lh_xorshift_source:
+    uint64_t *window
+    uint64_t state
+
+ctypedef struct lh_arx_source:
+    # five xorshift64 states, mixed by an ARX round and clock controlled by states[0]
+    uint64_t *window
+    uint64_t *states
+    # rounds thrown away by the clock control, moved into the engine stats by lh_fill
+    uint64_t discarded
+
+ctypedef struct lh_sequence_source:
+    # recorded data, mapped to order-preserving keys by the caller, read from data[pos:]
+    uint64_t *window
+    const uint64_t *data
+    Py_ssize_t pos
+
+ctypedef struct lh_logistic_source:
+    double *window
+    double state
+    double weyl
+    double weyl_constant
+
+# The mt19937_64 sources fill a block of LH_SOURCE_BLOCK values at a time: the raw engine draws
+# first, then the transform over the whole block (a Ziggurat for the normal and exponential
+# deviates), so the window loop only reads finished values from block[block_pos:]. A Ziggurat
+# draw that misses the rectangle of its layer is finished with further engine draws, taken after
+# the block, so the stream is still fixed by the seed.
+cdef enum:
+    LH_SOURCE_BLOCK = 512
+
+ctypedef struct lh_normal_source:
+    double *window
+    mt19937_64 *rng
+    double mean
+    double sd
+    double *block
+    uint64_t *raw
+    int block_pos
+
+ctypedef struct lh_slope_source:
+    # fifth power of a uniform deviate
+    double *window
+    mt19937_64 *rng
+    double *block
+    uint64_t *raw
+    int block_pos
+
+ctypedef struct lh_decay_source:
+    # exponential deviate with mean scale
+    double *window
+    mt19937_64 *rng
+    double scale
+    double *block
+    uint64_t *raw
+    int block_pos
+
+ctypedef fused lh_u64_source:
+    lh_lcg_source
+    lh_xorshift_source
+    lh_arx_source
+    lh_sequence_source
+
+ctypedef fused lh_block_source:
+    lh_normal_source
+    lh_slope_source
+    lh_decay_source
+
+ctypedef fused lh_source:
+    lh_lcg_source
+    lh_xorshift_source
+    lh_arx_source
+    lh_sequence_source
+    lh_logistic_source
+    lh_normal_source
+    lh_slope_source
+    lh_decay_source
+
+ctypedef struct lh_stats:
+    # counted only when built with LH_STATS, see lh_stats_dict
+    uint64_t windows
+    uint64_t rejected
+    uint64_t steps
+    uint64_t discarded
+    uint64_t outputs
+
+# phases of a window timed by an LH_PROFILE build, in the order of lh_profile.ticks
+cdef enum:
+    LH_PHASE_SOURCE
+    LH_PHASE_SHIFT
+    LH_PHASE_RANK
+    LH_PHASE_REJECT
+    LH_PHASE_STORE
+    LH_PHASES
+
+ctypedef struct lh_profile:
+    uint64_t windows
+    uint64_t ticks[LH_PHASES]
+
+ctypedef struct lh_engine:
+    int w
+    int delta
+    bint is_initialized
+    # overlapping windows keep their per-position counts between slides
+    bint incremental
+    uint64_t R
+    uint64_t thresh
+    uint64_t minimum
+    lh_divisor r_div
+    uint64_t *factorials
+    int *digits
+    # full recompute of a window, for uint64 and double windows
+    lh_rank_u64_fn rank_u64
+    lh_rank_f64_fn rank_f64
+    # comparison-bitmask tables for uint64 windows, NULL unless enabled by lh_engine_set_lut
+    lh_lut lut
+    lh_rank_lut_u64_fn rank_lut
+    # multi-output extraction, see lh_engine_set_extract
+    bint extract
+    int per_code
+    lh_divisor r_k_div
+    uint64_t thresh_k
+    uint64_t kept_range
+    uint64_t pending
+    int pending_left
+    uint64_t pool
+    uint64_t pool_range
+    # wide codes, see lh_engine_init_wide. pending_left counts the words of wide_pending not handed out.
+    bint wide
+    int words
+    lh_u128 wide_thresh
+    lh_rank_wide_fn rank_wide
+    uint32_t wide_pending[3]
+    lh_stats stats
+    lh_profile profile
+
+
+cdef inline uint64_t lh_xorshift64_step(uint64_t x) noexcept nogil:
+    x ^= x << 13
+    x ^= x >> 7
+    x ^= x << 17
+    return x
+
+cdef inline uint64_t lh_rotate_left(uint64_t number, int r) noexcept nogil:
+    return (number << (r & 63)) | (number >> (64 - (r & 63)))
+
+cdef inline uint64_t lh_mix_arx(uint64_t *states) noexcept nogil:
+    cdef uint64_t s1 = states[1]
+    cdef uint64_t s2 = states[2]
+    cdef uint64_t s3 = states[3]
+    cdef uint64_t s4 = states[4]
+
+    s1 = s1 + s2
+    s4 = s4 ^ s1
+    s4 = lh_rotate_left(s4, 24)  # tested from rotation_amount
+
+    s3 = s3 + s4
+    s2 = s2 ^ s3
+    s2 = lh_rotate_left(s2, 12)
+
+    s1 = s1 + s2
+    s4 = s4 ^ s1
+    s4 = lh_rotate_left(s4, 8)
+
+    s3 = s3 + s4
+    s2 = s2 ^ s3
+    s2 = lh_rotate_left(s2, 7)
+
+    return s1 ^ s2 ^ s3 ^ s4
+
+cdef inline void lh_arx_round(uint64_t *states) noexcept nogil:
+    cdef int j
+    for j in range(5):
+        states[j] = lh_xorshift64_step(states[j])
+
+
+cdef inline double lh_zig_normal(mt19937_64 *rng, uint64_t x) noexcept nogil:
+    # standard normal deviate from draw x, for the draws that missed the rectangle of their layer
+    cdef int i
+    cdef double u, z, a, b, f0, f1
+    while True:
+        i = x & (LH_ZIG_NORMAL_LAYERS - 1)
+        u = 2 * lh_u01(x) - 1
+        if fabs(u) < lh_zig_normal_ratio[i]:
+            return u * lh_zig_normal_x[i]
+        if i == 0:
+            # tail beyond R
+            while True:
+                a = log(1 - lh_u01(rng[0]())) / LH_ZIG_NORMAL_R
+                b = log(1 - lh_u01(rng[0]()))
+                if -2 * b >= a * a:
+                    break
+            return a - LH_ZIG_NORMAL_R if u < 0 else LH_ZIG_NORMAL_R - a
+        # wedge between the rectangle and the density
+        z = u * lh_zig_normal_x[i]
+        f0 = exp(-0.5 * (lh_zig_normal_x[i] * lh_zig_normal_x[i] - z * z))
+        f1 = exp(-0.5 * (lh_zig_normal_x[i + 1] * lh_zig_normal_x[i + 1] - z * z))
+        if f1 + lh_u01(rng[0]()) * (f0 - f1) < 1.0:
+            return z
+        x = rng[0]()
+
+cdef inline double lh_zig_exp(mt19937_64 *rng, uint64_t x) noexcept nogil:
+    # standard exponential deviate from draw x, for the draws that missed the rectangle of their layer
+    cdef int i
+    cdef double u, z, f0, f1
+    while True:
+        i = x & (LH_ZIG_EXP_LAYERS - 1)
+        u = lh_u01(x)
+        if u < lh_zig_exp_ratio[i]:
+            return u * lh_zig_exp_x[i]
+        if i == 0:
+            # the tail beyond R is R plus an exponential deviate
+            return LH_ZIG_EXP_R - log(1 - lh_u01(rng[0]()))
+        z = u * lh_zig_exp_x[i]
+        f0 = exp(-(lh_zig_exp_x[i] - z))
+        f1 = exp(-(lh_zig_exp_x[i + 1] - z))
+        if f1 + lh_u01(rng[0]()) * (f0 - f1) < 1.0:
+            return z
+        x = rng[0]()
+
+cdef inline void lh_block_refill(lh_block_source *s) noexcept nogil:
+    # the rectangle test and the scaling run branch-free over the whole block, the few misses
+    # (about 1% for the normal, 2% for the exponential) go through the slow path afterwards
+    cdef int i
+    cdef uint64_t x
+    cdef double u
+    for i in range(LH_SOURCE_BLOCK):
+        s.raw[i] = s.rng[0]()
+    if lh_block_source is lh_slope_source:
+        for i in range(LH_SOURCE_BLOCK):
+            u = lh_u01(s.raw[i])
+            s.block[i] = u * u * u * u * u
+    elif lh_block_source is lh_normal_source:
+        for i in range(LH_SOURCE_BLOCK):
+            x = s.raw[i]
+            s.block[i] = s.mean + s.sd * (2 * lh_u01(x) - 1) * lh_zig_normal_x[x & (LH_ZIG_NORMAL_LAYERS - 1)]
+        for i in range(LH_SOURCE_BLOCK):
+            x = s.raw[i]
+            if not fabs(2 * lh_u01(x) - 1) < lh_zig_normal_ratio[x & (LH_ZIG_NORMAL_LAYERS - 1)]:
+                s.block[i] = s.mean + s.sd * lh_zig_normal(s.rng, x)
+    else:
+        for i in range(LH_SOURCE_BLOCK):
+            x = s.raw[i]
+            s.block[i] = s.scale * lh_u01(x) * lh_zig_exp_x[x & (LH_ZIG_EXP_LAYERS - 1)]
+        for i in range(LH_SOURCE_BLOCK):
+            x = s.raw[i]
+            if not lh_u01(x) < lh_zig_exp_ratio[x & (LH_ZIG_EXP_LAYERS - 1)]:
+                s.block[i] = s.scale * lh_zig_exp(s.rng, x)
+    s.block_pos = 0
+
+cdef inline void lh_source_push(lh_source *s, int k) noexcept nogil:
+    # draws the next value of the source into window[k]
+    if lh_source is lh_lcg_source:
+        s.state = s.a * s.state + s.c
+        s.window[k] = s.state
+    elif lh_source is lh_xorshift_source:
+        s.state = lh_xorshift64_step(s.state)
+        s.window[k] = s.state
+    elif lh_source is lh_arx_source:
+        lh_arx_round(s.states)
+        # If the top 2 bits are both 0 (prob 0.25), we discard this round.
+        while (s.states[0] >> 62) == 0:
+            lh_arx_round(s.states)
+            if LH_STATS:
+                s.discarded += 1
+        s.window[k] = lh_mix_arx(s.states)
+    elif lh_source is lh_sequence_source:
+        s.window[k] = s.data[s.pos]
+        s.pos += 1
+    elif lh_source is lh_logistic_source:
+        # Logistic Step
+        s.state = 4.0 * s.state * (1.0 - s.state)
+
+        # Weyl update
+        s.weyl += s.weyl_constant
+        if s.weyl >= 1.0: s.weyl -= 1.0
+
+        # Perturb
+        s.state += (s.weyl * 1e-12)
+        if s.state >= 1.0: s.state -= 1.0
+
+        s.window[k] = s.state
+    else:
+        if s.block_pos == LH_SOURCE_BLOCK:
+            lh_block_refill(s)
+        s.window[k] = s.block[s.block_pos]
+        s.block_pos += 1
+
+cdef inline void lh_source_first(lh_source *s, int k) noexcept nogil:
+    # draws value k of the very first window. The ARX source skips its clock control here.
+    if lh_source is lh_arx_source:
+        lh_arx_round(s.states)
+        s.window[k] = lh_mix_arx(s.states)
+    else:
+        lh_source_push(s, k)
+
+cdef inline void lh_source_jump(lh_source *s, uint64_t steps) noexcept nogil:
+    # moves the source steps draws ahead, in O(log steps) for the LCG and xorshift sources.
+    # The ARX source counts rounds instead, kept or discarded by the clock control.
+    cdef uint64_t i
+    cdef int j
+    if lh_source is lh_lcg_source:
+        s.state = lh_lcg_jump(s.state, s.a, s.c, steps)
+    elif lh_source is lh_xorshift_source:
+        s.state = lh_xorshift64_jump(s.state, steps)
+    elif lh_source is lh_arx_source:
+        for j in range(5):
+            s.states[j] = lh_xorshift64_jump(s.states[j], steps)
+    elif lh_source is lh_sequence_source:
+        s.pos += steps
+    else:
+        for i in range(steps):
+            lh_source_push(s, 0)
+
+cdef inline object lh_source_state(lh_source *s):
+    # printable source state for debug output, None when there is nothing short to show
+    if lh_source is lh_lcg_source:
+        return s.state
+    elif lh_source is lh_xorshift_source:
+        return s.state
+    elif lh_source is lh_arx_source:
+        return [s.states[j] for j in range(5)]
+    elif lh_source is lh_sequence_source:
+        return s.pos
+    elif lh_source is lh_logistic_source:
+        return s.state
+    else:
+        return None
+
+cdef inline int lh_source_alloc(lh_source *s, int w) except -1:
+    if lh_source in lh_u64_source:
+        s.window = <uint64_t *> malloc(w * sizeof(uint64_t))
+    else:
+        s.window = <double *> malloc(w * sizeof(double))
+    if not s.window:
+        raise MemoryError()
+    if lh_source in lh_block_source:
+        # empty block, the first draw fills it
+        s.block = <double *> malloc(LH_SOURCE_BLOCK * sizeof(double))
+        s.raw = <uint64_t *> malloc(LH_SOURCE_BLOCK * sizeof(uint64_t))
+        s.block_pos = LH_SOURCE_BLOCK
+        if not s.block or not s.raw:
+            raise MemoryError()
+    return 0
+
+cdef inline void lh_source_free(lh_source *s) noexcept nogil:
+    if s.window: free(s.window)
+    if lh_source in lh_block_source:
+        if s.block: free(s.block)
+        if s.raw: free(s.raw)
+
+cdef inline bytes lh_block_dump(lh_block_source *s):
+    # values drawn ahead of the stream, the engine state is past them
+    return (<char *> (s.block + s.block_pos))[:(LH_SOURCE_BLOCK - s.block_pos) * sizeof(double)]
+
+cdef inline int lh_block_load(lh_block_source *s, bytes data) except -1:
+    cdef Py_ssize_t count = len(data) // sizeof(double)
+    if count > LH_SOURCE_BLOCK or len(data) % sizeof(double):
+        raise ValueError("snapshot holds a malformed block of drawn values")
+    s.block_pos = LH_SOURCE_BLOCK - count
+    memcpy(s.block + s.block_pos, <const char *> data, count * sizeof(double))
+    return 0
+
+
+cdef inline void lh_stats_reset(lh_stats *st) noexcept nogil:
+    st.windows = 0
+    st.rejected = 0
+    st.steps = 0
+    st.discarded = 0
+    st.outputs = 0
+
+cdef inline void lh_stats_add(lh_stats *st, const lh_stats *other) noexcept nogil:
+    st.windows += other.windows
+    st.rejected += other.rejected
+    st.steps += other.steps
+    st.discarded += other.discarded
+    st.outputs += other.outputs
+
+cdef inline dict lh_stats_dict(const lh_stats *st):
+    """
+    :return: windows ranked, windows whose code was rejected, source steps, rounds discarded by
+        the ARX clock control, outputs emitted, and from those the acceptance ratio and the
+        source steps per output. All zero when built with LH_STATS=0 (enabled is False).
+    """
+    return {
+        "enabled": bool(LH_STATS),
+        "windows": st.windows,
+        "rejected": st.rejected,
+        "steps": st.steps,
+        "discarded": st.discarded,
+        "outputs": st.outputs,
+        "acceptance": <double> (st.windows - st.rejected) / st.windows if st.windows else 0.0,
+        "steps_per_output": <double> st.steps / st.outputs if st.outputs else 0.0,
+    }
+
+cdef inline void lh_profile_reset(lh_profile *p) noexcept nogil:
+    cdef int i
+    p.windows = 0
+    for i in range(LH_PHASES):
+        p.ticks[i] = 0
+
+cdef inline void lh_profile_add(lh_profile *p, const lh_profile *other) noexcept nogil:
+    cdef int i
+    p.windows += other.windows
+    for i in range(LH_PHASES):
+        p.ticks[i] += other.ticks[i]
+
+cdef inline void lh_profile_lap(lh_profile *p, int phase, uint64_t *t) noexcept nogil:
+    # charges the ticks since t to phase and restarts t
+    cdef uint64_t now = lh_ticks()
+    p.ticks[phase] += now - t[0]
+    t[0] = now
+
+cdef inline dict lh_profile_dict(const lh_profile *p):
+    """
+    :return: windows timed and the ticks spent per phase: drawing the new values (source), sliding
+        the window (shift), ranking, the threshold test with the range reduction or the extraction
+        (reject) and writing the outputs (store). Only counted when built with LH_PROFILE=1.
+    """
+    return {
+        "enabled": bool(LH_PROFILE),
+        "windows": p.windows,
+        "ticks": {"source": p.ticks[LH_PHASE_SOURCE], "shift": p.ticks[LH_PHASE_SHIFT],
+                  "rank": p.ticks[LH_PHASE_RANK], "reject": p.ticks[LH_PHASE_REJECT],
+                  "store": p.ticks[LH_PHASE_STORE]},
+    }
+
+
+cdef inline int lh_engine_alloc(lh_engine *e, int w, int delta) except -1:
+    # the part of the setup that does not depend on the code width, factorials left at 0
+    cdef int i
+    if delta > w:
+        raise ValueError(f"Delta {delta} greater than window size {w}")
+    e.w = w
+    e.delta = delta if delta != 0 else w
+    e.is_initialized = 0
+    e.incremental = e.delta < w
+    e.rank_u64 = lh_select_rank_u64(w)
+    e.rank_f64 = lh_select_rank_f64(w)
+    e.lut = NULL
+    e.rank_lut = NULL
+    e.wide = 0
+    lh_stats_reset(&e.stats)
+    lh_profile_reset(&e.profile)
+
+    e.factorials = <uint64_t *> malloc(w * sizeof(uint64_t))
+    e.digits = <int *> malloc(w * sizeof(int))
+    if not e.factorials or not e.digits:
+        raise MemoryError()
+    for i in range(w):
+        e.factorials[i] = 0
+        e.digits[i] = 0
+    return 0
+
+cdef inline int lh_engine_init(lh_engine *e, int w, int delta, long long minimum, long long maximum) except -1:
+    """
+    :param w: window size
+    :param delta: steps to take between windows. delta=0 is the same as delta=w
+    :param minimum: inclusive
+    :param maximum: inclusive
+    """
+    cdef int i
+    cdef object factorial = 1
+
+    for i in range(2, w + 1):
+        factorial *= i
+    lh_engine_alloc(e, w, delta)
+    e.R = factorial
+    e.minimum = minimum
+    e.thresh = e.R - (e.R % <uint64_t> (maximum - minimum + 1))
+    e.r_div = lh_divisor_init(<uint64_t> (maximum - minimum + 1))
+    lh_engine_set_extract(e, 0)
+
+    # precompute factorials
+    factorial = 1
+    for i in range(w - 1, -1, -1):
+        e.factorials[i] = factorial
+        factorial *= w - i
+    return 0
+
+cdef inline int lh_engine_init_wide(lh_engine *e, int w, int delta) except -1:
+    """
+    Engine for 128-bit codes, w up to LH_WIDE_MAX_W (34! < 2^128). An accepted code gives its low
+    words = floor(log2(w!) / 32) 32-bit words, low word first; the output range is [0, 2^32 - 1].
+    The window loop, the incremental digits, the counters and the trace are the ones of lh_fill.
+    :param w: window size
+    :param delta: steps to take between windows. delta=0 is the same as delta=w
+    """
+    if w > LH_WIDE_MAX_W:
+        raise ValueError(f"wide codes support w <= {LH_WIDE_MAX_W}, got w={w}")
+    R = 1
+    for i in range(2, w + 1):
+        R *= i
+    lh_engine_alloc(e, w, delta)
+    e.wide = 1
+    words = (R.bit_length() - 1) // 32
+    if words < 1 or words > 3:
+        raise ValueError(f"w={w} does not give 1 to 3 whole 32-bit words")
+    e.words = words
+    # codes below thresh, a multiple of 2^(32 * words), are accepted
+    thresh = R - R % (1 << (32 * words))
+    e.wide_thresh.lo = thresh & 0xFFFFFFFFFFFFFFFF
+    e.wide_thresh.hi = thresh >> 64
+    e.rank_wide = lh_rank_wide_u64
+    # the narrow fields are unused, the range reduction is the split into words
+    e.R = 0
+    e.thresh = 0
+    e.minimum = 0
+    e.r_div = lh_divisor_init(1)
+    lh_engine_set_extract(e, 0)
+    return 0
+
+cdef inline int lh_engine_set_lut(lh_engine *e, bint enable) except -1:
+    # ranks every window of a uint64 source through the lookup tables. They replace the digit
+    # bookkeeping, so incremental ranking is switched off while they are in use.
+    if not enable:
+        e.lut = NULL
+        return 0
+    if e.w < 2 or e.w > LH_LUT_MAX_W:
+        raise ValueError(f"lookup table ranking supports 2 <= w <= {LH_LUT_MAX_W}, got w={e.w}")
+    e.lut = lh_lut_tables(e.w)
+    if e.lut == NULL:
+        raise MemoryError()
+    e.rank_lut = lh_select_rank_lut_u64(e.w)
+    e.incremental = 0
+    return 0
+
+cdef inline void lh_engine_set_extract(lh_engine *e, bint enable) noexcept nogil:
+    # Every code c < thresh_k, a multiple of r^k below w!, gives k = per_code outputs: the base-r
+    # digits of c % r^k. What is left, c // r^k below thresh_k / r^k or the excess c - thresh_k of a
+    # rejected code, is uniform too and goes into a pool (value uniform on [0, pool_range)), which
+    # hands out further outputs once pool_range >= r. Also empties the pool and the pending digits.
+    cdef uint64_t r = e.r_div.d
+    cdef uint64_t r_k = r
+    e.extract = enable
+    e.pending = 0
+    e.pending_left = 0
+    e.pool = 0
+    e.pool_range = 1
+    e.per_code = 1
+    while e.per_code < 63 and r_k <= e.R // r:
+        r_k *= r
+        e.per_code += 1
+    e.r_k_div = lh_divisor_init(r_k)
+    e.thresh_k = e.R - e.R % r_k
+    e.kept_range = e.thresh_k // r_k
+
+cdef inline void lh_engine_free(lh_engine *e) noexcept nogil:
+    if e.factorials: free(e.factorials)
+    if e.digits: free(e.digits)
+
+
+cdef inline uint64_t lh_rank(lh_engine *e, lh_source *s) noexcept nogil:
+    # full recompute of the current window. A wide code is left to lh_wide_code(e.digits).
+    if lh_source in lh_u64_source:
+        if e.wide:
+            e.rank_wide(s.window, e.digits, e.w)
+            return 0
+        return e.rank_u64(s.window, e.factorials, e.digits, e.w)
+    else:
+        return e.rank_f64(s.window, e.factorials, e.digits, e.w)
+
+cdef inline void lh_initialize(lh_engine *e, lh_source *s) noexcept nogil:
+    cdef int i
+    for i in range(e.w):
+        lh_source_first(s, i)
+    lh_rank(e, s)
+    e.is_initialized = 1
+    if LH_STATS:
+        e.stats.steps += e.w
+
+cdef inline void lh_skip_windows(lh_engine *e, lh_source *s, Py_ssize_t windows) noexcept nogil:
+    # moves the stream forward by whole windows without ranking them
+    cdef uint64_t steps = windows * e.delta
+    cdef int k
+    if not e.is_initialized:
+        lh_initialize(e, s)
+    if steps >= <uint64_t> e.w:
+        lh_source_jump(s, steps - e.w)
+        for k in range(e.w):
+            lh_source_push(s, k)
+    else:
+        memmove(s.window, s.window + steps, (e.w - steps) * sizeof(s.window[0]))
+        for k in range(e.w - <int> steps, e.w):
+            lh_source_push(s, k)
+    lh_rank(e, s)
+
+cdef inline Py_ssize_t lh_drain(lh_engine *e, char *out, int itemsize, Py_ssize_t count,
+                                Py_ssize_t n) noexcept nogil:
+    # hands out the digits left from the last code, then whatever the pool can give, up to n outputs.
+    # With wide codes, the words left from the last code.
+    cdef uint64_t r = e.r_div.d
+    cdef uint64_t digit, quotient, limit
+    if e.wide:
+        while count < n and e.pending_left:
+            lh_store(out, itemsize, count, e.wide_pending[e.words - e.pending_left])
+            e.pending_left -= 1
+            count += 1
+        return count
+    while count < n and e.pending_left:
+        digit = lh_divmod(e.pending, e.r_div, &quotient)
+        lh_store(out, itemsize, count, digit + e.minimum)
+        e.pending = quotient
+        e.pending_left -= 1
+        count += 1
+    while count < n and e.pool_range >= r:
+        # limit = quotient * r is the largest multiple of r within the pool range
+        lh_divmod(e.pool_range, e.r_div, &quotient)
+        limit = quotient * r
+        if e.pool < limit:
+            digit = lh_divmod(e.pool, e.r_div, &e.pool)
+            lh_store(out, itemsize, count, digit + e.minimum)
+            e.pool_range = quotient
+            count += 1
+        else:
+            # rejected, the excess is uniform on what is left
+            e.pool -= limit
+            e.pool_range -= limit
+    return count
+
+cdef inline void lh_absorb(lh_engine *e, uint64_t lehmer) noexcept nogil:
+    # splits a code into the pending digits and the leftover for the pool
+    cdef uint64_t leftover, leftover_range
+    if lehmer < e.thresh_k:
+        e.pending = lh_divmod(lehmer, e.r_k_div, &leftover)
+        e.pending_left = e.per_code
+        leftover_range = e.kept_range
+    else:
+        leftover = lehmer - e.thresh_k
+        leftover_range = e.R - e.thresh_k
+    if leftover_range > 1:
+        if e.pool_range > UINT64_MAX // leftover_range:
+            # the pool would overflow, start over from the leftover
+            e.pool = leftover
+            e.pool_range = leftover_range
+        else:
+            e.pool = e.pool * leftover_range + leftover
+            e.pool_range *= leftover_range
+
+cdef inline Py_ssize_t lh_fill(lh_engine *e, lh_source *s, char *out, int itemsize, Py_ssize_t n,
+                               Py_ssize_t max_windows) noexcept nogil:
+    # produces up to n outputs, stopping early after max_windows windows (-1 for no limit)
+    cdef Py_ssize_t count = 0
+    cdef Py_ssize_t windows = 0
+    cdef Py_ssize_t rejected = 0
+    cdef int i, j, k, smaller
+    cdef uint64_t lehmer, value
+    cdef lh_u128 code
+    cdef uint64_t t = 0
+
+    if not e.is_initialized:
+        lh_initialize(e, s)
+
+    # PINNED LOCAL VARIABLES
+    cdef lh_source src = s[0]
+    cdef uint64_t p_thresh = e.thresh
+    cdef uint64_t p_minimum = e.minimum
+    cdef int p_w = e.w
+    cdef int p_delta = e.delta
+    cdef uint64_t *p_factorials = e.factorials
+    cdef int *p_digits = e.digits
+    cdef lh_divisor p_r_div = e.r_div
+    cdef lh_rank_u64_fn p_rank_u64 = e.rank_u64
+    cdef lh_rank_f64_fn p_rank_f64 = e.rank_f64
+    cdef lh_lut p_lut = e.lut
+    cdef lh_rank_lut_u64_fn p_rank_lut = e.rank_lut
+
+    cdef bint p_extract = e.extract
+    # codes at or above this are counted as rejected
+    cdef uint64_t p_limit = e.thresh_k if p_extract else p_thresh
+    cdef bint p_wide = e.wide
+    cdef lh_u128 p_wide_thresh = e.wide_thresh
+    cdef lh_rank_wide_fn p_rank_wide = e.rank_wide
+
+    # positions [0, p_fresh) survive the slide, [p_fresh, p_w) are new
+    cdef int p_fresh = p_w - p_delta
+    cdef int p_split = p_fresh if e.incremental else 0
+
+    if p_extract or p_wide:
+        count = lh_drain(e, out, itemsize, count, n)
+
+    while count < n and windows != max_windows:
+        windows += 1
+        if LH_PROFILE:
+            t = lh_ticks()
+
+        # shift window left by delta elements (unless fully replacing it)
+        if p_delta < p_w:
+            memmove(src.window, src.window + p_delta, (p_w - p_delta) * sizeof(src.window[0]))
+            if p_split:
+                memmove(p_digits, p_digits + p_delta, p_split * sizeof(int))
+        if LH_PROFILE:
+            lh_profile_lap(&e.profile, LH_PHASE_SHIFT, &t)
+
+        # generate delta new numbers at the end
+        for k in range(p_w - p_delta, p_w):
+            lh_source_push(&src, k)
+        if LH_PROFILE:
+            lh_profile_lap(&e.profile, LH_PHASE_SOURCE, &t)
+
+        # calculate Lehmer Code
+        if p_split:
+            lehmer = 0
+            # surviving elements only need to be compared against the new ones
+            for i in range(p_split):
+                smaller = p_digits[i]
+                for j in range(p_fresh, p_w):
+                    smaller += (src.window[j] < src.window[i])
+                p_digits[i] = smaller
+                lehmer += smaller * p_factorials[i]
+
+            for i in range(p_split, p_w):
+                smaller = 0
+                for j in range(i + 1, p_w):
+                    smaller += (src.window[j] < src.window[i])
+                p_digits[i] = smaller
+                lehmer += smaller * p_factorials[i]
+            if p_wide:
+                code = lh_wide_code(p_digits, p_w)
+        elif lh_source in lh_u64_source:
+            # full recompute through the kernel selected for this w
+            if p_wide:
+                code = p_rank_wide(src.window, p_digits, p_w)
+            elif p_lut != NULL:
+                lehmer = p_rank_lut(src.window, p_lut, p_w)
+            else:
+                lehmer = p_rank_u64(src.window, p_factorials, p_digits, p_w)
+        else:
+            lehmer = p_rank_f64(src.window, p_factorials, p_digits, p_w)
+
+        if LH_PROFILE:
+            lh_profile_lap(&e.profile, LH_PHASE_RANK, &t)
+
+        if lh_source in lh_u64_source:
+            if p_wide:
+                # the low words of the code, low word first
+                if lh_u128_less(code, p_wide_thresh):
+                    e.wide_pending[0] = <uint32_t> code.lo
+                    e.wide_pending[1] = <uint32_t> (code.lo >> 32)
+                    e.wide_pending[2] = <uint32_t> code.hi
+                    e.pending_left = e.words
+                    if LH_PROFILE:
+                        lh_profile_lap(&e.profile, LH_PHASE_REJECT, &t)
+                    count = lh_drain(e, out, itemsize, count, n)
+                    if LH_PROFILE:
+                        lh_profile_lap(&e.profile, LH_PHASE_STORE, &t)
+                else:
+                    if LH_STATS:
+                        rejected += 1
+                    if LH_PROFILE:
+                        lh_profile_lap(&e.profile, LH_PHASE_REJECT, &t)
+                continue
+
+        if LH_STATS:
+            rejected += lehmer >= p_limit
+
+        if p_extract:
+            lh_absorb(e, lehmer)
+            if LH_PROFILE:
+                lh_profile_lap(&e.profile, LH_PHASE_REJECT, &t)
+            count = lh_drain(e, out, itemsize, count, n)
+            if LH_PROFILE:
+                lh_profile_lap(&e.profile, LH_PHASE_STORE, &t)
+        elif lehmer < p_thresh:
+            value = lh_mod(lehmer, p_r_div) + p_minimum
+            if LH_PROFILE:
+                lh_profile_lap(&e.profile, LH_PHASE_REJECT, &t)
+            lh_store(out, itemsize, count, value)
+            count += 1
+            if LH_PROFILE:
+                lh_profile_lap(&e.profile, LH_PHASE_STORE, &t)
+        elif LH_PROFILE:
+            lh_profile_lap(&e.profile, LH_PHASE_REJECT, &t)
+
+    if LH_PROFILE:
+        e.profile.windows += windows
+
+    if LH_STATS:
+        e.stats.windows += windows
+        e.stats.rejected += rejected
+        e.stats.steps += windows * p_delta
+        e.stats.outputs += count
+        if lh_source is lh_arx_source:
+            e.stats.discarded += src.discarded
+            src.discarded = 0
+
+    # CRUCIAL, update persistent state
+    s[0] = src
+    return count
+
+
+cdef inline Py_ssize_t lh_trace_window(lh_engine *e, lh_source *s, char *out, int itemsize, Py_ssize_t i,
+                                       uint64_t *code) noexcept nogil:
+    # runs exactly one window through lh_fill and writes its output, if accepted, to out[i]. The window
+    # and its digits are left in place, code gets the Lehmer code. Only for extract off.
+    cdef Py_ssize_t accepted = lh_fill(e, s, out + i * itemsize, itemsize, 1, 1)
+    cdef int k
+    if e.lut != NULL:
+        # the table path does not write the digits
+        lh_rank(e, s)
+    code[0] = 0
+    for k in range(e.w):
+        code[0] += e.digits[k] * e.factorials[k]
+    return accepted
+
+cdef inline object lh_trace_wide(lh_engine *e, lh_source *s, Py_ssize_t n):
+    """
+    lh_trace for wide codes. Words left from the last generate call are dropped, after that the
+    generator moves on exactly as if generate_into had produced the traced words.
+    :return: structured array of n records: window, digits, code (low and high 64 bits), accepted
+        and output (the words of the code, 0 when rejected)
+    """
+    import numpy as np
+    cdef int w = e.w
+    cdef int k
+    cdef Py_ssize_t i
+    cdef lh_u128 code
+    if n < 0:
+        raise ValueError(f"n must be non-negative, got {n}")
+    trace = np.zeros(n, dtype=[("window", np.uint64, (w,)), ("digits", np.int32, (w,)), ("code", np.uint64, (2,)),
+                               ("accepted", np.bool_), ("output", np.uint32, (e.words,))])
+    windows = np.empty((n, w * sizeof(s.window[0])), dtype=np.uint8)
+    cdef unsigned char[:, ::1] window_view = windows
+    cdef int[:, ::1] digit_view = np.empty((n, w), dtype=np.intc)
+    cdef uint64_t[:, ::1] code_view = np.empty((n, 2), dtype=np.uint64)
+    cdef unsigned char[::1] accepted_view = np.empty(n, dtype=np.uint8)
+    cdef uint32_t[:, ::1] output_view = np.zeros((n, e.words), dtype=np.uint32)
+    e.pending_left = 0
+    if n:
+        with nogil:
+            for i in range(n):
+                accepted_view[i] = lh_fill(e, s, <char *> &output_view[i, 0], sizeof(uint32_t), e.words, 1) > 0
+                code = lh_wide_code(e.digits, w)
+                code_view[i, 0] = code.lo
+                code_view[i, 1] = code.hi
+                memcpy(&window_view[i, 0], s.window, w * sizeof(s.window[0]))
+                for k in range(w):
+                    digit_view[i, k] = e.digits[k]
+    trace["window"] = windows.view(np.uint64)
+    trace["digits"] = digit_view
+    trace["code"] = code_view
+    trace["accepted"] = accepted_view
+    trace["output"] = output_view
+    return trace
+
+cdef inline object lh_trace(lh_engine *e, lh_source *s, Py_ssize_t n):
+    """
+    Runs the next n windows and records them. The generator moves on exactly as if it had
+    produced the accepted outputs through generate_into.
+    :return: structured array of n records: window (the w source values), digits (the Lehmer digits),
+        code, accepted (code below the threshold) and output (0 when rejected)
+    """
+    import numpy as np
+    cdef int w = e.w
+    cdef int k
+    cdef Py_ssize_t i
+    cdef uint64_t code
+    if e.wide:
+        return lh_trace_wide(e, s, n)
+    if e.extract:
+        raise ValueError("trace follows one output per window, switch extract off first")
+    if n < 0:
+        raise ValueError(f"n must be non-negative, got {n}")
+    value_type = np.uint64 if lh_source in lh_u64_source else np.float64
+    trace = np.zeros(n, dtype=[("window", value_type, (w,)), ("digits", np.int32, (w,)), ("code", np.uint64),
+                               ("accepted", np.bool_), ("output", np.uint64)])
+    windows = np.empty((n, w * sizeof(s.window[0])), dtype=np.uint8)
+    cdef unsigned char[:, ::1] window_view = windows
+    cdef int[:, ::1] digit_view = np.empty((n, w), dtype=np.intc)
+    cdef uint64_t[::1] code_view = np.empty(n, dtype=np.uint64)
+    cdef unsigned char[::1] accepted_view = np.empty(n, dtype=np.uint8)
+    cdef uint64_t[::1] output_view = np.zeros(n, dtype=np.uint64)
+    if n:
+        with nogil:
+            for i in range(n):
+                accepted_view[i] = lh_trace_window(e, s, <char *> &output_view[0], sizeof(uint64_t), i, &code)
+                code_view[i] = code
+                memcpy(&window_view[i, 0], s.window, w * sizeof(s.window[0]))
+                for k in range(w):
+                    digit_view[i, k] = e.digits[k]
+    trace["window"] = windows.view(value_type)
+    trace["digits"] = digit_view
+    trace["code"] = code_view
+    trace["accepted"] = accepted_view
+    trace["output"] = output_view
+    return trace
+
+cdef inline int lh_debug_fill(lh_engine *e, lh_source *s, char *out, int itemsize, Py_ssize_t n) except -1:
+    # fills out like lh_fill and prints every window it runs on the way
+    cdef Py_ssize_t count = 0
+    cdef Py_ssize_t words
+    cdef uint64_t code
+    cdef lh_u128 wide_code
+    cdef bint accepted
+    cdef int k
+    if e.wide:
+        count = lh_drain(e, out, itemsize, 0, n)
+        while count < n:
+            words = lh_fill(e, s, out + count * itemsize, itemsize, n - count, 1)
+            wide_code = lh_wide_code(e.digits, e.w)
+            print(f"Base sequence: {[s.window[k] for k in range(e.w)]}")
+            print(f"State: {lh_source_state(s)}")
+            print(f"Lehmer digits: {[e.digits[k] for k in range(e.w)]}")
+            print(f"Lehmer code: {(<object> wide_code.hi << 64) | wide_code.lo} (valid? {words > 0})")
+            print("\n----------\n")
+            count += words
+        return 0
+    if e.extract:
+        raise ValueError("debug output follows one output per window, switch extract off first")
+    while count < n:
+        accepted = lh_trace_window(e, s, out, itemsize, count, &code)
+        print(f"Base sequence: {[s.window[k] for k in range(e.w)]}")
+        state = lh_source_state(s)
+        if state is not None:
+            print(f"State: {state}")
+        print(f"Lehmer digits: {[e.digits[k] for k in range(e.w)]}")
+        print(f"Lehmer code: {code} (valid? {bool(accepted)})")
+        print(f"Lehmer code adjusted for range: {lh_mod(code, e.r_div) + e.minimum}")
+        print("\n----------\n")
+        count += accepted
+    return 0
@@ -0,0 +1,656 @@
+/*
+ * Rank kernels and range reduction shared by the Lehmer generators.
+ *
+ * Each kernel computes the Lehmer digits of one window (digits[i] = number of
+ * j > i with window[j] < window[i]) and returns the code sum(digits[i] * f[i]).
+ * The window size is a compile time constant for w = 6..20 so the compiler can
+ * fully unroll the comparisons and vectorize them; any other w falls back to the
+ * generic loop. All kernels give exactly the same result as the generic loop.
+ */
+#ifndef LEHMER_KERNELS_H
+#define LEHMER_KERNELS_H
+
+#include <stddef.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <math.h>
+
+typedef uint64_t (*lh_rank_u64_fn)(const uint64_t *x, const uint64_t *f, int *digits, int w);
+typedef uint64_t (*lh_rank_f64_fn)(const double *x, const uint64_t *f, int *digits, int w);
+
+/* hot-path counters behind the generators' stats(), build with -DLH_STATS=0 to compile them out */
+#ifndef LH_STATS
+#define LH_STATS 1
+#endif
+
+/*
+ * Per-phase tick counters behind the generators' profile(), off unless built with -DLH_PROFILE=1.
+ * lh_ticks reads the time stamp counter on x86, the virtual counter on arm64 and a monotonic
+ * clock in ns elsewhere.
+ */
+#ifndef LH_PROFILE
+#define LH_PROFILE 0
+#endif
+
+#if LH_PROFILE && (defined(_M_X64) || defined(_M_IX86))
+#include <intrin.h>
+static inline uint64_t lh_ticks(void) { return __rdtsc(); }
+#elif LH_PROFILE && (defined(__x86_64__) || defined(__i386__))
+#include <x86intrin.h>
+static inline uint64_t lh_ticks(void) { return __rdtsc(); }
+#elif LH_PROFILE && defined(__aarch64__)
+static inline uint64_t lh_ticks(void) {
+    uint64_t t;
+    __asm__ __volatile__("mrs %0, cntvct_el0" : "=r"(t));
+    return t;
+}
+#elif LH_PROFILE
+#include <time.h>
+static inline uint64_t lh_ticks(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t) ts.tv_sec * 1000000000u + (uint64_t) ts.tv_nsec;
+}
+#else
+static inline uint64_t lh_ticks(void) { return 0; }
+#endif
+
+#define LH_RANK_MIN_W 6
+#define LH_RANK_MAX_W 20
+
+#define LH_DEFINE_RANK_GENERIC(T, NAME)                                         \
+static inline uint64_t lh_rank_##NAME##_generic(const T *x, const uint64_t *f,        \
+                                         int *digits, int w) {                 \
+    uint64_t code = 0;                                                          \
+    int i, j, s;                                                                \
+    for (i = 0; i < w; i++) {                                                   \
+        s = 0;                                                                  \
+        for (j = i + 1; j < w; j++) s += (x[j] < x[i]);                         \
+        digits[i] = s;                                                          \
+        code += (uint64_t) s * f[i];                                            \
+    }                                                                           \
+    return code;                                                                \
+}
+
+#define LH_DEFINE_RANK_FIXED(T, NAME, W)                                        \
+static inline uint64_t lh_rank_##NAME##_##W(const T *x, const uint64_t *f,            \
+                                     int *digits, int w) {                     \
+    uint64_t code = 0;                                                          \
+    int i, j, s;                                                                \
+    (void) w;                                                                   \
+    for (i = 0; i < W; i++) {                                                   \
+        const T xi = x[i];                                                      \
+        s = 0;                                                                  \
+        for (j = i + 1; j < W; j++) s += (x[j] < xi);                           \
+        digits[i] = s;                                                          \
+        code += (uint64_t) s * f[i];                                            \
+    }                                                                           \
+    return code;                                                                \
+}
+
+#define LH_DEFINE_RANK_FAMILY(T, NAME)                                          \
+LH_DEFINE_RANK_GENERIC(T, NAME)                                                 \
+LH_DEFINE_RANK_FIXED(T, NAME, 6)  LH_DEFINE_RANK_FIXED(T, NAME, 7)              \
+LH_DEFINE_RANK_FIXED(T, NAME, 8)  LH_DEFINE_RANK_FIXED(T, NAME, 9)              \
+LH_DEFINE_RANK_FIXED(T, NAME, 10) LH_DEFINE_RANK_FIXED(T, NAME, 11)             \
+LH_DEFINE_RANK_FIXED(T, NAME, 12) LH_DEFINE_RANK_FIXED(T, NAME, 13)             \
+LH_DEFINE_RANK_FIXED(T, NAME, 14) LH_DEFINE_RANK_FIXED(T, NAME, 15)             \
+LH_DEFINE_RANK_FIXED(T, NAME, 16) LH_DEFINE_RANK_FIXED(T, NAME, 17)             \
+LH_DEFINE_RANK_FIXED(T, NAME, 18) LH_DEFINE_RANK_FIXED(T, NAME, 19)             \
+LH_DEFINE_RANK_FIXED(T, NAME, 20)                                               \
+static inline lh_rank_##NAME##_fn lh_select_rank_##NAME(int w) {                       \
+    static const lh_rank_##NAME##_fn table[] = {                                \
+        lh_rank_##NAME##_6,  lh_rank_##NAME##_7,  lh_rank_##NAME##_8,           \
+        lh_rank_##NAME##_9,  lh_rank_##NAME##_10, lh_rank_##NAME##_11,          \
+        lh_rank_##NAME##_12, lh_rank_##NAME##_13, lh_rank_##NAME##_14,          \
+        lh_rank_##NAME##_15, lh_rank_##NAME##_16, lh_rank_##NAME##_17,          \
+        lh_rank_##NAME##_18, lh_rank_##NAME##_19, lh_rank_##NAME##_20,          \
+    };                                                                          \
+    if (w < LH_RANK_MIN_W || w > LH_RANK_MAX_W) return lh_rank_##NAME##_generic; \
+    return table[w - LH_RANK_MIN_W];                                            \
+}
+
+LH_DEFINE_RANK_FAMILY(uint64_t, u64)
+LH_DEFINE_RANK_FAMILY(double, f64)
+
+/*
+ * Lockstep kernels for LH_LANES independent windows stored lane-interleaved,
+ * x[k * LH_LANES + lane]. Every comparison covers all lanes at once.
+ */
+#define LH_LANES 4
+
+typedef void (*lh_rank_lanes_u64_fn)(const uint64_t *x, const uint64_t *f, uint64_t *code, int w);
+
+#define LH_DEFINE_RANK_LANES(W, NAME)                                           \
+static inline void lh_rank_lanes_u64_##NAME(const uint64_t *x, const uint64_t *f,     \
+                                     uint64_t *code, int w) {                  \
+    uint64_t c[LH_LANES] = {0};                                                 \
+    int s[LH_LANES];                                                            \
+    int i, j, l;                                                                \
+    (void) w;                                                                   \
+    for (i = 0; i < (W); i++) {                                                 \
+        for (l = 0; l < LH_LANES; l++) s[l] = 0;                                \
+        for (j = i + 1; j < (W); j++)                                           \
+            for (l = 0; l < LH_LANES; l++)                                      \
+                s[l] += (x[j * LH_LANES + l] < x[i * LH_LANES + l]);            \
+        for (l = 0; l < LH_LANES; l++) c[l] += (uint64_t) s[l] * f[i];          \
+    }                                                                           \
+    for (l = 0; l < LH_LANES; l++) code[l] = c[l];                              \
+}
+
+LH_DEFINE_RANK_LANES(w, generic)
+LH_DEFINE_RANK_LANES(6, 6)   LH_DEFINE_RANK_LANES(7, 7)   LH_DEFINE_RANK_LANES(8, 8)
+LH_DEFINE_RANK_LANES(9, 9)   LH_DEFINE_RANK_LANES(10, 10) LH_DEFINE_RANK_LANES(11, 11)
+LH_DEFINE_RANK_LANES(12, 12) LH_DEFINE_RANK_LANES(13, 13) LH_DEFINE_RANK_LANES(14, 14)
+LH_DEFINE_RANK_LANES(15, 15) LH_DEFINE_RANK_LANES(16, 16) LH_DEFINE_RANK_LANES(17, 17)
+LH_DEFINE_RANK_LANES(18, 18) LH_DEFINE_RANK_LANES(19, 19) LH_DEFINE_RANK_LANES(20, 20)
+
+static inline lh_rank_lanes_u64_fn lh_select_rank_lanes_u64(int w) {
+    static const lh_rank_lanes_u64_fn table[] = {
+        lh_rank_lanes_u64_6,  lh_rank_lanes_u64_7,  lh_rank_lanes_u64_8,
+        lh_rank_lanes_u64_9,  lh_rank_lanes_u64_10, lh_rank_lanes_u64_11,
+        lh_rank_lanes_u64_12, lh_rank_lanes_u64_13, lh_rank_lanes_u64_14,
+        lh_rank_lanes_u64_15, lh_rank_lanes_u64_16, lh_rank_lanes_u64_17,
+        lh_rank_lanes_u64_18, lh_rank_lanes_u64_19, lh_rank_lanes_u64_20,
+    };
+    if (w < LH_RANK_MIN_W || w > LH_RANK_MAX_W) return lh_rank_lanes_u64_generic;
+    return table[w - LH_RANK_MIN_W];
+}
+
+/*
+ * Lookup table ranking for small windows. Digit i only depends on the comparison
+ * bits of x[i] against x[i + 1 .. w - 1] (row i, w - 1 - i bits), so the rows are
+ * packed greedily into groups of at most LH_LUT_BITS bits (a longer row gets a group
+ * of its own) and table g maps the packed bits of group g straight to its share of
+ * the code, sum(popcount(row i) * (w - 1 - i)!). Ranking a window is then one comparison
+ * pass plus one load per group instead of the multiply-adds. The partial codes are
+ * below w! and fit in 32 bits up to LH_LUT_MAX_W.
+ *
+ * The tables only depend on w. lh_lut_tables builds them on first use and keeps
+ * them for the lifetime of the module; it returns NULL for an unsupported w or
+ * when out of memory. It is not thread safe, call it while holding the GIL.
+ */
+#define LH_LUT_BITS 10
+#define LH_LUT_MIN_W 4
+#define LH_LUT_MAX_W 12
+
+typedef const uint32_t *const *lh_lut;
+typedef uint64_t (*lh_rank_lut_u64_fn)(const uint64_t *x, lh_lut tables, int w);
+
+static inline lh_lut lh_lut_tables(int w) {
+    static uint32_t *cache[LH_LUT_MAX_W + 1][LH_LUT_MAX_W];
+    static int built[LH_LUT_MAX_W + 1];
+    uint64_t f[LH_LUT_MAX_W];
+    uint32_t *t, sum, field;
+    uint32_t idx, size;
+    int i, r, g = 0, first = 0, bits = 0, shift, b;
+
+    if (w < 2 || w > LH_LUT_MAX_W) return NULL;
+    if (built[w]) return (lh_lut) cache[w];
+
+    f[w - 1] = 1;
+    for (i = w - 2; i >= 0; i--) f[i] = f[i + 1] * (uint64_t) (w - 1 - i);
+
+    for (i = 0; i <= w; i++) {
+        if (i == w || (bits && bits + (w - 1 - i) > LH_LUT_BITS)) {
+            /* close the group of rows [first, i) */
+            size = (uint32_t) 1 << bits;
+            t = (uint32_t *) malloc(size * sizeof(uint32_t));
+            if (!t) {
+                while (g > 0) free(cache[w][--g]);
+                return NULL;
+            }
+            for (idx = 0; idx < size; idx++) {
+                sum = 0;
+                shift = 0;
+                for (r = first; r < i; r++) {
+                    b = w - 1 - r;
+                    for (field = (idx >> shift) & (((uint32_t) 1 << b) - 1); field; field &= field - 1)
+                        sum += (uint32_t) f[r];
+                    shift += b;
+                }
+                t[idx] = sum;
+            }
+            cache[w][g++] = t;
+            first = i;
+            bits = 0;
+        }
+        if (i < w) bits += w - 1 - i;
+    }
+    built[w] = 1;
+    return (lh_lut) cache[w];
+}
+
+/*
+ * The rows are built first, independent of each other like the digit sums of the
+ * loop kernels, then packed into the groups of lh_lut_tables. The last row is empty.
+ */
+#define LH_DEFINE_RANK_LUT(W, NAME)                                             \
+static inline uint64_t lh_rank_lut_u64_##NAME(const uint64_t *x, lh_lut tables,       \
+                                       int w) {                                \
+    uint32_t row[LH_LUT_MAX_W];                                                 \
+    uint64_t code = 0;                                                          \
+    uint32_t idx = 0;                                                           \
+    int i, j, g = 0, bits = 0;                                                  \
+    (void) w;                                                                   \
+    for (i = 0; i < (W) - 1; i++) {                                             \
+        const uint64_t xi = x[i];                                               \
+        uint32_t r = 0;                                                         \
+        for (j = i + 1; j < (W); j++) r |= (uint32_t) (x[j] < xi) << (j - i - 1); \
+        row[i] = r;                                                             \
+    }                                                                           \
+    for (i = 0; i < (W) - 1; i++) {                                             \
+        if (bits && bits + (W) - 1 - i > LH_LUT_BITS) {                         \
+            code += tables[g++][idx];                                           \
+            idx = 0;                                                            \
+            bits = 0;                                                           \
+        }                                                                       \
+        idx |= row[i] << bits;                                                  \
+        bits += (W) - 1 - i;                                                    \
+    }                                                                           \
+    return code + tables[g][idx];                                               \
+}
+
+LH_DEFINE_RANK_LUT(w, generic)
+LH_DEFINE_RANK_LUT(4, 4)   LH_DEFINE_RANK_LUT(5, 5)   LH_DEFINE_RANK_LUT(6, 6)
+LH_DEFINE_RANK_LUT(7, 7)   LH_DEFINE_RANK_LUT(8, 8)   LH_DEFINE_RANK_LUT(9, 9)
+LH_DEFINE_RANK_LUT(10, 10) LH_DEFINE_RANK_LUT(11, 11) LH_DEFINE_RANK_LUT(12, 12)
+
+static inline lh_rank_lut_u64_fn lh_select_rank_lut_u64(int w) {
+    static const lh_rank_lut_u64_fn table[] = {
+        lh_rank_lut_u64_4,  lh_rank_lut_u64_5,  lh_rank_lut_u64_6,
+        lh_rank_lut_u64_7,  lh_rank_lut_u64_8,  lh_rank_lut_u64_9,
+        lh_rank_lut_u64_10, lh_rank_lut_u64_11, lh_rank_lut_u64_12,
+    };
+    if (w < LH_LUT_MIN_W || w > LH_LUT_MAX_W) return lh_rank_lut_u64_generic;
+    return table[w - LH_LUT_MIN_W];
+}
+
+/*
+ * Ranking through a sorting network, for windows of up to LH_NETWORK_MAX_W values.
+ * The (value, position) pairs go through Batcher's odd-even merge sort network with
+ * branch-free compare-exchanges, equal values ordered by position. Walking the sorted
+ * positions, the digit of a position is the number of positions to its right among
+ * those already walked (the smaller values): one popcount of a bitmask, where a
+ * Fenwick tree would need a log w query. No calls and no data dependent branches, so it gives
+ * the same digits as the generic loop (equal values are not counted) at a fixed cost.
+ * lh_rank_network_u64 reads the network from tables, call lh_network_init once first;
+ * lh_select_rank_network_u64 hands out the unrolled kernels below for w = 6..20.
+ */
+#define LH_NETWORK_MAX_W 32
+
+static unsigned char lh_network[LH_NETWORK_MAX_W + 1][192][2];
+static int lh_network_size[LH_NETWORK_MAX_W + 1];
+
+static inline void lh_network_init(void) {
+    int n, p, k, j, i, c;
+    for (n = 2; n <= LH_NETWORK_MAX_W; n++) {
+        c = 0;
+        for (p = 1; p < n; p += p)
+            for (k = p; k >= 1; k /= 2)
+                for (j = k % p; j <= n - 1 - k; j += 2 * k)
+                    for (i = 0; i <= k - 1 && i <= n - j - k - 1; i++)
+                        if ((i + j) / (p * 2) == (i + j + k) / (p * 2)) {
+                            lh_network[n][c][0] = (unsigned char) (i + j);
+                            lh_network[n][c][1] = (unsigned char) (i + j + k);
+                            c++;
+                        }
+        lh_network_size[n] = c;
+    }
+}
+
+static inline int lh_popcount32(uint32_t x) {
+#if defined(__GNUC__)
+    return __builtin_popcount(x);
+#else
+    x = x - ((x >> 1) & 0x55555555u);
+    x = (x & 0x33333333u) + ((x >> 2) & 0x33333333u);
+    return (int) ((((x + (x >> 4)) & 0x0F0F0F0Fu) * 0x01010101u) >> 24);
+#endif
+}
+
+static inline uint64_t lh_rank_network_u64(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t v[LH_NETWORK_MAX_W], p[LH_NETWORK_MAX_W];
+    uint64_t va, vb, pa, pb, swap, dv, dp, code = 0;
+    uint32_t seen = 0;
+    int i, a, b, d, pos;
+
+    for (i = 0; i < w; i++) {
+        v[i] = x[i];
+        p[i] = (uint64_t) i;
+    }
+    for (i = 0; i < lh_network_size[w]; i++) {
+        a = lh_network[w][i][0];
+        b = lh_network[w][i][1];
+        va = v[a], vb = v[b], pa = p[a], pb = p[b];
+        /* all ones when the pair is out of order */
+        swap = (uint64_t) 0 - (uint64_t) ((vb < va) | ((vb == va) & (pb < pa)));
+        dv = (va ^ vb) & swap;
+        dp = (pa ^ pb) & swap;
+        v[a] = va ^ dv, v[b] = vb ^ dv;
+        p[a] = pa ^ dp, p[b] = pb ^ dp;
+    }
+    for (i = 0; i < w; i++) {
+        pos = (int) p[i];
+        d = lh_popcount32(seen >> pos);
+        digits[pos] = d;
+        code += (uint64_t) d * f[pos];
+        seen |= (uint32_t) 1 << pos;
+    }
+    return code;
+}
+
+/*
+ * The unrolled kernels of lehmer_network.h (generated by network_gen.py) run the same network
+ * straight-line on local variables. The position goes into the low LH_NETWORK_POS_BITS of each
+ * value, so one key holds the pair and a compare-exchange is a min and a max (two cmovs). This
+ * orders the values by their high bits only: two keys that are equal there (equal values, or
+ * values that only differ in the low bits) set clash during the walk, and that window is
+ * ranked again through the generic loop. The sources draw 64 bit states, so in practice it
+ * never happens.
+ */
+#define LH_NETWORK_POS_BITS 5
+#define LH_NETWORK_POS_MASK (((uint64_t) 1 << LH_NETWORK_POS_BITS) - 1)
+
+#define LH_NETWORK_KEY(x, i) (((x)[i] & ~LH_NETWORK_POS_MASK) | (uint64_t) (i))
+
+#define LH_NETWORK_CX(a, b) {                                                   \
+    const uint64_t lo = (b) < (a) ? (b) : (a);                                  \
+    const uint64_t hi = (b) < (a) ? (a) : (b);                                  \
+    (a) = lo;                                                                   \
+    (b) = hi;                                                                   \
+}
+
+#define LH_NETWORK_FIRST(k) {                                                   \
+    const int pos = (int) ((k) & LH_NETWORK_POS_MASK);                          \
+    digits[pos] = 0;                                                            \
+    seen = (uint32_t) 1 << pos;                                                 \
+}
+
+#define LH_NETWORK_WALK(k, prev) {                                              \
+    const int pos = (int) ((k) & LH_NETWORK_POS_MASK);                          \
+    const int d = lh_popcount32(seen >> pos);                                   \
+    clash |= (((k) ^ (prev)) >> LH_NETWORK_POS_BITS) == 0;                      \
+    digits[pos] = d;                                                            \
+    code += (uint64_t) d * f[pos];                                              \
+    seen |= (uint32_t) 1 << pos;                                                \
+}
+
+#include "lehmer_network.h"
+
+static inline lh_rank_u64_fn lh_select_rank_network_u64(int w) {
+    switch (w) {
+        case 6: return lh_rank_network_u64_6;
+        case 7: return lh_rank_network_u64_7;
+        case 8: return lh_rank_network_u64_8;
+        case 9: return lh_rank_network_u64_9;
+        case 10: return lh_rank_network_u64_10;
+        case 11: return lh_rank_network_u64_11;
+        case 12: return lh_rank_network_u64_12;
+        case 13: return lh_rank_network_u64_13;
+        case 14: return lh_rank_network_u64_14;
+        case 15: return lh_rank_network_u64_15;
+        case 16: return lh_rank_network_u64_16;
+        case 17: return lh_rank_network_u64_17;
+        case 18: return lh_rank_network_u64_18;
+        case 19: return lh_rank_network_u64_19;
+        case 20: return lh_rank_network_u64_20;
+        default: return lh_rank_network_u64;
+    }
+}
+
+/*
+ * Wide codes for w = 21..34: w! no longer fits in 64 bits, but 34! < 2^128.
+ * The code is kept as two 64-bit halves so no 128-bit integer type is needed.
+ *
+ * lh_rank_wide_merge_u64 gets the digits in O(w log w) from a bottom-up merge
+ * sort of (value, position) pairs: when a value of the left run is merged, every
+ * value already taken from the right run is smaller and lies to its right.
+ * Every merge step is a branch on random data though, so up to w = 34 the
+ * w^2 / 2 branch-free comparisons of lh_rank_wide_u64 are still faster.
+ */
+#define LH_WIDE_MAX_W 34
+
+typedef struct {
+    uint64_t lo;
+    uint64_t hi;
+} lh_u128;
+
+typedef lh_u128 (*lh_rank_wide_fn)(const uint64_t *x, int *digits, int w);
+
+/* x * m + a for m, a < 2^32 */
+static inline lh_u128 lh_u128_mul_add(lh_u128 x, uint32_t m, uint32_t a) {
+    uint64_t low = (x.lo & 0xFFFFFFFFu) * m + a;
+    uint64_t high = (x.lo >> 32) * m + (low >> 32);
+    x.lo = (low & 0xFFFFFFFFu) | (high << 32);
+    x.hi = x.hi * m + (high >> 32);
+    return x;
+}
+
+static inline int lh_u128_less(lh_u128 a, lh_u128 b) {
+    return a.hi < b.hi || (a.hi == b.hi && a.lo < b.lo);
+}
+
+/* sum(digits[i] * (w - 1 - i)!) by Horner's rule */
+static inline lh_u128 lh_wide_code(const int *digits, int w) {
+    lh_u128 code = {0, 0};
+    int i;
+    for (i = 0; i < w; i++) code = lh_u128_mul_add(code, (uint32_t) (w - i), (uint32_t) digits[i]);
+    return code;
+}
+
+static inline lh_u128 lh_rank_wide_u64(const uint64_t *x, int *digits, int w) {
+    int i, j, smaller;
+    for (i = 0; i < w; i++) {
+        smaller = 0;
+        for (j = i + 1; j < w; j++) smaller += (x[j] < x[i]);
+        digits[i] = smaller;
+    }
+    return lh_wide_code(digits, w);
+}
+
+static inline lh_u128 lh_rank_wide_merge_u64(const uint64_t *x, int *digits, int w) {
+    uint64_t values[2][LH_WIDE_MAX_W];
+    int positions[2][LH_WIDE_MAX_W];
+    const uint64_t *v;
+    const int *p;
+    uint64_t *vm;
+    int *pm;
+    int i, j, k, lo, mid, hi, run, from = 0;
+
+    for (i = 0; i < w; i++) {
+        values[0][i] = x[i];
+        positions[0][i] = i;
+        digits[i] = 0;
+    }
+    /* runs of length run in buffer from are merged into runs of 2 * run in the other one */
+    for (run = 1; run < w; run *= 2, from ^= 1) {
+        v = values[from], p = positions[from];
+        vm = values[from ^ 1], pm = positions[from ^ 1];
+        for (lo = 0; lo < w; lo += 2 * run) {
+            mid = lo + run < w ? lo + run : w;
+            hi = mid + run < w ? mid + run : w;
+            i = lo, j = mid, k = lo;
+            while (i < mid && j < hi) {
+                if (v[j] < v[i]) {
+                    vm[k] = v[j];
+                    pm[k++] = p[j++];
+                } else {
+                    digits[p[i]] += j - mid;
+                    vm[k] = v[i];
+                    pm[k++] = p[i++];
+                }
+            }
+            while (i < mid) {
+                digits[p[i]] += j - mid;
+                vm[k] = v[i];
+                pm[k++] = p[i++];
+            }
+            while (j < hi) {
+                vm[k] = v[j];
+                pm[k++] = p[j++];
+            }
+        }
+    }
+    return lh_wide_code(digits, w);
+}
+
+/*
+ * x % d through a precomputed reciprocal m = floor((2^64 - 1) / d).
+ * The estimated quotient is at most two below the real one, so the remainder
+ * needs at most two corrections. Falls back to % without 128-bit integers.
+ */
+typedef struct {
+    uint64_t d;
+    uint64_t m;
+} lh_divisor;
+
+static inline lh_divisor lh_divisor_init(uint64_t d) {
+    lh_divisor dv;
+    dv.d = d;
+    dv.m = UINT64_MAX / d;
+    return dv;
+}
+
+static inline uint64_t lh_mod(uint64_t x, lh_divisor dv) {
+#if defined(__SIZEOF_INT128__)
+    uint64_t q = (uint64_t) (((unsigned __int128) x * dv.m) >> 64);
+    uint64_t r = x - q * dv.d;
+    while (r >= dv.d) r -= dv.d;
+    return r;
+#else
+    return x % dv.d;
+#endif
+}
+
+/* x % d like lh_mod, also storing the quotient x / d in *q */
+static inline uint64_t lh_divmod(uint64_t x, lh_divisor dv, uint64_t *q) {
+#if defined(__SIZEOF_INT128__)
+    uint64_t quotient = (uint64_t) (((unsigned __int128) x * dv.m) >> 64);
+    uint64_t r = x - quotient * dv.d;
+    while (r >= dv.d) {
+        r -= dv.d;
+        quotient++;
+    }
+    *q = quotient;
+    return r;
+#else
+    *q = x / dv.d;
+    return x % dv.d;
+#endif
+}
+
+/*
+ * Jump-ahead for the sources. lh_lcg_jump applies x -> a * x + c k times in
+ * O(log k) by squaring the affine map (Brown, "Random number generation with
+ * arbitrary strides", 1994).
+ */
+static inline uint64_t lh_lcg_jump(uint64_t x, uint64_t a, uint64_t c, uint64_t k) {
+    uint64_t acc_a = 1, acc_c = 0;
+    while (k) {
+        if (k & 1) {
+            acc_a *= a;
+            acc_c = acc_c * a + c;
+        }
+        c *= a + 1;
+        a *= a;
+        k >>= 1;
+    }
+    return acc_a * x + acc_c;
+}
+
+/*
+ * xorshift64 (13, 7, 17) is linear over GF(2). lh_xorshift64_powers[i] holds the
+ * columns of its transition matrix raised to 2^i, so a jump of k steps is one
+ * matrix-vector product per set bit of k. Call lh_xorshift64_jump_init once first.
+ */
+static uint64_t lh_xorshift64_powers[64][64];
+
+static inline uint64_t lh_gf2_apply(const uint64_t *columns, uint64_t x) {
+    uint64_t r = 0;
+    int b;
+    for (b = 0; b < 64; b++) r ^= columns[b] & (0 - ((x >> b) & 1));
+    return r;
+}
+
+static inline void lh_xorshift64_jump_init(void) {
+    int i, b;
+    uint64_t x;
+    for (b = 0; b < 64; b++) {
+        x = (uint64_t) 1 << b;
+        x ^= x << 13;
+        x ^= x >> 7;
+        x ^= x << 17;
+        lh_xorshift64_powers[0][b] = x;
+    }
+    for (i = 1; i < 64; i++)
+        for (b = 0; b < 64; b++)
+            lh_xorshift64_powers[i][b] = lh_gf2_apply(lh_xorshift64_powers[i - 1],
+                                                      lh_xorshift64_powers[i - 1][b]);
+}
+
+static inline uint64_t lh_xorshift64_jump(uint64_t x, uint64_t k) {
+    int i;
+    for (i = 0; k; i++, k >>= 1)
+        if (k & 1) x = lh_gf2_apply(lh_xorshift64_powers[i], x);
+    return x;
+}
+
+/* stores v at out[i] for an unsigned output buffer of the given itemsize */
+static inline void lh_store(char *out, int itemsize, ptrdiff_t i, uint64_t v) {
+    switch (itemsize) {
+        case 1: ((uint8_t *) out)[i] = (uint8_t) v; break;
+        case 2: ((uint16_t *) out)[i] = (uint16_t) v; break;
+        case 4: ((uint32_t *) out)[i] = (uint32_t) v; break;
+        default: ((uint64_t *) out)[i] = v; break;
+    }
+}
+
+/*
+ * Ziggurat tables for the normal and exponential sources (Marsaglia & Tsang 2000, in the double
+ * precision form of Doornik 2005). Layer i covers [0, x[i]] and lies entirely under the density
+ * up to x[i + 1], so a draw u * x[i] with u < ratio[i] = x[i + 1] / x[i] is accepted without
+ * evaluating the density; layer 0 is the base strip with the tail beyond x[1] = R.
+ * Call lh_ziggurat_init once first.
+ */
+#define LH_ZIG_NORMAL_LAYERS 128
+#define LH_ZIG_NORMAL_R 3.442619855899
+#define LH_ZIG_NORMAL_V 9.91256303526217e-3
+#define LH_ZIG_EXP_LAYERS 256
+#define LH_ZIG_EXP_R 7.69711747013104972
+#define LH_ZIG_EXP_V 3.949659822581572e-3
+
+static double lh_zig_normal_x[LH_ZIG_NORMAL_LAYERS + 1], lh_zig_normal_ratio[LH_ZIG_NORMAL_LAYERS];
+static double lh_zig_exp_x[LH_ZIG_EXP_LAYERS + 1], lh_zig_exp_ratio[LH_ZIG_EXP_LAYERS];
+
+static inline void lh_ziggurat_init(void) {
+    int i;
+    double f = exp(-0.5 * LH_ZIG_NORMAL_R * LH_ZIG_NORMAL_R);
+    lh_zig_normal_x[0] = LH_ZIG_NORMAL_V / f;
+    lh_zig_normal_x[1] = LH_ZIG_NORMAL_R;
+    lh_zig_normal_x[LH_ZIG_NORMAL_LAYERS] = 0;
+    for (i = 2; i < LH_ZIG_NORMAL_LAYERS; i++) {
+        lh_zig_normal_x[i] = sqrt(-2 * log(LH_ZIG_NORMAL_V / lh_zig_normal_x[i - 1] + f));
+        f = exp(-0.5 * lh_zig_normal_x[i] * lh_zig_normal_x[i]);
+    }
+    for (i = 0; i < LH_ZIG_NORMAL_LAYERS; i++)
+        lh_zig_normal_ratio[i] = lh_zig_normal_x[i + 1] / lh_zig_normal_x[i];
+
+    f = exp(-LH_ZIG_EXP_R);
+    lh_zig_exp_x[0] = LH_ZIG_EXP_V / f;
+    lh_zig_exp_x[1] = LH_ZIG_EXP_R;
+    lh_zig_exp_x[LH_ZIG_EXP_LAYERS] = 0;
+    for (i = 2; i < LH_ZIG_EXP_LAYERS; i++) {
+        lh_zig_exp_x[i] = -log(LH_ZIG_EXP_V / lh_zig_exp_x[i - 1] + f);
+        f = exp(-lh_zig_exp_x[i]);
+    }
+    for (i = 0; i < LH_ZIG_EXP_LAYERS; i++)
+        lh_zig_exp_ratio[i] = lh_zig_exp_x[i + 1] / lh_zig_exp_x[i];
+}
+
+/* uniform on [0, 1) from the top 53 bits, the low bits stay free for the layer index */
+static inline double lh_u01(uint64_t x) {
+    return (double) (x >> 11) * (1.0 / 9007199254740992.0);
+}
+
+#endif /* LEHMER_KERNELS_H */
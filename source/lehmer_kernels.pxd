@@ -0,0 +1,82 @@
+from libc.stdint cimport uint64_t
+from cpython.buffer cimport PyObject_GetBuffer, PyBuffer_Release, PyBUF_WRITABLE, PyBUF_C_CONTIGUOUS, PyBUF_FORMAT
+
+cdef extern from "lehmer_kernels.h" nogil:
+    ctypedef uint64_t (*lh_rank_u64_fn)(const uint64_t *x, const uint64_t *f, int *digits, int w) noexcept nogil
+    ctypedef uint64_t (*lh_rank_f64_fn)(const double *x, const uint64_t *f, int *digits, int w) noexcept nogil
+
+    enum: LH_STATS
+    enum: LH_PROFILE
+    uint64_t lh_ticks()
+
+    lh_rank_u64_fn lh_select_rank_u64(int w)
+    lh_rank_f64_fn lh_select_rank_f64(int w)
+
+    enum: LH_LANES
+    ctypedef void (*lh_rank_lanes_u64_fn)(const uint64_t *x, const uint64_t *f, uint64_t *code, int w) noexcept nogil
+    lh_rank_lanes_u64_fn lh_select_rank_lanes_u64(int w)
+
+    enum: LH_LUT_MAX_W
+    ctypedef const void *lh_lut
+    ctypedef uint64_t (*lh_rank_lut_u64_fn)(const uint64_t *x, lh_lut tables, int w) noexcept nogil
+    lh_lut lh_lut_tables(int w)
+    lh_rank_lut_u64_fn lh_select_rank_lut_u64(int w)
+
+    enum: LH_NETWORK_MAX_W
+    void lh_network_init()
+    uint64_t lh_rank_network_u64(const uint64_t *x, const uint64_t *f, int *digits, int w)
+    lh_rank_u64_fn lh_select_rank_network_u64(int w)
+
+    enum: LH_WIDE_MAX_W
+    ctypedef struct lh_u128:
+        uint64_t lo
+        uint64_t hi
+
+    ctypedef lh_u128 (*lh_rank_wide_fn)(const uint64_t *x, int *digits, int w) noexcept nogil
+    bint lh_u128_less(lh_u128 a, lh_u128 b)
+    lh_u128 lh_wide_code(const int *digits, int w)
+    lh_u128 lh_rank_wide_u64(const uint64_t *x, int *digits, int w)
+    lh_u128 lh_rank_wide_merge_u64(const uint64_t *x, int *digits, int w)
+
+    enum: LH_ZIG_NORMAL_LAYERS
+    enum: LH_ZIG_EXP_LAYERS
+    double LH_ZIG_NORMAL_R
+    double LH_ZIG_EXP_R
+    double lh_zig_normal_x[]
+    double lh_zig_normal_ratio[]
+    double lh_zig_exp_x[]
+    double lh_zig_exp_ratio[]
+    void lh_ziggurat_init()
+    double lh_u01(uint64_t x)
+
+    ctypedef struct lh_divisor:
+        uint64_t d
+        uint64_t m
+
+    lh_divisor lh_divisor_init(uint64_t d)
+    uint64_t lh_mod(uint64_t x, lh_divisor dv)
+    uint64_t lh_divmod(uint64_t x, lh_divisor dv, uint64_t *q)
+
+    void lh_store(char *out, int itemsize, Py_ssize_t i, uint64_t v)
+
+    uint64_t lh_lcg_jump(uint64_t x, uint64_t a, uint64_t c, uint64_t k)
+    void lh_xorshift64_jump_init()
+    uint64_t lh_xorshift64_jump(uint64_t x, uint64_t k)
+
+
+cdef inline int lh_acquire_output(object out, Py_buffer *view, long long maximum) except -1:
+    """
+    Gets a writable, contiguous unsigned integer buffer for generate_into.
+    The caller must release it with PyBuffer_Release.
+    :param out: buffer or memoryview of uint8, uint16, uint32 or uint64
+    :param maximum: largest value the generator can produce
+    """
+    PyObject_GetBuffer(out, view, PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS | PyBUF_FORMAT)
+    fmt = (<bytes> view.format).decode()
+    if fmt.lstrip('@=<') not in ('B', 'H', 'I', 'L', 'Q') or view.itemsize not in (1, 2, 4, 8):
+        PyBuffer_Release(view)
+        raise TypeError(f"output buffer must hold native unsigned integers, got format '{fmt}'")
+    if view.itemsize < 8 and maximum >> (8 * view.itemsize):
+        PyBuffer_Release(view)
+        raise ValueError(f"maximum {maximum} does not fit in a {8 * view.itemsize}-bit output buffer")
+    return 0
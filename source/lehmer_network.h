@@ -0,0 +1,474 @@
+/*
+ * Generated by network_gen.py, do not edit. Included by lehmer_kernels.h,
+ * see lh_select_rank_network_u64 there.
+ */
+#ifndef LEHMER_NETWORK_H
+#define LEHMER_NETWORK_H
+
+/* 12 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_6(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k0, k2)
+    LH_NETWORK_CX(k1, k3) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k0, k4) LH_NETWORK_CX(k1, k5)
+    LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 16 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_7(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k0, k2)
+    LH_NETWORK_CX(k1, k3) LH_NETWORK_CX(k4, k6) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k0, k4) LH_NETWORK_CX(k1, k5) LH_NETWORK_CX(k2, k6) LH_NETWORK_CX(k2, k4)
+    LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 19 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_8(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k0, k2) LH_NETWORK_CX(k1, k3) LH_NETWORK_CX(k4, k6) LH_NETWORK_CX(k5, k7)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k0, k4) LH_NETWORK_CX(k1, k5)
+    LH_NETWORK_CX(k2, k6) LH_NETWORK_CX(k3, k7) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 28 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_9(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7), k8 = LH_NETWORK_KEY(x, 8);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k0, k2) LH_NETWORK_CX(k1, k3) LH_NETWORK_CX(k4, k6) LH_NETWORK_CX(k5, k7)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k0, k4) LH_NETWORK_CX(k1, k5)
+    LH_NETWORK_CX(k2, k6) LH_NETWORK_CX(k3, k7) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k0, k8)
+    LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k6, k8)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k7, k8)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    LH_NETWORK_WALK(k8, k7)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 32 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_10(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7), k8 = LH_NETWORK_KEY(x, 8),
+             k9 = LH_NETWORK_KEY(x, 9);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k8, k9) LH_NETWORK_CX(k0, k2) LH_NETWORK_CX(k1, k3) LH_NETWORK_CX(k4, k6)
+    LH_NETWORK_CX(k5, k7) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k0, k4)
+    LH_NETWORK_CX(k1, k5) LH_NETWORK_CX(k2, k6) LH_NETWORK_CX(k3, k7) LH_NETWORK_CX(k2, k4)
+    LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k0, k8) LH_NETWORK_CX(k1, k9) LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9)
+    LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k6, k8) LH_NETWORK_CX(k7, k9)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k7, k8)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    LH_NETWORK_WALK(k8, k7) LH_NETWORK_WALK(k9, k8)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 38 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_11(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7), k8 = LH_NETWORK_KEY(x, 8),
+             k9 = LH_NETWORK_KEY(x, 9), k10 = LH_NETWORK_KEY(x, 10);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k8, k9) LH_NETWORK_CX(k0, k2) LH_NETWORK_CX(k1, k3) LH_NETWORK_CX(k4, k6)
+    LH_NETWORK_CX(k5, k7) LH_NETWORK_CX(k8, k10) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k0, k4) LH_NETWORK_CX(k1, k5) LH_NETWORK_CX(k2, k6)
+    LH_NETWORK_CX(k3, k7) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k1, k2)
+    LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k0, k8)
+    LH_NETWORK_CX(k1, k9) LH_NETWORK_CX(k2, k10) LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9)
+    LH_NETWORK_CX(k6, k10) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k6, k8)
+    LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k7, k8) LH_NETWORK_CX(k9, k10)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    LH_NETWORK_WALK(k8, k7) LH_NETWORK_WALK(k9, k8) LH_NETWORK_WALK(k10, k9)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 42 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_12(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7), k8 = LH_NETWORK_KEY(x, 8),
+             k9 = LH_NETWORK_KEY(x, 9), k10 = LH_NETWORK_KEY(x, 10), k11 = LH_NETWORK_KEY(x, 11);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k8, k9) LH_NETWORK_CX(k10, k11) LH_NETWORK_CX(k0, k2) LH_NETWORK_CX(k1, k3)
+    LH_NETWORK_CX(k4, k6) LH_NETWORK_CX(k5, k7) LH_NETWORK_CX(k8, k10) LH_NETWORK_CX(k9, k11)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k0, k4)
+    LH_NETWORK_CX(k1, k5) LH_NETWORK_CX(k2, k6) LH_NETWORK_CX(k3, k7) LH_NETWORK_CX(k2, k4)
+    LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k0, k8) LH_NETWORK_CX(k1, k9) LH_NETWORK_CX(k2, k10)
+    LH_NETWORK_CX(k3, k11) LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9) LH_NETWORK_CX(k6, k10)
+    LH_NETWORK_CX(k7, k11) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k6, k8)
+    LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k7, k8) LH_NETWORK_CX(k9, k10)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    LH_NETWORK_WALK(k8, k7) LH_NETWORK_WALK(k9, k8) LH_NETWORK_WALK(k10, k9)
+    LH_NETWORK_WALK(k11, k10)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 48 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_13(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7), k8 = LH_NETWORK_KEY(x, 8),
+             k9 = LH_NETWORK_KEY(x, 9), k10 = LH_NETWORK_KEY(x, 10), k11 = LH_NETWORK_KEY(x, 11),
+             k12 = LH_NETWORK_KEY(x, 12);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k8, k9) LH_NETWORK_CX(k10, k11) LH_NETWORK_CX(k0, k2) LH_NETWORK_CX(k1, k3)
+    LH_NETWORK_CX(k4, k6) LH_NETWORK_CX(k5, k7) LH_NETWORK_CX(k8, k10) LH_NETWORK_CX(k9, k11)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k0, k4)
+    LH_NETWORK_CX(k1, k5) LH_NETWORK_CX(k2, k6) LH_NETWORK_CX(k3, k7) LH_NETWORK_CX(k8, k12)
+    LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k1, k2)
+    LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12)
+    LH_NETWORK_CX(k0, k8) LH_NETWORK_CX(k1, k9) LH_NETWORK_CX(k2, k10) LH_NETWORK_CX(k3, k11)
+    LH_NETWORK_CX(k4, k12) LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9) LH_NETWORK_CX(k6, k10)
+    LH_NETWORK_CX(k7, k11) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k6, k8)
+    LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4)
+    LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k7, k8) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    LH_NETWORK_WALK(k8, k7) LH_NETWORK_WALK(k9, k8) LH_NETWORK_WALK(k10, k9)
+    LH_NETWORK_WALK(k11, k10) LH_NETWORK_WALK(k12, k11)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 53 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_14(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7), k8 = LH_NETWORK_KEY(x, 8),
+             k9 = LH_NETWORK_KEY(x, 9), k10 = LH_NETWORK_KEY(x, 10), k11 = LH_NETWORK_KEY(x, 11),
+             k12 = LH_NETWORK_KEY(x, 12), k13 = LH_NETWORK_KEY(x, 13);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k8, k9) LH_NETWORK_CX(k10, k11) LH_NETWORK_CX(k12, k13) LH_NETWORK_CX(k0, k2)
+    LH_NETWORK_CX(k1, k3) LH_NETWORK_CX(k4, k6) LH_NETWORK_CX(k5, k7) LH_NETWORK_CX(k8, k10)
+    LH_NETWORK_CX(k9, k11) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10)
+    LH_NETWORK_CX(k0, k4) LH_NETWORK_CX(k1, k5) LH_NETWORK_CX(k2, k6) LH_NETWORK_CX(k3, k7)
+    LH_NETWORK_CX(k8, k12) LH_NETWORK_CX(k9, k13) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5)
+    LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4)
+    LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k0, k8)
+    LH_NETWORK_CX(k1, k9) LH_NETWORK_CX(k2, k10) LH_NETWORK_CX(k3, k11) LH_NETWORK_CX(k4, k12)
+    LH_NETWORK_CX(k5, k13) LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9) LH_NETWORK_CX(k6, k10)
+    LH_NETWORK_CX(k7, k11) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k6, k8)
+    LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13) LH_NETWORK_CX(k1, k2)
+    LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k7, k8) LH_NETWORK_CX(k9, k10)
+    LH_NETWORK_CX(k11, k12)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    LH_NETWORK_WALK(k8, k7) LH_NETWORK_WALK(k9, k8) LH_NETWORK_WALK(k10, k9)
+    LH_NETWORK_WALK(k11, k10) LH_NETWORK_WALK(k12, k11) LH_NETWORK_WALK(k13, k12)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 59 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_15(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7), k8 = LH_NETWORK_KEY(x, 8),
+             k9 = LH_NETWORK_KEY(x, 9), k10 = LH_NETWORK_KEY(x, 10), k11 = LH_NETWORK_KEY(x, 11),
+             k12 = LH_NETWORK_KEY(x, 12), k13 = LH_NETWORK_KEY(x, 13), k14 = LH_NETWORK_KEY(x, 14);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k8, k9) LH_NETWORK_CX(k10, k11) LH_NETWORK_CX(k12, k13) LH_NETWORK_CX(k0, k2)
+    LH_NETWORK_CX(k1, k3) LH_NETWORK_CX(k4, k6) LH_NETWORK_CX(k5, k7) LH_NETWORK_CX(k8, k10)
+    LH_NETWORK_CX(k9, k11) LH_NETWORK_CX(k12, k14) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k0, k4) LH_NETWORK_CX(k1, k5)
+    LH_NETWORK_CX(k2, k6) LH_NETWORK_CX(k3, k7) LH_NETWORK_CX(k8, k12) LH_NETWORK_CX(k9, k13)
+    LH_NETWORK_CX(k10, k14) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k10, k12)
+    LH_NETWORK_CX(k11, k13) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k0, k8)
+    LH_NETWORK_CX(k1, k9) LH_NETWORK_CX(k2, k10) LH_NETWORK_CX(k3, k11) LH_NETWORK_CX(k4, k12)
+    LH_NETWORK_CX(k5, k13) LH_NETWORK_CX(k6, k14) LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9)
+    LH_NETWORK_CX(k6, k10) LH_NETWORK_CX(k7, k11) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5)
+    LH_NETWORK_CX(k6, k8) LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k7, k8)
+    LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k13, k14)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    LH_NETWORK_WALK(k8, k7) LH_NETWORK_WALK(k9, k8) LH_NETWORK_WALK(k10, k9)
+    LH_NETWORK_WALK(k11, k10) LH_NETWORK_WALK(k12, k11) LH_NETWORK_WALK(k13, k12)
+    LH_NETWORK_WALK(k14, k13)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 63 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_16(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7), k8 = LH_NETWORK_KEY(x, 8),
+             k9 = LH_NETWORK_KEY(x, 9), k10 = LH_NETWORK_KEY(x, 10), k11 = LH_NETWORK_KEY(x, 11),
+             k12 = LH_NETWORK_KEY(x, 12), k13 = LH_NETWORK_KEY(x, 13), k14 = LH_NETWORK_KEY(x, 14),
+             k15 = LH_NETWORK_KEY(x, 15);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k8, k9) LH_NETWORK_CX(k10, k11) LH_NETWORK_CX(k12, k13) LH_NETWORK_CX(k14, k15)
+    LH_NETWORK_CX(k0, k2) LH_NETWORK_CX(k1, k3) LH_NETWORK_CX(k4, k6) LH_NETWORK_CX(k5, k7)
+    LH_NETWORK_CX(k8, k10) LH_NETWORK_CX(k9, k11) LH_NETWORK_CX(k12, k14) LH_NETWORK_CX(k13, k15)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k13, k14)
+    LH_NETWORK_CX(k0, k4) LH_NETWORK_CX(k1, k5) LH_NETWORK_CX(k2, k6) LH_NETWORK_CX(k3, k7)
+    LH_NETWORK_CX(k8, k12) LH_NETWORK_CX(k9, k13) LH_NETWORK_CX(k10, k14) LH_NETWORK_CX(k11, k15)
+    LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10)
+    LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k0, k8) LH_NETWORK_CX(k1, k9)
+    LH_NETWORK_CX(k2, k10) LH_NETWORK_CX(k3, k11) LH_NETWORK_CX(k4, k12) LH_NETWORK_CX(k5, k13)
+    LH_NETWORK_CX(k6, k14) LH_NETWORK_CX(k7, k15) LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9)
+    LH_NETWORK_CX(k6, k10) LH_NETWORK_CX(k7, k11) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5)
+    LH_NETWORK_CX(k6, k8) LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k7, k8)
+    LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k13, k14)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    LH_NETWORK_WALK(k8, k7) LH_NETWORK_WALK(k9, k8) LH_NETWORK_WALK(k10, k9)
+    LH_NETWORK_WALK(k11, k10) LH_NETWORK_WALK(k12, k11) LH_NETWORK_WALK(k13, k12)
+    LH_NETWORK_WALK(k14, k13) LH_NETWORK_WALK(k15, k14)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 85 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_17(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7), k8 = LH_NETWORK_KEY(x, 8),
+             k9 = LH_NETWORK_KEY(x, 9), k10 = LH_NETWORK_KEY(x, 10), k11 = LH_NETWORK_KEY(x, 11),
+             k12 = LH_NETWORK_KEY(x, 12), k13 = LH_NETWORK_KEY(x, 13), k14 = LH_NETWORK_KEY(x, 14),
+             k15 = LH_NETWORK_KEY(x, 15), k16 = LH_NETWORK_KEY(x, 16);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k8, k9) LH_NETWORK_CX(k10, k11) LH_NETWORK_CX(k12, k13) LH_NETWORK_CX(k14, k15)
+    LH_NETWORK_CX(k0, k2) LH_NETWORK_CX(k1, k3) LH_NETWORK_CX(k4, k6) LH_NETWORK_CX(k5, k7)
+    LH_NETWORK_CX(k8, k10) LH_NETWORK_CX(k9, k11) LH_NETWORK_CX(k12, k14) LH_NETWORK_CX(k13, k15)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k13, k14)
+    LH_NETWORK_CX(k0, k4) LH_NETWORK_CX(k1, k5) LH_NETWORK_CX(k2, k6) LH_NETWORK_CX(k3, k7)
+    LH_NETWORK_CX(k8, k12) LH_NETWORK_CX(k9, k13) LH_NETWORK_CX(k10, k14) LH_NETWORK_CX(k11, k15)
+    LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10)
+    LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k0, k8) LH_NETWORK_CX(k1, k9)
+    LH_NETWORK_CX(k2, k10) LH_NETWORK_CX(k3, k11) LH_NETWORK_CX(k4, k12) LH_NETWORK_CX(k5, k13)
+    LH_NETWORK_CX(k6, k14) LH_NETWORK_CX(k7, k15) LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9)
+    LH_NETWORK_CX(k6, k10) LH_NETWORK_CX(k7, k11) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5)
+    LH_NETWORK_CX(k6, k8) LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k7, k8)
+    LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k0, k16)
+    LH_NETWORK_CX(k8, k16) LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9) LH_NETWORK_CX(k6, k10)
+    LH_NETWORK_CX(k7, k11) LH_NETWORK_CX(k12, k16) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5)
+    LH_NETWORK_CX(k6, k8) LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13)
+    LH_NETWORK_CX(k14, k16) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k7, k8) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k13, k14)
+    LH_NETWORK_CX(k15, k16)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    LH_NETWORK_WALK(k8, k7) LH_NETWORK_WALK(k9, k8) LH_NETWORK_WALK(k10, k9)
+    LH_NETWORK_WALK(k11, k10) LH_NETWORK_WALK(k12, k11) LH_NETWORK_WALK(k13, k12)
+    LH_NETWORK_WALK(k14, k13) LH_NETWORK_WALK(k15, k14) LH_NETWORK_WALK(k16, k15)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 90 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_18(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7), k8 = LH_NETWORK_KEY(x, 8),
+             k9 = LH_NETWORK_KEY(x, 9), k10 = LH_NETWORK_KEY(x, 10), k11 = LH_NETWORK_KEY(x, 11),
+             k12 = LH_NETWORK_KEY(x, 12), k13 = LH_NETWORK_KEY(x, 13), k14 = LH_NETWORK_KEY(x, 14),
+             k15 = LH_NETWORK_KEY(x, 15), k16 = LH_NETWORK_KEY(x, 16), k17 = LH_NETWORK_KEY(x, 17);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k8, k9) LH_NETWORK_CX(k10, k11) LH_NETWORK_CX(k12, k13) LH_NETWORK_CX(k14, k15)
+    LH_NETWORK_CX(k16, k17) LH_NETWORK_CX(k0, k2) LH_NETWORK_CX(k1, k3) LH_NETWORK_CX(k4, k6)
+    LH_NETWORK_CX(k5, k7) LH_NETWORK_CX(k8, k10) LH_NETWORK_CX(k9, k11) LH_NETWORK_CX(k12, k14)
+    LH_NETWORK_CX(k13, k15) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10)
+    LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k0, k4) LH_NETWORK_CX(k1, k5) LH_NETWORK_CX(k2, k6)
+    LH_NETWORK_CX(k3, k7) LH_NETWORK_CX(k8, k12) LH_NETWORK_CX(k9, k13) LH_NETWORK_CX(k10, k14)
+    LH_NETWORK_CX(k11, k15) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k10, k12)
+    LH_NETWORK_CX(k11, k13) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k0, k8)
+    LH_NETWORK_CX(k1, k9) LH_NETWORK_CX(k2, k10) LH_NETWORK_CX(k3, k11) LH_NETWORK_CX(k4, k12)
+    LH_NETWORK_CX(k5, k13) LH_NETWORK_CX(k6, k14) LH_NETWORK_CX(k7, k15) LH_NETWORK_CX(k4, k8)
+    LH_NETWORK_CX(k5, k9) LH_NETWORK_CX(k6, k10) LH_NETWORK_CX(k7, k11) LH_NETWORK_CX(k2, k4)
+    LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k6, k8) LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k10, k12)
+    LH_NETWORK_CX(k11, k13) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k7, k8) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k13, k14)
+    LH_NETWORK_CX(k0, k16) LH_NETWORK_CX(k1, k17) LH_NETWORK_CX(k8, k16) LH_NETWORK_CX(k9, k17)
+    LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9) LH_NETWORK_CX(k6, k10) LH_NETWORK_CX(k7, k11)
+    LH_NETWORK_CX(k12, k16) LH_NETWORK_CX(k13, k17) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5)
+    LH_NETWORK_CX(k6, k8) LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13)
+    LH_NETWORK_CX(k14, k16) LH_NETWORK_CX(k15, k17) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4)
+    LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k7, k8) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12)
+    LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k15, k16)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    LH_NETWORK_WALK(k8, k7) LH_NETWORK_WALK(k9, k8) LH_NETWORK_WALK(k10, k9)
+    LH_NETWORK_WALK(k11, k10) LH_NETWORK_WALK(k12, k11) LH_NETWORK_WALK(k13, k12)
+    LH_NETWORK_WALK(k14, k13) LH_NETWORK_WALK(k15, k14) LH_NETWORK_WALK(k16, k15)
+    LH_NETWORK_WALK(k17, k16)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 98 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_19(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7), k8 = LH_NETWORK_KEY(x, 8),
+             k9 = LH_NETWORK_KEY(x, 9), k10 = LH_NETWORK_KEY(x, 10), k11 = LH_NETWORK_KEY(x, 11),
+             k12 = LH_NETWORK_KEY(x, 12), k13 = LH_NETWORK_KEY(x, 13), k14 = LH_NETWORK_KEY(x, 14),
+             k15 = LH_NETWORK_KEY(x, 15), k16 = LH_NETWORK_KEY(x, 16), k17 = LH_NETWORK_KEY(x, 17),
+             k18 = LH_NETWORK_KEY(x, 18);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k8, k9) LH_NETWORK_CX(k10, k11) LH_NETWORK_CX(k12, k13) LH_NETWORK_CX(k14, k15)
+    LH_NETWORK_CX(k16, k17) LH_NETWORK_CX(k0, k2) LH_NETWORK_CX(k1, k3) LH_NETWORK_CX(k4, k6)
+    LH_NETWORK_CX(k5, k7) LH_NETWORK_CX(k8, k10) LH_NETWORK_CX(k9, k11) LH_NETWORK_CX(k12, k14)
+    LH_NETWORK_CX(k13, k15) LH_NETWORK_CX(k16, k18) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k17, k18) LH_NETWORK_CX(k0, k4)
+    LH_NETWORK_CX(k1, k5) LH_NETWORK_CX(k2, k6) LH_NETWORK_CX(k3, k7) LH_NETWORK_CX(k8, k12)
+    LH_NETWORK_CX(k9, k13) LH_NETWORK_CX(k10, k14) LH_NETWORK_CX(k11, k15) LH_NETWORK_CX(k2, k4)
+    LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13) LH_NETWORK_CX(k1, k2)
+    LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12)
+    LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k17, k18) LH_NETWORK_CX(k0, k8) LH_NETWORK_CX(k1, k9)
+    LH_NETWORK_CX(k2, k10) LH_NETWORK_CX(k3, k11) LH_NETWORK_CX(k4, k12) LH_NETWORK_CX(k5, k13)
+    LH_NETWORK_CX(k6, k14) LH_NETWORK_CX(k7, k15) LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9)
+    LH_NETWORK_CX(k6, k10) LH_NETWORK_CX(k7, k11) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5)
+    LH_NETWORK_CX(k6, k8) LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k7, k8)
+    LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k17, k18)
+    LH_NETWORK_CX(k0, k16) LH_NETWORK_CX(k1, k17) LH_NETWORK_CX(k2, k18) LH_NETWORK_CX(k8, k16)
+    LH_NETWORK_CX(k9, k17) LH_NETWORK_CX(k10, k18) LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9)
+    LH_NETWORK_CX(k6, k10) LH_NETWORK_CX(k7, k11) LH_NETWORK_CX(k12, k16) LH_NETWORK_CX(k13, k17)
+    LH_NETWORK_CX(k14, k18) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k6, k8)
+    LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13) LH_NETWORK_CX(k14, k16)
+    LH_NETWORK_CX(k15, k17) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k7, k8) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k13, k14)
+    LH_NETWORK_CX(k15, k16) LH_NETWORK_CX(k17, k18)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    LH_NETWORK_WALK(k8, k7) LH_NETWORK_WALK(k9, k8) LH_NETWORK_WALK(k10, k9)
+    LH_NETWORK_WALK(k11, k10) LH_NETWORK_WALK(k12, k11) LH_NETWORK_WALK(k13, k12)
+    LH_NETWORK_WALK(k14, k13) LH_NETWORK_WALK(k15, k14) LH_NETWORK_WALK(k16, k15)
+    LH_NETWORK_WALK(k17, k16) LH_NETWORK_WALK(k18, k17)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+/* 103 compare-exchanges */
+static inline uint64_t lh_rank_network_u64_20(const uint64_t *x, const uint64_t *f, int *digits, int w) {
+    uint64_t k0 = LH_NETWORK_KEY(x, 0), k1 = LH_NETWORK_KEY(x, 1), k2 = LH_NETWORK_KEY(x, 2),
+             k3 = LH_NETWORK_KEY(x, 3), k4 = LH_NETWORK_KEY(x, 4), k5 = LH_NETWORK_KEY(x, 5),
+             k6 = LH_NETWORK_KEY(x, 6), k7 = LH_NETWORK_KEY(x, 7), k8 = LH_NETWORK_KEY(x, 8),
+             k9 = LH_NETWORK_KEY(x, 9), k10 = LH_NETWORK_KEY(x, 10), k11 = LH_NETWORK_KEY(x, 11),
+             k12 = LH_NETWORK_KEY(x, 12), k13 = LH_NETWORK_KEY(x, 13), k14 = LH_NETWORK_KEY(x, 14),
+             k15 = LH_NETWORK_KEY(x, 15), k16 = LH_NETWORK_KEY(x, 16), k17 = LH_NETWORK_KEY(x, 17),
+             k18 = LH_NETWORK_KEY(x, 18), k19 = LH_NETWORK_KEY(x, 19);
+    uint64_t code = 0, clash = 0;
+    uint32_t seen = 0;
+    (void) w;
+    LH_NETWORK_CX(k0, k1) LH_NETWORK_CX(k2, k3) LH_NETWORK_CX(k4, k5) LH_NETWORK_CX(k6, k7)
+    LH_NETWORK_CX(k8, k9) LH_NETWORK_CX(k10, k11) LH_NETWORK_CX(k12, k13) LH_NETWORK_CX(k14, k15)
+    LH_NETWORK_CX(k16, k17) LH_NETWORK_CX(k18, k19) LH_NETWORK_CX(k0, k2) LH_NETWORK_CX(k1, k3)
+    LH_NETWORK_CX(k4, k6) LH_NETWORK_CX(k5, k7) LH_NETWORK_CX(k8, k10) LH_NETWORK_CX(k9, k11)
+    LH_NETWORK_CX(k12, k14) LH_NETWORK_CX(k13, k15) LH_NETWORK_CX(k16, k18) LH_NETWORK_CX(k17, k19)
+    LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k13, k14)
+    LH_NETWORK_CX(k17, k18) LH_NETWORK_CX(k0, k4) LH_NETWORK_CX(k1, k5) LH_NETWORK_CX(k2, k6)
+    LH_NETWORK_CX(k3, k7) LH_NETWORK_CX(k8, k12) LH_NETWORK_CX(k9, k13) LH_NETWORK_CX(k10, k14)
+    LH_NETWORK_CX(k11, k15) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k10, k12)
+    LH_NETWORK_CX(k11, k13) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4) LH_NETWORK_CX(k5, k6)
+    LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12) LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k17, k18)
+    LH_NETWORK_CX(k0, k8) LH_NETWORK_CX(k1, k9) LH_NETWORK_CX(k2, k10) LH_NETWORK_CX(k3, k11)
+    LH_NETWORK_CX(k4, k12) LH_NETWORK_CX(k5, k13) LH_NETWORK_CX(k6, k14) LH_NETWORK_CX(k7, k15)
+    LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9) LH_NETWORK_CX(k6, k10) LH_NETWORK_CX(k7, k11)
+    LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5) LH_NETWORK_CX(k6, k8) LH_NETWORK_CX(k7, k9)
+    LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4)
+    LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k7, k8) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12)
+    LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k17, k18) LH_NETWORK_CX(k0, k16) LH_NETWORK_CX(k1, k17)
+    LH_NETWORK_CX(k2, k18) LH_NETWORK_CX(k3, k19) LH_NETWORK_CX(k8, k16) LH_NETWORK_CX(k9, k17)
+    LH_NETWORK_CX(k10, k18) LH_NETWORK_CX(k11, k19) LH_NETWORK_CX(k4, k8) LH_NETWORK_CX(k5, k9)
+    LH_NETWORK_CX(k6, k10) LH_NETWORK_CX(k7, k11) LH_NETWORK_CX(k12, k16) LH_NETWORK_CX(k13, k17)
+    LH_NETWORK_CX(k14, k18) LH_NETWORK_CX(k15, k19) LH_NETWORK_CX(k2, k4) LH_NETWORK_CX(k3, k5)
+    LH_NETWORK_CX(k6, k8) LH_NETWORK_CX(k7, k9) LH_NETWORK_CX(k10, k12) LH_NETWORK_CX(k11, k13)
+    LH_NETWORK_CX(k14, k16) LH_NETWORK_CX(k15, k17) LH_NETWORK_CX(k1, k2) LH_NETWORK_CX(k3, k4)
+    LH_NETWORK_CX(k5, k6) LH_NETWORK_CX(k7, k8) LH_NETWORK_CX(k9, k10) LH_NETWORK_CX(k11, k12)
+    LH_NETWORK_CX(k13, k14) LH_NETWORK_CX(k15, k16) LH_NETWORK_CX(k17, k18)
+    LH_NETWORK_FIRST(k0) LH_NETWORK_WALK(k1, k0) LH_NETWORK_WALK(k2, k1) LH_NETWORK_WALK(k3, k2)
+    LH_NETWORK_WALK(k4, k3) LH_NETWORK_WALK(k5, k4) LH_NETWORK_WALK(k6, k5) LH_NETWORK_WALK(k7, k6)
+    LH_NETWORK_WALK(k8, k7) LH_NETWORK_WALK(k9, k8) LH_NETWORK_WALK(k10, k9)
+    LH_NETWORK_WALK(k11, k10) LH_NETWORK_WALK(k12, k11) LH_NETWORK_WALK(k13, k12)
+    LH_NETWORK_WALK(k14, k13) LH_NETWORK_WALK(k15, k14) LH_NETWORK_WALK(k16, k15)
+    LH_NETWORK_WALK(k17, k16) LH_NETWORK_WALK(k18, k17) LH_NETWORK_WALK(k19, k18)
+    if (clash) return lh_rank_u64_generic(x, f, digits, w);
+    return code;
+}
+
+#endif
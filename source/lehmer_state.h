@@ -0,0 +1,26 @@
+/*
+ * Round trip of <random> engines and distributions through their stream operators.
+ * The standard guarantees that reading back the text restores the exact same sequence,
+ * including the hidden state of the distribution (e.g. the cached second normal deviate).
+ */
+#ifndef LEHMER_STATE_H
+#define LEHMER_STATE_H
+
+#include <sstream>
+#include <string>
+
+template <class T>
+static std::string lh_dump_state(const T &obj) {
+    std::ostringstream s;
+    s << obj;
+    return s.str();
+}
+
+template <class T>
+static bool lh_load_state(T &obj, const std::string &text) {
+    std::istringstream s(text);
+    s >> obj;
+    return !s.fail();
+}
+
+#endif /* LEHMER_STATE_H */
@@ -0,0 +1,5 @@
+from libcpp.string cimport string
+
+cdef extern from "lehmer_state.h":
+    string lh_dump_state[T](const T &obj)
+    bint lh_load_state[T](T &obj, const string &text)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Writes lehmer_network.h, the straight-line sorting network kernels behind lh_select_rank_network_u64.
+
+For every w in LH_RANK_MIN_W..LH_RANK_MAX_W the compare-exchanges of Batcher's odd-even merge sort
+network (the same network as lh_network_init and autotune.network_size) are unrolled into a sequence
+of LH_NETWORK_CX on local keys, followed by the unrolled popcount walk. The macros themselves are
+defined in lehmer_kernels.h, so the generated file only holds the order of the operations.
+
+Run it again after changing the network or the range of w:
+python network_gen.py > lehmer_network.h
+"""
+import sys
+
+MIN_W = 6
+MAX_W = 20
+LINE = 100
+
+
+def batcher(w):
+    """
+    Compare-exchanges (a, b), a < b, of Batcher's odd-even merge sort network for w values
+    """
+    pairs = []
+    p = 1
+    while p < w:
+        k = p
+        while k >= 1:
+            for j in range(k % p, w - k, 2 * k):
+                for i in range(min(k - 1, w - j - k - 1) + 1):
+                    if (i + j) // (p * 2) == (i + j + k) // (p * 2):
+                        pairs.append((i + j, i + j + k))
+            k //= 2
+        p += p
+    return pairs
+
+
+def wrap(items, indent, sep):
+    """
+    Joins items into lines of at most LINE characters
+    """
+    lines, line = [], indent
+    for item in items:
+        if line != indent and len(line) + len(sep) + len(item) > LINE:
+            lines.append(line)
+            line = indent
+        line = line + sep + item if line != indent else line + item
+    lines.append(line)
+    return lines
+
+
+def kernel(w):
+    network = batcher(w)
+    keys = [f"k{i} = LH_NETWORK_KEY(x, {i})" for i in range(w)]
+    lines = [
+        f"/* {len(network)} compare-exchanges */",
+        f"static inline uint64_t lh_rank_network_u64_{w}(const uint64_t *x, const uint64_t *f, int *digits, int w) {{",
+    ]
+    key_lines = wrap(keys, "    ", ", ")
+    key_lines[0] = "    uint64_t " + key_lines[0].lstrip()
+    key_lines = [line + "," for line in key_lines[:-1]] + [key_lines[-1] + ";"]
+    lines += [line if i == 0 else "             " + line.lstrip() for i, line in enumerate(key_lines)]
+    lines.append("    uint64_t code = 0, clash = 0;")
+    lines.append("    uint32_t seen = 0;")
+    lines.append("    (void) w;")
+    lines += wrap([f"LH_NETWORK_CX(k{a}, k{b})" for a, b in network], "    ", " ")
+    lines += wrap(["LH_NETWORK_FIRST(k0)"] + [f"LH_NETWORK_WALK(k{i}, k{i - 1})" for i in range(1, w)], "    ", " ")
+    lines.append("    if (clash) return lh_rank_u64_generic(x, f, digits, w);")
+    lines.append("    return code;")
+    lines.append("}")
+    return lines
+
+
+def main():
+    out = [
+        "/*",
+        " * Generated by network_gen.py, do not edit. Included by lehmer_kernels.h,",
+        " * see lh_select_rank_network_u64 there.",
+        " */",
+        "#ifndef LEHMER_NETWORK_H",
+        "#define LEHMER_NETWORK_H",
+        "",
+    ]
+    for w in range(MIN_W, MAX_W + 1):
+        out += kernel(w)
+        out.append("")
+    out.append("#endif")
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+if __name__ == "__main__":
+    main()
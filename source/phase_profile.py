@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Splits the time of a generator's window loop into its phases: drawing the new values (source),
+sliding the window (shift), ranking, the threshold test with the range reduction (reject) and
+writing the outputs (store).
+
+Needs the extensions built with the tick counters, which are left out of normal builds:
+
+    LEHMER_PROFILE=1 python3 setup.py build_ext --inplace --force
+    python3 phase_profile.py lcg 14 1
+
+Reading the counter costs about 40 ticks per phase (all that shift shows for delta = 0), so the total is
+higher than for a normal build and the short phases are overstated. Use it to compare phases and settings against each
+other, and benchmark.py for absolute timings.
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from benchmark import GENERATORS, OPTIONS, WIDE, make
+
+PHASES = ('source', 'shift', 'rank', 'reject', 'store')
+
+
+def profile_generator(generator, n, chunk=8192):
+    """
+    Generates n outputs in chunks and reads the phase counters
+    :return: (profile dict of the generator, outputs, wall seconds)
+    """
+    buffer = np.empty(min(n, chunk), dtype=np.uint64)
+    calls = max(n // len(buffer), 1)
+    generator.generate_into(buffer)
+    generator.reset_profile()
+    start = time.perf_counter()
+    for _ in range(calls):
+        generator.generate_into(buffer)
+    return generator.profile(), calls * len(buffer), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-phase tick split of a generator's window loop.")
+    parser.add_argument("algo", help=f"one of {', '.join(GENERATORS)}, optionally with :{'|:'.join(OPTIONS)}")
+    parser.add_argument("w", type=int, help="window size")
+    parser.add_argument("delta", type=int, help="steps between windows, 0 for non-overlapping")
+    parser.add_argument("--minimum", type=int, default=0, help="inclusive")
+    parser.add_argument("--maximum", type=int, default=2 ** 32 - 1, help="inclusive")
+    parser.add_argument("--n", type=int, default=1 << 22, help="outputs to generate")
+    parser.add_argument("--seed", type=int, default=123456789)
+    args = parser.parse_args()
+
+    name, _, option = args.algo.partition(':')
+    if name not in GENERATORS or (option and option not in OPTIONS):
+        parser.error(f"unknown generator {args.algo}")
+    if name not in WIDE and math.factorial(args.w) < args.maximum - args.minimum + 1:
+        parser.error(f"w = {args.w} cannot cover [{args.minimum}, {args.maximum}], w! must be at least the range")
+    try:
+        generator = make(args.algo, args.seed, args.w, args.delta, args.minimum, args.maximum)
+    except ValueError as e:
+        parser.error(str(e))
+    if not generator.profile()["enabled"]:
+        parser.error("the extensions were built without the tick counters, rebuild with LEHMER_PROFILE=1")
+
+    profile, outputs, seconds = profile_generator(generator, args.n)
+    windows = profile["windows"]
+    ticks = profile["ticks"]
+    total = sum(ticks.values())
+    unit = "word" if name in WIDE else "output"
+
+    print(f"{args.algo} w={args.w} delta={args.delta}: {windows} windows, "
+          f"{seconds / outputs * 1e9:.1f} ns/{unit} (instrumented)")
+    print("phase\tticks/window\tshare")
+    for phase in PHASES:
+        print(f"{phase}\t{ticks[phase] / max(windows, 1):.1f}\t{ticks[phase] / max(total, 1):.1%}")
+    print(f"total\t{total / max(windows, 1):.1f}")
+
+
+if __name__ == "__main__":
+    main()
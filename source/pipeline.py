@@ -0,0 +1,337 @@
+"""
+Output pipelines for the testing interfaces.
+
+Pipeline overlaps generation and writing inside one process: a background thread fills a
+ring of preallocated buffers while the caller writes the filled ones to stdout.
+
+Farm spreads generation over several processes. Worker i produces substream i into its own
+slots of a shared memory block and the parent splices the chunks round-robin (worker 0,
+1, ..., N-1, 0, ...) to stdout, so the output only depends on the seed and the number of
+workers.
+
+MappedFile fills a preallocated file segment by segment, on worker processes or with one
+continuous stream, and records finished segments in a sidecar so an interrupted run can be resumed.
+"""
+import base64
+import itertools
+import json
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# source steps between the starting points of two substreams of a jumpable generator
+SUBSTREAM_STRIDE = 1 << 48
+
+# shared memory slots per worker
+FARM_SLOTS = 2
+
+# numbers per segment of a mapped output file
+SEGMENT_SIZE = 1 << 24
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def chunk_counts(size, total=None):
+    """
+    Sizes of the chunks that make up the output
+    :param size: chunk size
+    :param total: total numbers, None for an endless stream
+    """
+    if total is None:
+        return itertools.repeat(size)
+    return (min(size, total - i) for i in range(0, total, size))
+
+
+def splitmix64(seed, index):
+    """
+    Output number index (counting from 0) of SplitMix64 seeded with seed
+    """
+    z = (seed + (index + 1) * 0x9e3779b97f4a7c15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xbf58476d1ce4e5b9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94d049bb133111eb) & MASK64
+    return z ^ (z >> 31)
+
+
+def substream(factory, seed, index):
+    """
+    Generator for substream index of a seed. Substream 0 is the plain generator, the others are
+    jumped ahead by index * SUBSTREAM_STRIDE source steps, or reseeded through SplitMix64 when
+    the generator cannot jump.
+    :param factory: picklable callable building a generator from a seed
+    """
+    generator = factory(seed)
+    if index == 0:
+        return generator
+    if hasattr(generator, 'jumped'):
+        return generator.jumped(index * SUBSTREAM_STRIDE)
+    return factory(splitmix64(seed, index - 1))
+
+
+class Pipeline:
+    """
+    Generates into a ring of preallocated buffers on a background thread while the
+    calling thread writes the filled ones to stdout.
+    """
+
+    def __init__(self, fill, size, buffers, echo=False, out=None):
+        """
+        :param fill: callable filling a uint32 array with the next numbers
+        :param echo: also print every written number to stderr
+        :param out: binary stream to write to instead of stdout
+        """
+        self.fill = fill
+        self.size = size
+        self.echo = echo
+        self.out = out
+        self.free = queue.Queue()
+        self.full = queue.Queue()
+        for _ in range(buffers):
+            self.free.put(np.empty(size, dtype=np.uint32))
+        self.stopped = False
+        # seconds the generator waited for a free buffer / the writer for a full one
+        self.generate_stall = 0.0
+        self.write_stall = 0.0
+
+    def _produce(self, counts):
+        try:
+            for count in counts:
+                start = time.perf_counter()
+                buffer = self.free.get()
+                self.generate_stall += time.perf_counter() - start
+                if self.stopped:
+                    return
+                self.fill(buffer[:count])
+                self.full.put((buffer, count))
+            self.full.put(None)
+        except BaseException as e:
+            self.full.put(e)
+
+    def run(self, total=None):
+        """
+        Writes total numbers (forever if None), yielding the size of every chunk once it is written
+        """
+        producer = threading.Thread(target=self._produce, args=(chunk_counts(self.size, total),), daemon=True)
+        producer.start()
+        out = self.out or sys.stdout.buffer
+        try:
+            while True:
+                start = time.perf_counter()
+                item = self.full.get()
+                self.write_stall += time.perf_counter() - start
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                buffer, count = item
+                out.write(buffer[:count])
+                if self.echo:
+                    for num in buffer[:count]:
+                        print(num, file=sys.stderr)
+                self.free.put(buffer)
+                yield count
+            out.flush()
+        finally:
+            self.stopped = True
+            self.free.put(None)
+
+    def report(self):
+        print(f"[INFO] Generator stalled {self.generate_stall:.2f}s on the writer, "
+              f"writer stalled {self.write_stall:.2f}s on the generator", file=sys.stderr)
+        sys.stderr.flush()
+
+
+def _farm_worker(factory, seed, index, workers, size, total, shm_name, empty, full, stall):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((workers, FARM_SLOTS, size), dtype=np.uint32, buffer=shm.buf)[index]
+    try:
+        generator = substream(factory, seed, index)
+        counts = itertools.islice(chunk_counts(size, total), index, None, workers)
+        for k, count in enumerate(counts):
+            start = time.perf_counter()
+            empty.acquire()
+            stall.value += time.perf_counter() - start
+            generator.generate_into(slots[k % FARM_SLOTS, :count])
+            full.release()
+    finally:
+        del slots
+        shm.close()
+
+
+class Farm:
+    """
+    Generates on several worker processes and splices their substreams round-robin to stdout.
+    """
+
+    def __init__(self, factory, seed, workers, size):
+        """
+        :param factory: picklable callable building a generator from a seed, see substream
+        :param workers: number of worker processes
+        :param size: chunk size, every worker contributes one chunk per round
+        """
+        self.factory = factory
+        self.seed = seed
+        self.workers = workers
+        self.size = size
+        self.write_stall = 0.0
+        self.stalls = []
+
+    def run(self, total=None):
+        """
+        Writes total numbers (forever if None), yielding the size of every chunk once it is written
+        """
+        ctx = mp.get_context()
+        shm = shared_memory.SharedMemory(create=True, size=self.workers * FARM_SLOTS * self.size * 4)
+        slots = np.ndarray((self.workers, FARM_SLOTS, self.size), dtype=np.uint32, buffer=shm.buf)
+        empty = [ctx.Semaphore(FARM_SLOTS) for _ in range(self.workers)]
+        full = [ctx.Semaphore(0) for _ in range(self.workers)]
+        self.stalls = [ctx.Value('d', 0.0, lock=False) for _ in range(self.workers)]
+        processes = [ctx.Process(target=_farm_worker, daemon=True,
+                                 args=(self.factory, self.seed, i, self.workers, self.size, total,
+                                       shm.name, empty[i], full[i], self.stalls[i]))
+                     for i in range(self.workers)]
+        for p in processes:
+            p.start()
+
+        out = sys.stdout.buffer
+        try:
+            for c, count in enumerate(chunk_counts(self.size, total)):
+                i = c % self.workers
+                start = time.perf_counter()
+                while not full[i].acquire(timeout=0.5):
+                    if not processes[i].is_alive():
+                        raise RuntimeError(f"worker {i} exited with code {processes[i].exitcode}")
+                self.write_stall += time.perf_counter() - start
+                out.write(slots[i, (c // self.workers) % FARM_SLOTS, :count])
+                empty[i].release()
+                yield count
+            out.flush()
+        finally:
+            for p in processes:
+                p.terminate()
+            for p in processes:
+                p.join()
+            del slots
+            shm.close()
+            shm.unlink()
+
+    def report(self):
+        stalls = ", ".join(f"{s.value:.2f}s" for s in self.stalls)
+        print(f"[INFO] Workers stalled [{stalls}] on the writer, "
+              f"writer stalled {self.write_stall:.2f}s on the workers", file=sys.stderr)
+        sys.stderr.flush()
+
+
+def _fill_segment(factory, seed, path, total, index):
+    start = index * SEGMENT_SIZE
+    count = min(SEGMENT_SIZE, total - start)
+    numbers = np.memmap(path, dtype=np.uint32, mode='r+', offset=start * 4, shape=(count,))
+    substream(factory, seed, index).generate_into(numbers)
+    numbers.flush()
+    del numbers
+    return index, count
+
+
+class MappedFile:
+    """
+    Writes total uint32 numbers into a preallocated file. With one worker the file holds the plain
+    stream of the seed, the same numbers the stdout file mode writes. With several, segment i holds
+    the start of substream i, so the contents only depend on the seed and not on the number of workers.
+    Finished segments are listed in <path>.state.json, which is removed once the file is complete;
+    a continuous run also keeps the pickled generator there to resume from.
+    """
+
+    def __init__(self, factory, seed, path, total, workers, params):
+        """
+        :param factory: picklable callable building a generator from a seed, see substream
+        :param params: JSON serializable description of the generator, a resumed run must match it
+        """
+        self.factory = factory
+        self.seed = seed
+        self.path = path
+        self.total = total
+        self.workers = workers
+        self.state_path = path + ".state.json"
+        self.continuous = workers == 1
+        self.state = {"seed": seed, "total": total, "segment_size": SEGMENT_SIZE,
+                      "continuous": self.continuous, "params": params, "done": []}
+        self.done = set()
+
+        if os.path.exists(self.state_path) and os.path.exists(path):
+            with open(self.state_path) as f:
+                saved = json.load(f)
+            if {k: v for k, v in saved.items() if k not in ("done", "generator")} == \
+                    {k: v for k, v in self.state.items() if k != "done"}:
+                self.done = set(saved["done"])
+                if "generator" in saved:
+                    self.state["generator"] = saved["generator"]
+
+    @property
+    def segments(self):
+        return (self.total + SEGMENT_SIZE - 1) // SEGMENT_SIZE
+
+    @property
+    def completed(self):
+        """numbers already present from an earlier run"""
+        return sum(min(SEGMENT_SIZE, self.total - i * SEGMENT_SIZE) for i in self.done)
+
+    def _save(self):
+        self.state["done"] = sorted(self.done)
+        with open(self.state_path + ".tmp", "w") as f:
+            json.dump(self.state, f)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    def run(self):
+        """
+        Fills the missing segments, yielding the size of every segment once it is on disk
+        """
+        if not self.done:
+            with open(self.path, "wb") as f:
+                f.truncate(self.total * 4)
+        self._save()
+
+        if self.continuous:
+            yield from self._run_continuous()
+        else:
+            yield from self._run_segments()
+        os.remove(self.state_path)
+
+    def _run_continuous(self):
+        # one generator writes the segments in order, its state after the last one is saved with it
+        if self.done:
+            generator = pickle.loads(base64.b64decode(self.state["generator"]))
+        else:
+            generator = self.factory(self.seed)
+        for index in range(len(self.done), self.segments):
+            start = index * SEGMENT_SIZE
+            count = min(SEGMENT_SIZE, self.total - start)
+            numbers = np.memmap(self.path, dtype=np.uint32, mode='r+', offset=start * 4, shape=(count,))
+            generator.generate_into(numbers)
+            numbers.flush()
+            del numbers
+            self.done.add(index)
+            self.state["generator"] = base64.b64encode(pickle.dumps(generator)).decode()
+            self._save()
+            yield count
+
+    def _run_segments(self):
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            pending = {executor.submit(_fill_segment, self.factory, self.seed, self.path, self.total, i)
+                       for i in range(self.segments) if i not in self.done}
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index, count = future.result()
+                    self.done.add(index)
+                    self._save()
+                    yield count
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
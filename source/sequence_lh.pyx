@@ -0,0 +1,270 @@
+# distutils: language=c++
+# cython: language_level=3
+
+import numpy as np
+cimport numpy as np
+import os
+import struct
+from libc.string cimport memcpy
+from libc.stdint cimport uint64_t, int64_t, uint32_t, int32_t, uint16_t, int16_t, uint8_t, int8_t
+from lehmer_kernels cimport LH_STATS
+from lehmer_engine cimport lh_sequence_source, lh_engine_init, lh_source_free, lh_source_alloc
+from lehmer_engine cimport lh_engine_set_lut, lh_rank, lh_fill
+from lehmer_base cimport LehmerBase
+
+np.import_array()
+
+# snapshot layout: tag, w, delta, minimum, maximum, is_initialized, incremental, key kind, carried values,
+# followed by the window (w uint64), the Lehmer digits (w int) and the carried keys (uint64)
+SNAPSHOT = struct.Struct("<4siiqq??ci")
+SNAPSHOT_TAG = b"SEQ1"
+
+# dtype kind -> key encoding. Keys only compare like the values among one encoding.
+KEY_KINDS = {'b': b'u', 'u': b'u', 'i': b'i', 'f': b'f'}
+
+cdef uint64_t SIGN = 1ULL << 63
+cdef uint64_t EXPONENT = 0x7FF0000000000000ULL
+
+ctypedef fused key_value:
+    uint8_t
+    uint16_t
+    uint32_t
+    uint64_t
+    int8_t
+    int16_t
+    int32_t
+    int64_t
+    float
+    double
+
+
+def _fill_keys(const key_value[:] values, uint64_t[::1] keys):
+    """
+    Writes the order-preserving key of every value to keys: unsigned integers as they are, signed
+    integers with the sign bit flipped, floats by their IEEE bits, inverted for negative numbers.
+    -0.0 gets the key of 0.0, as they compare equal.
+    :return: False if values holds a NaN, which has no place in the order
+    """
+    cdef Py_ssize_t i
+    cdef uint64_t bits
+    cdef double d
+    cdef bint ordered = True
+    with nogil:
+        for i in range(values.shape[0]):
+            if key_value is double or key_value is float:
+                d = values[i]
+                memcpy(&bits, &d, sizeof(double))
+                # checked on the bits, -ffast-math drops isnan and signed zeros
+                if (bits & EXPONENT) == EXPONENT and bits & ~(SIGN | EXPONENT):
+                    ordered = False
+                    break
+                if bits == SIGN:
+                    bits = 0
+                keys[i] = bits ^ ((0 - (bits >> 63)) | SIGN)
+            elif key_value is int8_t or key_value is int16_t or key_value is int32_t or key_value is int64_t:
+                keys[i] = (<uint64_t> <int64_t> values[i]) ^ SIGN
+            else:
+                keys[i] = values[i]
+    return ordered
+
+
+cdef class SequenceLehmer(LehmerBase):
+    """
+    Lehmerizes recorded data (sensor dumps, outputs of other generators, .bin files) as it streams in:
+    every window of w values, starting every delta values, gives (code % r) + minimum when its code
+    is below the threshold, the same outputs as generators.lehmerize_sequence over the concatenated
+    chunks. The values of an unfinished window are carried over to the next chunk.
+    """
+    cdef lh_sequence_source source
+
+    cdef long long minimum
+    cdef long long maximum
+    # keys of the values read past the last complete window
+    cdef uint64_t[::1] carry
+    cdef Py_ssize_t carry_len
+    cdef bytes kind
+
+    def __cinit__(self, int w, int delta, long long minimum, long long maximum):
+        """
+        :param w: window size
+        :param delta: steps to take between windows. delta=0 is the same as delta=w
+        :param minimum: inclusive
+        :param maximum: inclusive
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        lh_engine_init(&self.engine, w, delta, minimum, maximum)
+        lh_source_alloc(&self.source, w)
+        self.carry = np.empty(w, dtype=np.uint64)
+        self.carry_len = 0
+        self.kind = b'?'
+
+    def __dealloc__(self):
+        lh_source_free(&self.source)
+
+    @property
+    def incremental(self):
+        """overlapping windows keep their per-position counts between slides"""
+        return self.engine.incremental
+
+    @incremental.setter
+    def incremental(self, bint value):
+        if value and not self.engine.incremental:
+            lh_engine_set_lut(&self.engine, 0)
+            if self.engine.is_initialized:
+                # the counts of the current window may be stale after table ranking
+                lh_rank(&self.engine, &self.source)
+        self.engine.incremental = value
+
+    @property
+    def lut(self):
+        """
+        Ranks every window through precomputed comparison-bitmask tables instead of the
+        multiply-add loop, for w up to 12. The output is unchanged. Turns incremental off,
+        and is not carried over by snapshot/restore or pickling.
+        """
+        return self.engine.lut != NULL
+
+    @lut.setter
+    def lut(self, bint value):
+        lh_engine_set_lut(&self.engine, value)
+
+    @property
+    def carried(self):
+        """values read past the last complete window, waiting for the next chunk"""
+        return self.carry_len
+
+    def feed(self, chunk):
+        """
+        Lehmerizes the windows completed by the next chunk of the stream.
+        :param chunk: array-like (a slice of a np.memmap works) of integers, bools or floats up to
+            64 bits. Integer and float chunks cannot be mixed in one stream, and NaN is rejected.
+        :return: int64 array of the outputs
+        """
+        values = np.asarray(chunk).reshape(-1)
+        kind = KEY_KINDS.get(values.dtype.kind)
+        if kind is None or values.dtype.itemsize > 8:
+            raise TypeError(f"cannot Lehmerize values of dtype {values.dtype}")
+        if self.kind != b'?' and kind != self.kind:
+            raise TypeError(f"dtype {values.dtype} does not compare with the earlier chunks of the stream")
+        if values.dtype.kind == 'b':
+            values = values.view(np.uint8)
+        elif values.dtype.kind == 'f' and values.dtype.itemsize < 4:
+            values = values.astype(np.float32)
+        if not values.dtype.isnative:
+            values = values.astype(values.dtype.newbyteorder('='))
+
+        keys = np.empty(self.carry_len + len(values), dtype=np.uint64)
+        keys[:self.carry_len] = self.carry[:self.carry_len]
+        if not _fill_keys(values, keys[self.carry_len:]):
+            raise ValueError("NaN has no place in the order of the values")
+        self.kind = kind
+        return self._lehmerize(keys)
+
+    def stream(self, chunks):
+        """
+        :param chunks: iterable of chunks for feed
+        :return: generator of the output array of every chunk
+        """
+        for chunk in chunks:
+            yield self.feed(chunk)
+
+    def feed_file(self, path, dtype=np.uint32, Py_ssize_t chunk=1 << 20, offset=0):
+        """
+        Memory-maps a file of raw values and feeds it chunk values at a time.
+        :param path: file of native-endian values, a trailing partial value is an error
+        :param dtype: type of the values
+        :param chunk: values per feed call
+        :param offset: bytes to skip at the start of the file
+        :return: generator of the output array of every chunk
+        """
+        if os.path.getsize(path) <= offset:
+            return
+        data = np.memmap(path, dtype=dtype, mode='r', offset=offset)
+        for start in range(0, len(data), chunk):
+            yield self.feed(data[start:start + chunk])
+
+    cdef np.ndarray _lehmerize(self, uint64_t[::1] keys):
+        cdef int w = self.engine.w
+        cdef int delta = self.engine.delta
+        cdef Py_ssize_t total = keys.shape[0]
+        cdef Py_ssize_t windows, count
+        cdef int k
+        cdef np.ndarray[np.int64_t, ndim=1] results
+
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        self.source.data = &keys[0]
+        self.source.pos = 0
+        if not self.engine.is_initialized:
+            if total < w - delta:
+                self._carry(keys, 0)
+                return np.empty(0, dtype=np.int64)
+            # lh_fill slides every window by delta before ranking it, so the first window starts out
+            # with its last w - delta values at the end. The digits of those only look further right.
+            for k in range(delta):
+                self.source.window[k] = 0
+            for k in range(delta, w):
+                self.source.window[k] = keys[k - delta]
+            self.source.pos = w - delta
+            lh_rank(&self.engine, &self.source)
+            self.engine.is_initialized = 1
+            if LH_STATS:
+                self.engine.stats.steps += w - delta
+
+        windows = (total - self.source.pos) // delta
+        results = np.empty(windows, dtype=np.int64)
+        with nogil:
+            # signed outputs come out as their two's complement, which the int64 view reads back
+            count = lh_fill(&self.engine, &self.source, <char *> results.data, sizeof(int64_t), windows, windows)
+        self._carry(keys, self.source.pos)
+        return results[:count]
+
+    cdef void _carry(self, uint64_t[::1] keys, Py_ssize_t start):
+        self.carry_len = keys.shape[0] - start
+        self.carry[:self.carry_len] = keys[start:]
+
+    def snapshot(self):
+        """
+        Exports the stream position, the current window and the carried values, as compact bytes.
+        :return: bytes for restore or __setstate__
+        """
+        cdef int w = self.engine.w
+        return (SNAPSHOT.pack(SNAPSHOT_TAG, w, self.engine.delta, self.minimum, self.maximum,
+                              self.engine.is_initialized, self.engine.incremental, self.kind, self.carry_len)
+                + (<char *> self.source.window)[:w * sizeof(uint64_t)]
+                + (<char *> self.engine.digits)[:w * sizeof(int)]
+                + np.asarray(self.carry[:self.carry_len]).tobytes())
+
+    @staticmethod
+    def restore(data):
+        """
+        :param data: bytes from snapshot
+        :return: a new SequenceLehmer that continues exactly where the snapshotted one stopped
+        """
+        _, w, delta, minimum, maximum = SNAPSHOT.unpack_from(data)[:5]
+        lehmer = SequenceLehmer(w, delta, minimum, maximum)
+        lehmer.__setstate__(data)
+        return lehmer
+
+    def __setstate__(self, data):
+        cdef const char *raw
+        cdef Py_ssize_t offset = SNAPSHOT.size
+        cdef int w = self.engine.w
+        data = bytes(data)
+        tag, w_, delta, minimum, maximum, is_initialized, incremental, kind, carried = SNAPSHOT.unpack_from(data)
+        if (tag != SNAPSHOT_TAG or (w_, delta, minimum, maximum) != (w, self.engine.delta, self.minimum, self.maximum)
+                or not 0 <= carried <= w or kind not in (b'?', b'u', b'i', b'f')
+                or len(data) != offset + w * (sizeof(uint64_t) + sizeof(int)) + carried * sizeof(uint64_t)):
+            raise ValueError("snapshot does not belong to a SequenceLehmer with these parameters")
+        raw = data
+        self.engine.is_initialized = is_initialized
+        self.engine.incremental = incremental
+        self.kind = kind
+        memcpy(self.source.window, raw + offset, w * sizeof(uint64_t))
+        offset += w * sizeof(uint64_t)
+        memcpy(self.engine.digits, raw + offset, w * sizeof(int))
+        offset += w * sizeof(int)
+        self.carry_len = carried
+        if carried:
+            memcpy(&self.carry[0], raw + offset, carried * sizeof(uint64_t))
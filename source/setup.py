@@ -1,3 +1,4 @@
+import os
 from setuptools import Extension, setup
 from Cython.Build import cythonize
 import numpy
@@ -9,18 +10,52 @@ c_args = [
     "-funroll-loops",
 ]
 
+# LEHMER_STATS=0 compiles the counters behind the generators' stats() out of the generate loops
+# LEHMER_PROFILE=1 builds the per-phase tick counters behind profile(), see phase_profile.py
+macros = [("LH_STATS", os.environ.get("LEHMER_STATS", "1")),
+          ("LH_PROFILE", os.environ.get("LEHMER_PROFILE", "0"))]
+
 extensions = [
+    # base classes of every generator, also cimported by alt_setup.py and crypto_setup.py
+    Extension(
+        "lehmer_base",
+        ["lehmer_base.pyx"],
+        include_dirs=[numpy.get_include()],
+        extra_compile_args=c_args,
+        define_macros=macros,
+        language="c++",
+    ),
     Extension(
         "c_lcg_lh",
         ["c_lcg_lh.pyx"],
         include_dirs=[numpy.get_include()],
         extra_compile_args=c_args,
+        define_macros=macros,
+        language="c++",
     ),
     Extension(
         "xor_lh",
         ["xor_lh.pyx"],
         include_dirs=[numpy.get_include()],
         extra_compile_args=c_args,
+        define_macros=macros,
+        language="c++",
+    ),
+    Extension(
+        "wide_lh",
+        ["wide_lh.pyx"],
+        include_dirs=[numpy.get_include()],
+        extra_compile_args=c_args,
+        define_macros=macros,
+        language="c++",
+    ),
+    Extension(
+        "sequence_lh",
+        ["sequence_lh.pyx"],
+        include_dirs=[numpy.get_include()],
+        extra_compile_args=c_args,
+        define_macros=macros,
+        language="c++",
     ),
 ]
 
@@ -6,6 +6,9 @@ from alternatives import logistic_lh
 from scipy.stats import chisquare
 import statsmodels.api as sm
 
+# general_display_arrays lists the missing values in full up to this many
+MISSING_SHOWN = 1000
+
 
 def large_lcg_vs_lcg_lh():
     seed = 701
@@ -31,11 +34,186 @@ def large_lcg_vs_lcg_lh():
     print("-----------------------")
     # chisq test
     for title, array in data:
-        counts, _ = np.histogram(array, bins=max_exclusive, range=(0, max_exclusive))
-        chi2, p = chisquare(counts)
+        stats = StreamingStats(0, max_exclusive - 1, coverage=False)
+        stats.update(array)
+        chi2, p = stats.chisquare()
         print(f"{title} Chi^2 statistic = {chi2:.2f}, p-value = {p:.5f}")
 
 
+class StreamingStats:
+    """
+    Statistics of a generator's outputs in [minimum, maximum], accumulated chunk by chunk in fixed memory:
+    count, min/max, mean and variance, the values never seen (a bitmap of range / 8 bytes), a histogram
+    of up to max_bins equal buckets for the chi-square test and the byte counts for the entropy.
+    Values outside the range only count towards min/max and outside.
+    """
+
+    # set bits of every byte value, for counting the bitmap
+    POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def __init__(self, minimum: int, maximum: int, max_bins: int = 1 << 16, coverage: bool = None):
+        """
+        :param minimum: (inclusive)
+        :param maximum: (inclusive)
+        :param max_bins: histogram buckets, one per value when the range has at most this many values
+        :param coverage: keep the bitmap of the values seen, defaults to ranges up to 2^32 (512 MiB)
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.range = maximum - minimum + 1
+        if not 0 < self.range <= 2 ** 64:
+            raise ValueError(f"range [{minimum}, {maximum}] must hold 1 to 2^64 values")
+        # the same number of values in every bucket but the last
+        self.width = -(-self.range // max_bins)
+        self.counts = np.zeros(-(-self.range // self.width), dtype=np.int64)
+        self.byte_counts = np.zeros(256, dtype=np.int64)
+        # ceil(log256(range)), the bytes of value - minimum counted for the entropy
+        self.value_bytes = max(1, ((self.range - 1).bit_length() + 7) // 8)
+        self.count = 0
+        self.outside = 0
+        self.min = None
+        self.max = None
+        # mean of value - minimum
+        self.offset_mean = 0.0
+        self.m2 = 0.0
+        if coverage is None:
+            coverage = self.range <= 2 ** 32
+        self.bitmap = None
+        if coverage:
+            self.bitmap = np.zeros(-(-self.range // 8), dtype=np.uint8)
+            # bits past the range are marked as seen, so they never show up as missing
+            self.bitmap[-1] |= np.uint8((0xFF << (self.range % 8 or 8)) & 0xFF)
+
+    def update(self, values) -> None:
+        """
+        :param values: array-like of integers
+        """
+        values = np.asarray(values).reshape(-1)
+        if not len(values):
+            return
+        if values.dtype.kind == 'f' and np.array_equal(values, np.floor(values)):
+            # whole numbers held as floats, like the output of generators.lcg
+            values = values.astype(np.uint64 if values.min() >= 0 else np.int64)
+        if values.dtype.kind not in 'iub':
+            raise TypeError(f"expected integers, got {values.dtype}")
+        low, high = int(values.min()), int(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+        # offsets modulo 2^64, values below the minimum wrap around past the range
+        offsets = values.astype(np.uint64) - np.uint64(self.minimum % 2 ** 64)
+
+        # Chan et al.'s update of the mean and the sum of squared deviations with a whole chunk,
+        # on the offsets so that a range far from 0 keeps its precision. Those are below 2^64 but
+        # may not fit in int64, so they go through float64, and the wrapped ones of values below
+        # the minimum come back negative.
+        n = len(values)
+        shifted = offsets.astype(np.float64)
+        if low < self.minimum:
+            below = values < self.minimum
+            shifted[below] = -(np.uint64(0) - offsets[below]).astype(np.float64)
+        mean = shifted.mean()
+        m2 = np.square(shifted - mean).sum()
+        total = self.count + n
+        self.m2 += m2 + (mean - self.offset_mean) ** 2 * self.count * n / total
+        self.offset_mean += (mean - self.offset_mean) * n / total
+        self.count = total
+
+        if low < self.minimum or high > self.maximum:
+            inside = offsets < np.uint64(self.range) if self.range < 2 ** 64 else slice(None)
+            offsets = offsets[inside]
+            self.outside += n - len(offsets)
+        self.counts += np.bincount((offsets // np.uint64(self.width)).astype(np.intp), minlength=len(self.counts))
+        low_bytes = offsets.astype('<u8').view(np.uint8).reshape(-1, 8)[:, :self.value_bytes]
+        self.byte_counts += np.bincount(low_bytes.reshape(-1), minlength=256)
+        if self.bitmap is not None:
+            # one |= per bitmap byte touched: the masks of the sorted offsets are or-ed together
+            # per byte, as fancy-index |= would keep only one of the repeated indices
+            offsets = np.sort(offsets)
+            indices, starts = np.unique(offsets >> np.uint64(3), return_index=True)
+            masks = np.left_shift(np.uint8(1), (offsets & np.uint64(7)).astype(np.uint8))
+            self.bitmap[indices] |= np.bitwise_or.reduceat(masks, starts)
+
+    def update_from(self, generator, n: int, chunk: int = 1 << 20, dtype=None) -> None:
+        """
+        Feeds n outputs of a generator, through a reused buffer of chunk values.
+        :param generator: anything with generate_into(out)
+        :param dtype: of the buffer, defaults to the smallest unsigned type that holds maximum
+        """
+        if dtype is None:
+            dtype = next(t for t in (np.uint8, np.uint16, np.uint32, np.uint64) if self.maximum <= np.iinfo(t).max)
+        buffer = np.empty(min(n, chunk), dtype=dtype)
+        while n > 0:
+            out = buffer[:min(n, chunk)]
+            generator.generate_into(out)
+            self.update(out)
+            n -= len(out)
+
+    @property
+    def mean(self) -> float:
+        return self.minimum + self.offset_mean if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count else 0.0
+
+    def missing(self, limit: int = None, block: int = 1 << 20) -> np.ndarray:
+        """
+        :param limit: stop after this many values
+        :param block: bitmap bytes scanned at once
+        :return: the values in the range never seen, ascending
+        """
+        if self.bitmap is None:
+            raise ValueError("coverage was not tracked, create the StreamingStats with coverage=True")
+        found = []
+        left = self.range if limit is None else limit
+        value_type = np.int64 if self.minimum + self.range <= 2 ** 63 else np.uint64
+        for start in range(0, len(self.bitmap), block):
+            if left <= 0:
+                break
+            partial = np.flatnonzero(self.bitmap[start:start + block] != 0xFF)
+            if not len(partial):
+                continue
+            bits = np.unpackbits(self.bitmap[start + partial][:, None], axis=1, bitorder='little')
+            rows, columns = np.nonzero(bits == 0)
+            offsets = (start + partial[rows]) * 8 + columns
+            found.append(offsets[:left].astype(value_type) + value_type(self.minimum))
+            left -= len(found[-1])
+        return np.concatenate(found) if found else np.empty(0, dtype=value_type)
+
+    def missing_count(self, block: int = 1 << 20) -> int:
+        """
+        :return: number of values in the range never seen
+        """
+        if self.bitmap is None:
+            raise ValueError("coverage was not tracked, create the StreamingStats with coverage=True")
+        seen = sum(int(np.take(self.POPCOUNT, self.bitmap[start:start + block]).sum(dtype=np.int64))
+                   for start in range(0, len(self.bitmap), block))
+        return len(self.bitmap) * 8 - seen
+
+    def chisquare(self) -> Tuple[float, float]:
+        """
+        Chi-square test of the bucket counts against the uniform distribution over the range
+        :return: (statistic, p-value)
+        """
+        expected = np.full(len(self.counts), self.width, dtype=np.float64)
+        expected[-1] = self.range - (len(self.counts) - 1) * self.width
+        expected *= (self.count - self.outside) / self.range
+        return chisquare(self.counts, expected)
+
+    def byte_entropy(self) -> float:
+        """
+        Counts the low ceil(log256(range)) bytes of value - minimum for the values in the range, whatever
+        their dtype, so that uniform values over a range of 2^(8k) values come close to 8.
+        :return: Shannon entropy of those bytes, in bits per byte (8 at most)
+        """
+        total = self.byte_counts.sum()
+        if not total:
+            return 0.0
+        p = self.byte_counts[self.byte_counts > 0] / total
+        return float(-(p * np.log2(p)).sum())
+
+
 def missing_from_range(lst: [int], start: int, end: int) -> [int]:
     """
     :param lst: a list of numbers
@@ -43,8 +221,9 @@ def missing_from_range(lst: [int], start: int, end: int) -> [int]:
     :param end: end value (inclusive)
     :return: a list of numbers not present in the range
     """
-    full_range = set(range(start, end + 1))
-    return sorted(full_range - set(lst))
+    stats = StreamingStats(start, end, coverage=True)
+    stats.update(lst)
+    return stats.missing().tolist()
 
 
 def serial_correlation_comparison():
@@ -109,17 +288,33 @@ def general_display_arrays(data: [Tuple[str, list]], minimum: int, maximum: int,
             plt.ylabel("Value Generated")
             plt.savefig("indexvalue.png")
 
-    print("-----------------------")
+    # only the printed numbers are kept, so one coverage bitmap is alive at a time
+    summaries = []
     for title, array in data:
-        print(f"{title} MIN and MAX: " + str(int(array.min())) + ", " + str(int(array.max())))
+        stats = StreamingStats(minimum, maximum)
+        stats.update(array)
+        missing = None
+        if stats.bitmap is not None:
+            missing = (stats.missing_count(), stats.missing(MISSING_SHOWN).tolist())
+        summaries.append((title, stats.min, stats.max, stats.mean, missing))
+        del stats
+
     print("-----------------------")
-    for title, array in data:
-        print(f"Not present in {title}: " + str(missing_from_range(array, minimum, maximum)))
+    for title, low, high, _, _ in summaries:
+        print(f"{title} MIN and MAX: " + str(low) + ", " + str(high))
+    print("-----------------------")
+    for title, _, _, _, missing in summaries:
+        if missing is None:
+            continue
+        count, first = missing
+        if count <= MISSING_SHOWN:
+            print(f"Not present in {title}: " + str(first))
+        else:
+            print(f"Not present in {title}: {count} values, the first {MISSING_SHOWN}: " + str(first))
     print("-----------------------")
     exp_mean = (maximum + minimum) / 2
     print("Expec. MEAN: " + str(exp_mean))
-    for title, array in data:
-        mean = array.mean()
+    for title, _, _, mean, _ in summaries:
         print(f"{title} MEAN: " + str(mean) + f" (diff. {(exp_mean - mean):.5f})")
 
 
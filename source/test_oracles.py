@@ -0,0 +1,105 @@
+"""
+Checks every fast path against the slow version kept as its oracle. Needs the extensions built in
+place (python setup.py build_ext --inplace), run with python -m pytest from source/.
+"""
+import numpy as np
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+import generators
+
+c_lcg_lh = pytest.importorskip("c_lcg_lh")
+xor_lh = pytest.importorskip("xor_lh")
+sequence_lh = pytest.importorskip("sequence_lh")
+
+LCG_A = 6364136223846793005
+LCG_C = 1442695040888963407
+MASK64 = 2 ** 64 - 1
+
+# (w, delta, minimum, maximum), w = 4 and 5 go through the generic loop, 6..20 through the fixed-w kernels
+CASES = [(4, 0, 0, 9), (5, 2, 3, 20), (6, 1, 0, 99), (10, 3, 5, 719), (12, 12, 0, 1), (14, 0, 0, 2 ** 20),
+         (20, 7, 0, 999)]
+GENERATORS = [c_lcg_lh.LcgLehmer, xor_lh.XorLehmer]
+N = 500
+
+
+def lcg_states(seed, n):
+    states = []
+    for _ in range(n):
+        seed = (LCG_A * seed + LCG_C) & MASK64
+        states.append(seed)
+    return np.array(states, dtype=np.uint64)
+
+
+@pytest.mark.parametrize("w, delta, minimum, maximum", CASES)
+def test_rank_kernels_match_lehmerize_sequence(w, delta, minimum, maximum):
+    # the first window of a generator only primes the engine, the outputs start one delta later
+    expected = generators.lehmerize_sequence(lcg_states(17, 60 * N * w)[delta or w:], N, minimum, maximum, w, delta)
+    assert len(expected) == N
+    generator = c_lcg_lh.LcgLehmer(17, w, delta, minimum, maximum)
+    np.testing.assert_array_equal(generator.generate_chunk(N, 0), expected)
+
+
+@pytest.mark.parametrize("cls", GENERATORS)
+@pytest.mark.parametrize("w, delta, minimum, maximum", CASES)
+def test_incremental_matches_full_recompute(cls, w, delta, minimum, maximum):
+    fast = cls(2025, w, delta, minimum, maximum)
+    full = cls(2025, w, delta, minimum, maximum)
+    full.incremental = False
+    np.testing.assert_array_equal(fast.generate_chunk(N, 0), full.generate_chunk(N, 0))
+
+
+@pytest.mark.parametrize("cls", GENERATORS)
+@pytest.mark.parametrize("w, delta", [(2, 1), (4, 0), (6, 1), (8, 3), (12, 5)])
+def test_lut_matches_loop(cls, w, delta):
+    tables = cls(99, w, delta, 0, 1)
+    tables.lut = True
+    loop = cls(99, w, delta, 0, 1)
+    loop.incremental = False
+    np.testing.assert_array_equal(tables.generate_chunk(N, 0), loop.generate_chunk(N, 0))
+
+
+@pytest.mark.parametrize("w, delta, minimum, maximum", [(1, 0, 0, 0), (3, 1, 0, 3), (6, 2, 10, 129), (9, 0, 0, 6),
+                                                        (21, 4, 0, 10 ** 6)])
+@pytest.mark.parametrize("kind", ["ties", "floats", "list"])
+def test_lehmerize_sequence_matches_reference(w, delta, minimum, maximum, kind):
+    rng = np.random.default_rng(w * 100 + delta)
+    if kind == "ties":
+        sequence = rng.integers(0, 4, 5000)
+    elif kind == "floats":
+        sequence = rng.normal(size=5000)
+    else:
+        sequence = rng.integers(0, 1000, 5000).tolist()
+    expected = generators.lehmerize_sequence_reference(sequence, 300, minimum, maximum, w, delta)
+    np.testing.assert_array_equal(generators.lehmerize_sequence(sequence, 300, minimum, maximum, w, delta, chunk=64),
+                                  expected)
+
+
+@pytest.mark.parametrize("a, c, m", [(1664525, 1013904223, 2 ** 32), (421, 1, 720), (LCG_A, LCG_C, 2 ** 64),
+                                     (48271, 0, 2 ** 31 - 1)])
+def test_lcg_matches_reference(a, c, m):
+    np.testing.assert_array_equal(generators.lcg(12345, 3000, a, c, m, block=256),
+                                  generators.lcg_reference(12345, 3000, a, c, m))
+
+
+@pytest.mark.parametrize("seed", [1, 2463534242, 2 ** 32 - 1, 2 ** 40 + 3])
+def test_xorshift_matches_reference(seed):
+    assert generators.xorshift(seed, 3000, block=256) == generators.xorshift_reference(seed, 3000)
+
+
+@pytest.mark.parametrize("w", [2, 6, 20, 23])
+def test_lehmer_from_ranks_matches_reference(w):
+    windows = sliding_window_view(generators.lcg(7, 400 + w - 1), w)
+    assert generators._lehmer_from_ranks(windows, chunk=64) == generators._lehmer_from_ranks_reference(windows.tolist())
+
+
+@pytest.mark.parametrize("w, delta, minimum, maximum", CASES[:5])
+@pytest.mark.parametrize("dtype", [np.uint32, np.int16, np.float64])
+def test_sequence_lehmer_matches_lehmerize_sequence(w, delta, minimum, maximum, dtype):
+    rng = np.random.default_rng(w)
+    sequence = (rng.normal(size=20000) * 1000).astype(dtype)
+    lehmer = sequence_lh.SequenceLehmer(w, delta, minimum, maximum)
+    # uneven chunks, so windows straddle them and the carried keys are used
+    outputs = [lehmer.feed(chunk) for chunk in np.array_split(sequence, 7)]
+    expected = generators.lehmerize_sequence(sequence, len(sequence), minimum, maximum, w, delta)
+    np.testing.assert_array_equal(np.concatenate(outputs), expected)
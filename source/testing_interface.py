@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 import sys
-import struct
 import time
 import argparse
+import functools
+
+from pipeline import Pipeline, Farm, MappedFile
+import autotune
 
 import c_lcg_lh as lcg
 import xor_lh as xor
+import wide_lh as wide
 
 import alternatives.lcg_fenwick as lfw
 import alternatives.xor_fenwick as xfw
@@ -17,28 +21,82 @@ import alternatives.decay_lh as dec
 maximum = 2 ** 32 - 1
 chunk_size = 8192
 w = 14
+# window of the wide-code generators (wlcg, wxor), three 32-bit words per accepted window
+wide_w = 34
+
+# chunk size used when file mode generates on several threads
+parallel_chunk_size = 1 << 20
+
+# buffers cycling between the generating and the writing thread
+ring_size = 4
 
 generator = None
 debug = False
+algo = 'lcg'
+seed = 0
+delta = 0
+threads = 1
+workers = 1
+factory = None
 
 
-def output(expected):
+def fill(numbers):
     """
-    Outputs numbers to stdout
-    :return: the next seed
+    Fills numbers with the next len(numbers) outputs of the generator
     """
-    numbers = generator.generate_chunk(expected, debug)
+    if debug:
+        numbers[:] = generator.generate_chunk(len(numbers), debug)
+    elif threads > 1:
+        generator.generate_parallel(numbers, threads)
+    else:
+        generator.generate_into(numbers)
+
+
+def make_generator(algo, w, delta, seed):
+    match algo:
+        case 'lcg':
+            return lcg.LcgLehmer(seed, w, delta, 0, maximum)
+        case 'xor':
+            return xor.XorLehmer(seed, w, delta, 0, maximum)
+        case 'lfw':
+            return lfw.LcgFenwick(seed, w, delta, 0, maximum)
+        case 'xfw':
+            return xfw.XorFenwick(seed, w, delta, 0, maximum)
+        case 'log':
+            return log.LogisticLehmer(seed, w, delta, 0, maximum)
+        case 'gau':
+            return gau.GaussianLehmer(seed, w, delta, 0, maximum)
+        case 'slp':
+            return slp.SlopeLehmer(seed, w, delta, 0, maximum)
+        case 'dec':
+            return dec.DecayLehmer(seed, w, delta, 0, maximum)
+        case 'wlcg':
+            return wide.WideLcgLehmer(seed, w, delta)
+        case 'wxor':
+            return wide.WideXorLehmer(seed, w, delta)
 
-    if len(numbers) != expected:
-        print(f"[WARN] Expected {expected}, got {len(numbers)}", file=sys.stderr)
-        raise SystemExit(1)
 
-    sys.stdout.buffer.write(struct.pack('<{}I'.format(expected), *numbers))
+def auto_window(algo, delta):
+    """
+    Window size with the lowest predicted cost per output on this machine, see autotune.py.
+    For the LCG and xorshift sources the naive and sorting network kernels compete, so the algorithm can change.
+    :return: (algo, w)
+    """
+    kernel_algos = {'lcg': {'naive': 'lcg', 'network': 'lfw'}, 'xor': {'naive': 'xor', 'network': 'xfw'}}
+    family = {'lcg': 'lcg', 'lfw': 'lcg', 'xor': 'xor', 'xfw': 'xor'}.get(algo)
+    if family is None:
+        # the other sources only have the naive kernel, their window follows the LCG cost model
+        auto_w, _ = autotune.best_window(0, maximum, delta, 'lcg', kernels=('naive',))
+        return algo, auto_w
+    auto_w, kernel = autotune.best_window(0, maximum, delta, family)
+    return kernel_algos[family][kernel], auto_w
 
-    if debug:
-        for num in numbers:
-            print(num, file=sys.stderr)
-    sys.stdout.flush()
+
+def new_pipeline():
+    if workers > 1:
+        return Farm(factory, seed, workers, chunk_size)
+    # a single buffer keeps the debug output of each chunk next to its numbers
+    return Pipeline(fill, chunk_size, 1 if debug else ring_size, echo=debug)
 
 
 def pipe():
@@ -52,11 +110,10 @@ def pipe():
 
     chunks_sent = 0
     start_time = time.time()
+    pipeline = new_pipeline()
 
     try:
-        while True:
-            output(chunk_size)
-
+        for _ in pipeline.run():
             chunks_sent += 1
             if chunks_sent % 4000 == 0:
                 elapsed = time.time() - start_time
@@ -72,6 +129,7 @@ def pipe():
     except KeyboardInterrupt:
         print("\n--- Stream interrupted by user. Exiting. ---", file=sys.stderr)
         sys.stderr.flush()
+    pipeline.report()
 
 
 def file(total_numbers):
@@ -87,14 +145,10 @@ def file(total_numbers):
     chunks_sent = 0
     numbers_sent = 0
     start_time = time.time()
+    pipeline = new_pipeline()
 
     try:
-        while numbers_sent < total_numbers:
-            remaining = total_numbers - numbers_sent
-            current_chunk = min(chunk_size, remaining)
-
-            output(current_chunk)
-
+        for current_chunk in pipeline.run(total_numbers):
             chunks_sent += 1
             numbers_sent += current_chunk
 
@@ -106,13 +160,48 @@ def file(total_numbers):
                       f"({rate:,.0f} nums/sec)", file=sys.stderr)
                 sys.stderr.flush()
 
-        sys.stdout.flush()
         print(f"--- Completed {numbers_sent:,} numbers. ---", file=sys.stderr)
 
     except BrokenPipeError:
         print("\n--- Stream closed early. Exiting gracefully. ---", file=sys.stderr)
     except KeyboardInterrupt:
         print("\n--- Interrupted by user. Exiting. ---", file=sys.stderr)
+    pipeline.report()
+
+
+def mapped_file(total_numbers, path):
+    """
+    Generate a fixed number of random 32-bit unsigned integers straight into a memory mapped file,
+    resuming an interrupted run of the same command.
+    """
+    print(f"--- Testing Mapped File Interface Initialized ---", file=sys.stderr)
+    print(f"Range = [0, {maximum}]", file=sys.stderr)
+    print(f"Total numbers to generate = {total_numbers:,}", file=sys.stderr)
+    print(f"Output = {path} ({workers} workers)", file=sys.stderr)
+
+    mapped = MappedFile(factory, seed, path, total_numbers, workers,
+                        {"algo": algo, "w": w, "delta": delta, "maximum": maximum})
+    numbers_done = mapped.completed
+    if numbers_done:
+        print(f"Resuming with {numbers_done:,} numbers already written", file=sys.stderr)
+    print(f"Starting...", file=sys.stderr)
+    start_time = time.time()
+    numbers_sent = 0
+
+    try:
+        for count in mapped.run():
+            numbers_sent += count
+            numbers_done += count
+            rate = numbers_sent / (time.time() - start_time)
+            print(f"[INFO] {round(100*numbers_done/total_numbers, 3)}% "
+                  f"Written {numbers_done:,}/{total_numbers:,} numbers "
+                  f"({rate:,.0f} nums/sec)", file=sys.stderr)
+            sys.stderr.flush()
+
+        print(f"--- Completed {total_numbers:,} numbers. ---", file=sys.stderr)
+
+    except KeyboardInterrupt:
+        print("\n--- Interrupted by user. Run the same command again to resume. ---", file=sys.stderr)
 
 
 def main():
@@ -122,39 +211,61 @@ def main():
     parser.add_argument("delta", type=int, help="delta")
 
     parser.add_argument("--total", type=int, help="total numbers to generate (required for file mode)")
-    parser.add_argument("--algo", choices=['lcg', 'xor', 'lfw', 'xfw', 'log',
-                                           'gau', 'slp', 'dec'], default='lcg', help="Choose generator algorithm")
+    parser.add_argument("--algo", choices=['lcg', 'xor', 'lfw', 'xfw', 'log', 'gau', 'slp', 'dec', 'wlcg', 'wxor'],
+                        default='lcg', help="Choose generator algorithm (wlcg and wxor: wide codes, w = 34)")
     parser.add_argument("--debug", action="store_true", help="enable debug mode")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="file mode: Lehmerize on this many threads (lcg and xor only, same output)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="generate on this many processes, output is reproducible for a given seed and worker count")
+    parser.add_argument("--auto-w", action="store_true",
+                        help="choose w (and the naive or sorting network kernel for lcg, xor, lfw and xfw) from a cost "
+                             "model calibrated on this machine, see autotune.py")
+    parser.add_argument("--out", help="file mode: write into this file through a memory map instead of stdout, "
+                                      "resuming an interrupted run. With --workers 1 the file holds the same numbers "
+                                      "as stdout; with more, segments of 2^24 numbers are generated from separate "
+                                      "substreams, so it differs from stdout after the first segment")
 
     args = parser.parse_args()
 
     if args.mode == 'f' and args.total is None:
         parser.error("the 'f' mode requires --total <number>.")
 
-    global generator, debug
+    global generator, debug, algo, seed, w, delta, threads, workers, factory, chunk_size
     debug = args.debug
 
-    match args.algo:
-        case 'lcg':
-            generator = lcg.LcgLehmer(args.seed, w, args.delta, 0, maximum)
-        case 'xor':
-            generator = xor.XorLehmer(args.seed, w, args.delta, 0, maximum)
-        case 'lfw':
-            generator = lfw.LcgFenwick(args.seed, w, args.delta, 0, maximum)
-        case 'xfw':
-            generator = xfw.XorFenwick(args.seed, w, args.delta, 0, maximum)
-        case 'log':
-            generator = log.LogisticLehmer(args.seed, w, args.delta, 0, maximum)
-        case 'gau':
-            generator = gau.GaussianLehmer(args.seed, w, args.delta, 0, maximum)
-        case 'slp':
-            generator = slp.SlopeLehmer(args.seed, w, args.delta, 0, maximum)
-        case 'dec':
-            generator = dec.DecayLehmer(args.seed, w, args.delta, 0, maximum)
+    algo = args.algo
+    seed = args.seed
+    delta = args.delta
+    if algo in ('wlcg', 'wxor'):
+        if args.auto_w:
+            parser.error(f"--auto-w is not supported by --algo {algo}.")
+        w = wide_w
+    elif args.auto_w:
+        algo, w = auto_window(algo, delta)
+        print(f"[INFO] --auto-w picked w = {w} for --algo {algo}", file=sys.stderr)
+    factory = functools.partial(make_generator, algo, w, delta)
+    generator = factory(seed)
+
+    if args.threads > 1 and args.mode == 'f':
+        if not hasattr(generator, 'generate_parallel'):
+            parser.error(f"--threads is not supported by --algo {algo}.")
+        threads = args.threads
+        chunk_size = parallel_chunk_size
+
+    if args.workers > 1:
+        if debug or threads > 1:
+            parser.error("--workers cannot be combined with --debug or --threads.")
+        workers = args.workers
+
+    if args.out is not None and (args.mode != 'f' or debug or threads > 1):
+        parser.error("--out needs the 'f' mode and cannot be combined with --debug or --threads.")
 
     # -----------------------------------------------
 
-    if args.mode == 'f':
+    if args.mode == 'f' and args.out is not None:
+        mapped_file(args.total, args.out)
+    elif args.mode == 'f':
         file(args.total)
     elif args.mode == 'p':
         pipe()
@@ -0,0 +1,293 @@
+# distutils: language=c++
+# cython: language_level=3
+
+import numpy as np
+cimport numpy as np
+import math
+import struct
+from libc.string cimport memcpy
+from libc.stdint cimport uint32_t, uint64_t
+from lehmer_kernels cimport LH_WIDE_MAX_W, lh_rank_wide_u64, lh_rank_wide_merge_u64
+from lehmer_kernels cimport lh_acquire_output, PyBuffer_Release
+from lehmer_kernels cimport lh_xorshift64_jump_init
+from lehmer_engine cimport lh_engine, lh_lcg_source, lh_xorshift_source
+from lehmer_engine cimport lh_engine_init_wide, lh_source_alloc, lh_source_free, lh_source_jump
+from lehmer_engine cimport lh_rank, lh_fill, lh_trace, lh_debug_fill
+from lehmer_base cimport LehmerBase
+
+np.import_array()
+lh_xorshift64_jump_init()
+
+# Wide-code generators: windows of up to 34 values ranked into 128-bit Lehmer codes, each accepted
+# window giving several full 32-bit words. The output range is fixed to [0, 2^32 - 1]. The window
+# loop is lh_fill of lehmer_engine, overlapping windows (delta < w) update their digits incrementally.
+
+# smallest window whose code holds a whole 32-bit word, 13! > 2^32
+MIN_W = 13
+MAX_W = LH_WIDE_MAX_W
+
+# snapshot layout: tag, w, delta, state, is_initialized, number of pending words, the three words,
+# followed by the window (w uint64)
+SNAPSHOT = struct.Struct("<4siiQ?i3I")
+
+
+def words_per_window(int w):
+    """
+    :return: 32-bit words an accepted window of size w gives, floor(log2(w!) / 32)
+    """
+    return (math.factorial(w).bit_length() - 1) // 32
+
+
+cdef int lh_wide_init(lh_engine *e, int w, int delta) except -1:
+    """
+    :param w: window size, MIN_W to MAX_W
+    :param delta: steps to take between windows. delta=0 is the same as delta=w
+    """
+    if w < MIN_W or w > MAX_W:
+        raise ValueError(f"wide codes support {MIN_W} <= w <= {MAX_W}, got w={w}")
+    return lh_engine_init_wide(e, w, delta)
+
+
+cdef class _WideLehmer(LehmerBase):
+    # the methods WideLcgLehmer and WideXorLehmer share, through the fill hooks of LehmerBase
+
+    @property
+    def words(self):
+        """32-bit words per accepted window"""
+        return self.engine.words
+
+    @property
+    def incremental(self):
+        """overlapping windows keep their per-position counts between slides"""
+        return self.engine.incremental
+
+    @incremental.setter
+    def incremental(self, bint value):
+        self.engine.incremental = value and self.engine.delta < self.engine.w
+
+    @property
+    def merge_sort(self):
+        """
+        Ranks every window through the O(w log w) merge sort inversion count instead of the
+        w^2 / 2 comparisons. The output is unchanged, but the comparisons are faster at every
+        supported w, so they stay the default. Measured with benchmark.py, delta=0, ns per word
+        (comparisons / merge sort): w=21 146 / 721, w=28 129 / 576, w=34 133 / 592. Extrapolating
+        the two curves puts the crossover near w = 190, well above MAX_W.
+        Turns incremental off (switching merge_sort off turns it back on for delta < w), and is
+        not carried over by snapshot/restore or pickling.
+        """
+        return self.engine.rank_wide == lh_rank_wide_merge_u64
+
+    @merge_sort.setter
+    def merge_sort(self, bint value):
+        self.engine.rank_wide = lh_rank_wide_merge_u64 if value else lh_rank_wide_u64
+        # both kernels write the digits, so the incremental path can pick up after either
+        self.engine.incremental = not value and self.engine.delta < self.engine.w
+
+    cpdef np.ndarray generate_chunk(self, int n, int debug):
+        cdef np.ndarray[np.uint32_t, ndim=1] results = np.empty(n, dtype=np.uint32)
+        if debug:
+            self.debug_fill(<char *> results.data, sizeof(uint32_t), n)
+            return results
+        with nogil:
+            self.fill(<char *> results.data, sizeof(uint32_t), n)
+        return results
+
+    def trace(self, Py_ssize_t n):
+        """
+        Runs the next n windows and records each one, for debugging and analysis. Words left from
+        the last generate call are dropped, after that the generator moves on exactly as if
+        generate_into had produced the words of the accepted windows.
+        :return: structured array with the fields window, digits, code, accepted and output
+        """
+        return self.trace_windows(n)
+
+    def generate_into(self, out):
+        """
+        Writes the next len(out) words into a caller-supplied buffer without allocating.
+        :param out: writable contiguous buffer or memoryview of uint32 or uint64
+        :return: out
+        """
+        cdef Py_buffer view
+        lh_acquire_output(out, &view, 0xFFFFFFFF)
+        try:
+            with nogil:
+                self.fill(<char *> view.buf, view.itemsize, view.len // view.itemsize)
+        finally:
+            PyBuffer_Release(&view)
+        return out
+
+
+cdef class WideLcgLehmer(_WideLehmer):
+    cdef lh_lcg_source source
+
+    def __cinit__(self, uint64_t seed, int w, int delta):
+        """
+        :param seed: initial state
+        :param w: window size, MIN_W to MAX_W
+        :param delta: steps to take between windows. delta=0 is the same as delta=w
+        """
+        self.source.state = seed
+        self.source.a = 6364136223846793005
+        self.source.c = 1442695040888963407
+        lh_wide_init(&self.engine, w, delta)
+        lh_source_alloc(&self.source, w)
+
+    def __dealloc__(self):
+        lh_source_free(&self.source)
+
+    cdef Py_ssize_t fill(self, char *out, int itemsize, Py_ssize_t n) noexcept nogil:
+        return lh_fill(&self.engine, &self.source, out, itemsize, n, -1)
+
+    cdef object trace_windows(self, Py_ssize_t n):
+        return lh_trace(&self.engine, &self.source, n)
+
+    cdef int debug_fill(self, char *out, int itemsize, Py_ssize_t n) except -1:
+        return lh_debug_fill(&self.engine, &self.source, out, itemsize, n)
+
+    def advance(self, uint64_t source_steps):
+        """
+        Skips source_steps LCG steps in O(log source_steps) and discards the current window and
+        the words left from it, so the next call starts a fresh window from the advanced state.
+        :param source_steps: number of LCG steps to skip
+        :return: self
+        """
+        lh_source_jump(&self.source, source_steps)
+        self.engine.is_initialized = 0
+        self.engine.pending_left = 0
+        return self
+
+    def jumped(self, uint64_t source_steps):
+        """
+        :param source_steps: number of LCG steps to skip
+        :return: a copy of this generator advanced by source_steps, this one is left unchanged
+        """
+        return WideLcgLehmer.restore(self.snapshot()).advance(source_steps)
+
+    def snapshot(self):
+        """
+        Exports the complete stream position, including the current window, as compact bytes.
+        :return: bytes for restore or __setstate__
+        """
+        return (SNAPSHOT.pack(b"WLC1", self.engine.w, self.engine.delta, self.source.state,
+                              self.engine.is_initialized, self.engine.pending_left, *self.engine.wide_pending)
+                + (<char *> self.source.window)[:self.engine.w * sizeof(uint64_t)])
+
+    @staticmethod
+    def restore(data):
+        """
+        :param data: bytes from snapshot
+        :return: a new generator that continues exactly where the snapshotted one stopped
+        """
+        _, w, delta, state = SNAPSHOT.unpack_from(data)[:4]
+        generator = WideLcgLehmer(state, w, delta)
+        generator.__setstate__(data)
+        return generator
+
+    def __setstate__(self, data):
+        cdef const char *raw
+        cdef Py_ssize_t offset = SNAPSHOT.size
+        cdef int w = self.engine.w
+        data = bytes(data)
+        tag, w_, delta, state, is_initialized, pending_left, *pending = SNAPSHOT.unpack_from(data)
+        if (tag != b"WLC1" or (w_, delta) != (w, self.engine.delta)
+                or len(data) != offset + w * <Py_ssize_t> sizeof(uint64_t)):
+            raise ValueError("snapshot does not belong to a WideLcgLehmer with these parameters")
+        if not 0 <= pending_left <= self.engine.words:
+            raise ValueError("snapshot holds an invalid number of pending words")
+        raw = data
+        self.source.state = state
+        self.engine.is_initialized = is_initialized
+        self.engine.pending_left = pending_left
+        self.engine.wide_pending = pending
+        memcpy(self.source.window, raw + offset, w * sizeof(uint64_t))
+        if is_initialized:
+            # the digits of the window, for the incremental path
+            lh_rank(&self.engine, &self.source)
+
+
+cdef class WideXorLehmer(_WideLehmer):
+    cdef lh_xorshift_source source
+
+    def __cinit__(self, uint64_t seed, int w, int delta):
+        """
+        :param seed: initial state
+        :param w: window size, MIN_W to MAX_W
+        :param delta: steps to take between windows. delta=0 is the same as delta=w
+        """
+        if seed == 0: seed = 123456789
+        self.source.state = seed
+        lh_wide_init(&self.engine, w, delta)
+        lh_source_alloc(&self.source, w)
+
+    def __dealloc__(self):
+        lh_source_free(&self.source)
+
+    cdef Py_ssize_t fill(self, char *out, int itemsize, Py_ssize_t n) noexcept nogil:
+        return lh_fill(&self.engine, &self.source, out, itemsize, n, -1)
+
+    cdef object trace_windows(self, Py_ssize_t n):
+        return lh_trace(&self.engine, &self.source, n)
+
+    cdef int debug_fill(self, char *out, int itemsize, Py_ssize_t n) except -1:
+        return lh_debug_fill(&self.engine, &self.source, out, itemsize, n)
+
+    def advance(self, uint64_t source_steps):
+        """
+        Skips source_steps xorshift steps in O(log source_steps) and discards the current window and
+        the words left from it, so the next call starts a fresh window from the advanced state.
+        :param source_steps: number of xorshift steps to skip
+        :return: self
+        """
+        lh_source_jump(&self.source, source_steps)
+        self.engine.is_initialized = 0
+        self.engine.pending_left = 0
+        return self
+
+    def jumped(self, uint64_t source_steps):
+        """
+        :param source_steps: number of xorshift steps to skip
+        :return: a copy of this generator advanced by source_steps, this one is left unchanged
+        """
+        return WideXorLehmer.restore(self.snapshot()).advance(source_steps)
+
+    def snapshot(self):
+        """
+        Exports the complete stream position, including the current window, as compact bytes.
+        :return: bytes for restore or __setstate__
+        """
+        return (SNAPSHOT.pack(b"WXO1", self.engine.w, self.engine.delta, self.source.state,
+                              self.engine.is_initialized, self.engine.pending_left, *self.engine.wide_pending)
+                + (<char *> self.source.window)[:self.engine.w * sizeof(uint64_t)])
+
+    @staticmethod
+    def restore(data):
+        """
+        :param data: bytes from snapshot
+        :return: a new generator that continues exactly where the snapshotted one stopped
+        """
+        _, w, delta, state = SNAPSHOT.unpack_from(data)[:4]
+        generator = WideXorLehmer(state, w, delta)
+        generator.__setstate__(data)
+        return generator
+
+    def __setstate__(self, data):
+        cdef const char *raw
+        cdef Py_ssize_t offset = SNAPSHOT.size
+        cdef int w = self.engine.w
+        data = bytes(data)
+        tag, w_, delta, state, is_initialized, pending_left, *pending = SNAPSHOT.unpack_from(data)
+        if (tag != b"WXO1" or (w_, delta) != (w, self.engine.delta)
+                or len(data) != offset + w * <Py_ssize_t> sizeof(uint64_t)):
+            raise ValueError("snapshot does not belong to a WideXorLehmer with these parameters")
+        if not 0 <= pending_left <= self.engine.words:
+            raise ValueError("snapshot holds an invalid number of pending words")
+        raw = data
+        self.source.state = state
+        self.engine.is_initialized = is_initialized
+        self.engine.pending_left = pending_left
+        self.engine.wide_pending = pending
+        memcpy(self.source.window, raw + offset, w * sizeof(uint64_t))
+        if is_initialized:
+            # the digits of the window, for the incremental path
+            lh_rank(&self.engine, &self.source)
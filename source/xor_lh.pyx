@@ -1,35 +1,43 @@
-# distutils: language=c
+# distutils: language=c++
 # cython: language_level=3
 
 import numpy as np
 cimport numpy as np
 import cython
 import math
-from libc.string cimport memmove
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from libc.string cimport memmove, memcpy
 from libc.stdlib cimport malloc, free
 from libc.stdint cimport uint64_t
+from lehmer_kernels cimport lh_divisor, lh_divisor_init, lh_mod
+from lehmer_kernels cimport lh_store, lh_acquire_output, PyBuffer_Release
+from lehmer_kernels cimport lh_xorshift64_jump_init
+from lehmer_kernels cimport LH_LANES, lh_rank_lanes_u64_fn, lh_select_rank_lanes_u64
+from lehmer_engine cimport lh_xorshift_source, lh_engine_init, lh_source_free, lh_source_alloc
+from lehmer_engine cimport lh_engine_set_lut, lh_engine_set_extract, lh_rank
+from lehmer_engine cimport lh_fill, lh_initialize, lh_skip_windows, lh_source_jump, lh_xorshift64_step
+from lehmer_engine cimport lh_stats_add, lh_profile_add
+from lehmer_engine cimport lh_trace, lh_debug_fill
+from lehmer_base cimport LehmerGenerator
 
 np.import_array()
+lh_xorshift64_jump_init()
 
-cdef inline uint64_t xorshift64_step(uint64_t x) nogil:
-    x ^= x << 13
-    x ^= x >> 7
-    x ^= x << 17
-    return x
-
-cdef class XorLehmer:
-    cdef uint64_t state
-    cdef uint64_t *window_buffer
-    cdef uint64_t *factorials
-    cdef int w
-    cdef int delta
-    cdef bint is_initialized
-
-    cdef long long minimum
-    cdef long long maximum
-    cdef long long r
-    cdef uint64_t R
-    cdef uint64_t thresh
+# generate_parallel splits the stream into blocks of at most this many windows
+cdef Py_ssize_t PARALLEL_BLOCK_WINDOWS = 1 << 15
+# below this many outputs the thread pool costs more than it saves
+cdef Py_ssize_t PARALLEL_MIN_OUTPUTS = 1 << 16
+
+# snapshot layout: tag, w, delta, minimum, maximum, state, is_initialized, incremental, extract,
+# pending digits, number of pending digits, pool, pool range,
+# followed by the window (w uint64) and the Lehmer digits (w int)
+SNAPSHOT = struct.Struct("<4siiqqQ???QiQQ")
+SNAPSHOT_TAG = b"XOR2"
+
+cdef class XorLehmer(LehmerGenerator):
+    cdef lh_xorshift_source source
 
     def __cinit__(self, uint64_t seed, int w, int delta, long long minimum, long long maximum):
         """
@@ -40,99 +48,338 @@ cdef class XorLehmer:
         :param maximum: inclusive
         """
         if seed == 0: seed = 123456789
-        self.state = seed
-        self.w = w
+        self.source.state = seed
+        self.minimum = minimum
+        self.maximum = maximum
+        lh_engine_init(&self.engine, w, delta, minimum, maximum)
+        lh_source_alloc(&self.source, w)
 
-        # fully non-overlapping
-        if delta == 0:
-            self.delta = w
-        else:
-            self.delta = delta
+    def __dealloc__(self):
+        lh_source_free(&self.source)
 
-        self.is_initialized = 0
+    @property
+    def incremental(self):
+        """overlapping windows keep their per-position counts between slides"""
+        return self.engine.incremental
 
-        self.minimum = minimum
-        self.maximum = maximum
-        self.r = self.maximum - self.minimum + 1
-        self.R = math.factorial(self.w)
-        self.thresh = self.R - (self.R % self.r)
+    @incremental.setter
+    def incremental(self, bint value):
+        if value and not self.engine.incremental:
+            lh_engine_set_lut(&self.engine, 0)
+            if self.engine.is_initialized:
+                # the counts of the current window may be stale after table ranking
+                lh_rank(&self.engine, &self.source)
+        self.engine.incremental = value
 
-        self.window_buffer = <uint64_t *> malloc(w * sizeof(uint64_t))
-        self.factorials = <uint64_t *> malloc(w * sizeof(uint64_t))
+    @property
+    def lut(self):
+        """
+        Ranks every window through precomputed comparison-bitmask tables instead of the
+        multiply-add loop, for w up to 12. The output is unchanged. Turns incremental off,
+        and is not carried over by snapshot/restore or pickling.
+        """
+        return self.engine.lut != NULL
 
-        cdef int i
-        for i in range(w):
-            self.factorials[i] = math.factorial(w - i - 1)
+    @lut.setter
+    def lut(self, bint value):
+        lh_engine_set_lut(&self.engine, value)
 
-    def __dealloc__(self):
-        if self.window_buffer: free(self.window_buffer)
-        if self.factorials: free(self.factorials)
-
-    @cython.boundscheck(False)
-    @cython.wraparound(False)
-    cpdef np.ndarray generate_chunk(self, int n, int debug):
-        cdef np.ndarray[np.uint64_t, ndim=1] results = np.empty(n, dtype=np.uint64)
-        cdef int count = 0
-        cdef int i, j, k, smaller
-        cdef uint64_t lehmer
-
-        cdef int digits[32]
-
-        if not self.is_initialized:
-            for i in range(self.w):
-                self.state = xorshift64_step(self.state)
-                self.window_buffer[i] = self.state
-            self.is_initialized = 1
-
-        # PINNED LOCAL VARIABLES
-        cdef uint64_t p_state = self.state
-        cdef uint64_t p_thresh = self.thresh
-        cdef uint64_t p_lehmer
-        cdef uint64_t  p_minimum = self.minimum
-        cdef uint64_t  p_r = self.r
-        cdef int p_w = self.w
-        cdef int p_delta = self.delta
-        cdef uint64_t *p_window = self.window_buffer
-        cdef uint64_t *p_factorials = self.factorials
-
-        while count < n:
-            if p_delta < p_w:
-                memmove(p_window,
-                        p_window + p_delta,
-                        (p_w - p_delta) * sizeof(uint64_t))
-
-            # generate delta new numbers using Xorshift
-            for k in range(p_w - p_delta, p_w):
-                p_state = xorshift64_step(p_state)
-                p_window[k] = p_state
-
-            lehmer = 0
-            for i in range(p_w):
-                smaller = 0
-                for j in range(i + 1, p_w):
-                    smaller += (p_window[j] < p_window[i])
-                lehmer += smaller * p_factorials[i]
-
-            if lehmer < p_thresh:
-                results[count] = (lehmer % p_r) + p_minimum
-                count += 1
-
-            if debug:
-                debug_digits = []
-                for i in range(p_w):
-                    s_debug = 0
-                    for j in range(i + 1, p_w):
-                        s_debug += (p_window[j] < p_window[i])
-                    debug_digits.append(s_debug)
-                current_window = [p_window[k] for k in range(p_w)]
-                print(f"Base sequence: {current_window}")
-                print(f"State: {p_state}")
-                print(f"Lehmer digits: {[digits[k] for k in range(p_w)]}")
-                print(f"Lehmer code: {lehmer} (valid? {lehmer < p_thresh})")
-                print(f"Lehmer code adjusted for range: {(lehmer % p_r) + p_minimum})")
-                print("\n----------\n")
-
-        # CRUCIAL, update persistent state
-        self.state = p_state
-
-        return results
\ No newline at end of file
+    @property
+    def extract(self):
+        """
+        Takes several outputs from every window instead of one: as many base-r digits as fit
+        in w!, plus extra outputs from a pool fed with the rest of each code, so a small range
+        needs several times fewer windows. The outputs stay uniform, but the stream differs
+        from the plain one after its first output. Switching empties the pool.
+        """
+        return self.engine.extract
+
+    @extract.setter
+    def extract(self, bint value):
+        lh_engine_set_extract(&self.engine, value)
+
+    cdef Py_ssize_t fill(self, char *out, int itemsize, Py_ssize_t n) noexcept nogil:
+        return lh_fill(&self.engine, &self.source, out, itemsize, n, -1)
+
+    cdef object trace_windows(self, Py_ssize_t n):
+        return lh_trace(&self.engine, &self.source, n)
+
+    cdef int debug_fill(self, char *out, int itemsize, Py_ssize_t n) except -1:
+        return lh_debug_fill(&self.engine, &self.source, out, itemsize, n)
+
+    def advance(self, uint64_t source_steps):
+        """
+        Skips source_steps xorshift steps in O(log source_steps) and discards the current window,
+        so the next call starts a fresh window from the advanced state.
+        :param source_steps: number of xorshift steps to skip
+        :return: self
+        """
+        lh_source_jump(&self.source, source_steps)
+        self.engine.is_initialized = 0
+        # the pool holds entropy of the skipped windows, jumped copies must not share it
+        lh_engine_set_extract(&self.engine, self.engine.extract)
+        return self
+
+    def jumped(self, uint64_t source_steps):
+        """
+        :param source_steps: number of xorshift steps to skip
+        :return: a copy of this generator advanced by source_steps, this one is left unchanged
+        """
+        return self._copy().advance(source_steps)
+
+    def snapshot(self):
+        """
+        Exports the complete stream position, including the current window, as compact bytes.
+        :return: bytes for restore or __setstate__
+        """
+        cdef int w = self.engine.w
+        return (SNAPSHOT.pack(SNAPSHOT_TAG, w, self.engine.delta, self.minimum, self.maximum,
+                              self.source.state, self.engine.is_initialized, self.engine.incremental,
+                              self.engine.extract, self.engine.pending, self.engine.pending_left,
+                              self.engine.pool, self.engine.pool_range)
+                + (<char *> self.source.window)[:w * sizeof(uint64_t)]
+                + (<char *> self.engine.digits)[:w * sizeof(int)])
+
+    @staticmethod
+    def restore(data):
+        """
+        :param data: bytes from snapshot
+        :return: a new generator that continues exactly where the snapshotted one stopped
+        """
+        _, w, delta, minimum, maximum, state = SNAPSHOT.unpack_from(data)[:6]
+        generator = XorLehmer(state, w, delta, minimum, maximum)
+        generator.__setstate__(data)
+        return generator
+
+    def __setstate__(self, data):
+        cdef const char *raw
+        cdef Py_ssize_t offset = SNAPSHOT.size
+        cdef int w = self.engine.w
+        data = bytes(data)
+        (tag, w_, delta, minimum, maximum, state, is_initialized, incremental,
+         extract, pending, pending_left, pool, pool_range) = SNAPSHOT.unpack_from(data)
+        if (tag != SNAPSHOT_TAG or (w_, delta, minimum, maximum) != (w, self.engine.delta, self.minimum, self.maximum)
+                or len(data) != offset + w * <Py_ssize_t> (sizeof(uint64_t) + sizeof(int))):
+            raise ValueError("snapshot does not belong to a XorLehmer with these parameters")
+        if not 0 <= pending_left <= self.engine.per_code or pool >= pool_range:
+            raise ValueError("snapshot holds an invalid extraction state")
+        raw = data
+        self.source.state = state
+        self.engine.is_initialized = is_initialized
+        self.engine.incremental = incremental
+        lh_engine_set_extract(&self.engine, extract)
+        self.engine.pending = pending
+        self.engine.pending_left = pending_left
+        self.engine.pool = pool
+        self.engine.pool_range = pool_range
+        memcpy(self.source.window, raw + offset, w * sizeof(uint64_t))
+        memcpy(self.engine.digits, raw + offset + w * sizeof(uint64_t), w * sizeof(int))
+
+    def generate_parallel(self, out, workers=None):
+        """
+        Fills out like generate_into, but Lehmerizes window-aligned blocks of the stream on a thread pool.
+        The output, and the generator state afterwards, are identical to generate_into(out).
+        With extract on it runs serially.
+        :param out: writable contiguous buffer or memoryview of uint8, uint16, uint32 or uint64
+        :param workers: number of threads, defaults to os.cpu_count()
+        :return: out
+        """
+        cdef Py_buffer view
+        lh_acquire_output(out, &view, self.maximum)
+        try:
+            self._fill_parallel(<char *> view.buf, view.itemsize, view.len // view.itemsize,
+                                workers or os.cpu_count() or 1)
+        finally:
+            PyBuffer_Release(&view)
+        return out
+
+    cdef void _fill_parallel(self, char *out, int itemsize, Py_ssize_t n, int workers):
+        cdef Py_ssize_t pos = 0
+        cdef Py_ssize_t i, j, count, block, blocks
+        cdef uint64_t[::1] tmp
+        cdef XorLehmer start, runner
+
+        if not self.engine.is_initialized:
+            lh_initialize(&self.engine, &self.source)
+
+        # the pool carries over from window to window, so extraction always runs serially
+        if workers > 1 and not self.engine.extract:
+            blocks = 4 * workers
+            buffers = [np.empty(PARALLEL_BLOCK_WINDOWS, dtype=np.uint64) for _ in range(blocks)]
+            with ThreadPoolExecutor(workers) as pool:
+                while n - pos >= PARALLEL_MIN_OUTPUTS:
+                    # enough windows for the remaining outputs at the expected acceptance rate
+                    block = <Py_ssize_t> ((n - pos) * (<double> self.engine.R / self.engine.thresh) / blocks) + 1
+                    block = min(max(block, 1024), PARALLEL_BLOCK_WINDOWS)
+
+                    starts = []
+                    runners = []
+                    futures = []
+                    for i in range(blocks):
+                        start = self._copy()
+                        starts.append(start)
+                        runner = start._copy()
+                        runners.append(runner)
+                        futures.append(pool.submit(runner._run_block, buffers[i], block))
+                        with nogil:
+                            lh_skip_windows(&self.engine, &self.source, block)
+
+                    for i in range(blocks):
+                        count = futures[i].result()
+                        if pos + count >= n:
+                            # replay this block serially so the state stops right after the last output
+                            for future in futures:
+                                future.cancel()
+                            self._assign(starts[i])
+                            break
+                        runner = runners[i]
+                        lh_stats_add(&self.engine.stats, &runner.engine.stats)
+                        lh_profile_add(&self.engine.profile, &runner.engine.profile)
+                        tmp = buffers[i]
+                        with nogil:
+                            for j in range(count):
+                                lh_store(out, itemsize, pos + j, tmp[j])
+                        pos += count
+                    else:
+                        continue
+                    break
+
+        with nogil:
+            lh_fill(&self.engine, &self.source, out + pos * itemsize, itemsize, n - pos, -1)
+
+    def _run_block(self, uint64_t[::1] out, Py_ssize_t windows):
+        cdef Py_ssize_t count
+        with nogil:
+            count = lh_fill(&self.engine, &self.source, <char *> &out[0], sizeof(uint64_t),
+                            out.shape[0], windows)
+        return count
+
+    cdef void _assign(self, XorLehmer other):
+        # copies the stream position of a generator with the same parameters
+        self.source.state = other.source.state
+        self.engine.is_initialized = other.engine.is_initialized
+        self.engine.incremental = other.engine.incremental
+        self.engine.lut = other.engine.lut
+        self.engine.rank_lut = other.engine.rank_lut
+        lh_engine_set_extract(&self.engine, other.engine.extract)
+        self.engine.pending = other.engine.pending
+        self.engine.pending_left = other.engine.pending_left
+        self.engine.pool = other.engine.pool
+        self.engine.pool_range = other.engine.pool_range
+        memcpy(self.source.window, other.source.window, self.engine.w * sizeof(uint64_t))
+        memcpy(self.engine.digits, other.engine.digits, self.engine.w * sizeof(int))
+
+    cdef XorLehmer _copy(self):
+        cdef XorLehmer other = XorLehmer.__new__(XorLehmer, self.source.state, self.engine.w, self.engine.delta,
+                                                 self.minimum, self.maximum)
+        other._assign(self)
+        return other
+
+
+cdef void _fill_lanes(const uint64_t *seeds, Py_ssize_t m, uint64_t *out, int n, int w, int delta,
+                      uint64_t thresh, uint64_t minimum, lh_divisor r_div, const uint64_t *factorials,
+                      uint64_t *window) noexcept nogil:
+    # runs LH_LANES streams in lockstep. The window is stored lane-interleaved
+    # (window[k * LH_LANES + lane]) so every comparison covers all lanes at once.
+    # A lane that has produced its n outputs is reloaded with the next seed.
+    cdef lh_rank_lanes_u64_fn rank = lh_select_rank_lanes_u64(w)
+    cdef uint64_t state[LH_LANES]
+    cdef uint64_t lehmer[LH_LANES]
+    cdef Py_ssize_t row[LH_LANES]
+    cdef int count[LH_LANES]
+    cdef Py_ssize_t next_row = 0
+    cdef int active = 0
+    cdef int k, lane
+
+    for lane in range(LH_LANES):
+        row[lane] = -1
+        count[lane] = 0
+        state[lane] = 0
+        for k in range(w):
+            window[k * LH_LANES + lane] = 0
+
+        if next_row < m:
+            row[lane] = next_row
+            state[lane] = seeds[next_row] if seeds[next_row] != 0 else 123456789
+            for k in range(w):
+                state[lane] = lh_xorshift64_step(state[lane])
+                window[k * LH_LANES + lane] = state[lane]
+            next_row += 1
+            active += 1
+
+    while active > 0:
+        if delta < w:
+            memmove(window, window + delta * LH_LANES, (w - delta) * LH_LANES * sizeof(uint64_t))
+
+        for k in range(w - delta, w):
+            for lane in range(LH_LANES):
+                state[lane] = lh_xorshift64_step(state[lane])
+                window[k * LH_LANES + lane] = state[lane]
+
+        rank(window, factorials, lehmer, w)
+
+        for lane in range(LH_LANES):
+            if row[lane] < 0 or lehmer[lane] >= thresh:
+                continue
+            out[row[lane] * n + count[lane]] = lh_mod(lehmer[lane], r_div) + minimum
+            count[lane] += 1
+            if count[lane] < n:
+                continue
+
+            # stream finished, hand the lane to the next seed
+            if next_row < m:
+                row[lane] = next_row
+                count[lane] = 0
+                state[lane] = seeds[next_row] if seeds[next_row] != 0 else 123456789
+                for k in range(w):
+                    state[lane] = lh_xorshift64_step(state[lane])
+                    window[k * LH_LANES + lane] = state[lane]
+                next_row += 1
+            else:
+                row[lane] = -1
+                active -= 1
+
+
+def generate_many(seeds, int n, int w, int delta, long long minimum, long long maximum):
+    """
+    Batch version of XorLehmer for many independent seeds, advanced in lockstep.
+    Row i is identical to XorLehmer(seeds[i], w, delta, minimum, maximum).generate_chunk(n, 0)
+    :param seeds: sequence of initial states
+    :param n: outputs per seed
+    :param w: window size
+    :param delta: steps to take between windows. delta=0 is the same as delta=w
+    :param minimum: inclusive
+    :param maximum: inclusive
+    :return: (len(seeds), n) uint64 array
+    """
+    cdef uint64_t[::1] seed_view = np.ascontiguousarray(seeds, dtype=np.uint64).reshape(-1)
+    cdef Py_ssize_t m = seed_view.shape[0]
+    cdef np.ndarray[np.uint64_t, ndim=2] results = np.empty((m, n), dtype=np.uint64)
+    if m == 0 or n == 0:
+        return results
+
+    if delta > w:
+        raise ValueError(f"Delta {delta} greater than window size {w}")
+    if delta == 0:
+        delta = w
+    cdef uint64_t r = maximum - minimum + 1
+    cdef uint64_t R = math.factorial(w)
+    cdef uint64_t thresh = R - (R % r)
+
+    cdef uint64_t *factorials = <uint64_t *> malloc(w * sizeof(uint64_t))
+    cdef uint64_t *window = <uint64_t *> malloc(w * LH_LANES * sizeof(uint64_t))
+    cdef int i
+    if not factorials or not window:
+        free(factorials)
+        free(window)
+        raise MemoryError()
+    for i in range(w):
+        factorials[i] = math.factorial(w - i - 1)
+
+    with nogil:
+        _fill_lanes(&seed_view[0], m, <uint64_t *> results.data, n, w, delta,
+                    thresh, minimum, lh_divisor_init(r), factorials, window)
+
+    free(factorials)
+    free(window)
+    return results